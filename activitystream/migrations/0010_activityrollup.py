@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 22:15
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activitystream', '0009_auto_20161204_0014'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('activity_type', models.CharField(choices=[('user:reg', 'user: registered'), ('user:login', 'user: logged in'), ('user:logout', 'user: logged out'), ('user:pwchange', 'user: password changed'), ('user:pwreset', 'user: password reset'), ('profile:update', 'user: profile updated'), ('profile:view', 'user: profile viewed'), ('adminflag:create', 'administration flag: created'), ('adminflag:update', 'administration flag: updated'), ('adminflag:delete', 'administration flag: deleted'), ('adminflag:view', 'administration flag: viewed'), ('adminapplication:create', 'administration application: created'), ('adminapplication:update', 'administration application: updated'), ('adminapplication:delete', 'administration application: deleted'), ('adminapplication:view', 'administration application: viewed'), ('adminban:create', 'administration ban: created'), ('adminban:update', 'administration ban: updated'), ('adminban:delete', 'administration ban: deleted'), ('adminban:view', 'administration ban: viewed'), ('group:create', 'group: created'), ('group:update', 'group: updated'), ('group:delete', 'group: deleted'), ('social:watch', 'social: watch user'), ('social:unwatch', 'social: unwatch user'), ('social:block', 'social: block user'), ('social:unblock', 'social: unblock user'), ('social:message', 'social: message user'), ('social:favorite', 'social: favorite submission'), ('social:unfavorite', 'social: unfavorite submission'), ('social:rate', 'social: rate submission'), ('social:enjoy', 'social: enjoy submission'), ('submission:create', 'submission: created'), ('submission:update', 'submission: updated'), ('submission:delete', 'submission: deleted'), ('submission:view', 'submission: viewed'), ('folder:create', 'folder: created'), ('folder:update', 'folder: updated'), ('folder:delete', 'folder: deleted'), ('folder:view', 'folder: viewed'), ('folder:sort', 'folder: sorted'), ('tag:create', 'tag: tag created'), ('tag:tag', 'tag: tagged item created'), ('comment:create', 'comment: created'), ('comment:delete', 'comment: deleted'), ('promotion:create', 'promotion: created'), ('promotion:retire', 'promotion: retired'), ('ad:create', 'ad: created,'), ('ad:update', 'ad: update'), ('ad:golive', 'ad: went live'), ('ad:retire', 'ad: retired'), ('publisher:create', 'publisher: created'), ('publisher:update', 'publisher: updated'), ('publisher:delete', 'publisher: deleted'), ('publisher:view', 'publisher: viewed'), ('publisher:claimed', 'publisher: claimed')], max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-date', 'activity_type'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='activityrollup',
+            unique_together=set([('date', 'activity_type')]),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 22:36
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activitystream', '0010_activityrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteStatistic',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['key'],
+            },
+        ),
+    ]
@@ -1,6 +1,16 @@
 from __future__ import unicode_literals
+from collections import (
+    Counter,
+    defaultdict,
+)
 
 from django.db import models
+from django.db.models import (
+    Count,
+    F,
+    Sum,
+)
+from django.db.models.functions import Greatest
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
@@ -107,15 +117,97 @@ class Activity(models.Model):
             :model:`submissions.Submission`
 
         Returns:
-            The generated :model:`activitystream.Activity`
+            The generated :model:`activitystream.Activity`, which is only
+            saved once the buffered activities are written out (see
+            `activitystream.recorder`)
         """
+        from .recorder import activity_recorder
         item_type = "{}:{}".format(app.lower(), action.lower())
-        if item_type not in dict(Activity.ACTIVITY_TYPES):
+        if item_type not in ACTIVITY_TYPE_NAMES:
             return None
         activity = cls(activity_type=item_type)
         activity.object_model = object_model
-        activity.save()
+        activity_recorder.record(activity)
         return activity
 
     class Meta:
         ordering = ['-activity_time']
+
+
+# The valid activity types, for checking new activities against.
+ACTIVITY_TYPE_NAMES = frozenset(
+    activity_type for activity_type, _ in Activity.ACTIVITY_TYPES)
+
+
+class ActivityRollup(models.Model):
+    """A count of the activities of one type on one day.
+
+    Rollups are kept when activities are rotated out of the stream, so that
+    statistics about site activity remain available once the activities
+    themselves have been archived.
+    """
+    date = models.DateField()
+    activity_type = models.CharField(max_length=50,
+                                     choices=Activity.ACTIVITY_TYPES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date', 'activity_type']
+        unique_together = ('date', 'activity_type')
+
+    @staticmethod
+    def get_totals():
+        """Counts all activities ever recorded, by type.
+
+        Returns:
+            A dict of activity types to the number of activities of that type
+            in the rollups and still in the stream
+        """
+        totals = Counter(dict(ActivityRollup.objects.order_by().values(
+            'activity_type').annotate(total=Sum('count')).values_list(
+                'activity_type', 'total')))
+        totals.update(dict(Activity.objects.order_by().values(
+            'activity_type').annotate(total=Count('id')).values_list(
+                'activity_type', 'total')))
+        return dict(totals)
+
+
+class SiteStatistic(models.Model):
+    """A snapshot of one sitewide statistic, such as the number of users.
+
+    Statistics are computed in bulk by the refresh_statistics command, and
+    the hottest of them are counted up and down in between as objects are
+    created and deleted.  Keys are dotted paths into the sitewide data, such
+    as `ratings.5star`.
+    """
+    key = models.CharField(max_length=255, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['key']
+
+    def __str__(self):
+        return '{}: {}'.format(self.key, self.value)
+
+    @staticmethod
+    def adjust(changes):
+        """Adjusts statistics by the given amounts.
+
+        One query is made per distinct amount, however many statistics
+        change.  Statistics not yet in the snapshot are left for the next
+        refresh.
+
+        Args:
+            changes: a dict of statistic keys to the amounts to adjust them by
+        """
+        by_delta = defaultdict(list)
+        for key, delta in changes.items():
+            if delta:
+                by_delta[delta].append(key)
+        for delta, keys in by_delta.items():
+            if delta > 0:
+                value = F('value') + delta
+            else:
+                # Don't fail on statistics which have drifted.
+                value = Greatest(F('value') + delta, 0)
+            SiteStatistic.objects.filter(key__in=keys).update(value=value)
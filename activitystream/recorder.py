@@ -0,0 +1,105 @@
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import Signal
+
+from .models import Activity
+
+
+# Sent once activities have been written to the database, with the list of
+# activities written.  Buffered activities are written with `bulk_create`,
+# which sends no `post_save`.
+activities_written = Signal(providing_args=['activities'])
+
+
+class ActivityRecorder(object):
+    """Buffers activities in memory and writes them out in batches.
+
+    Activities are only buffered once the transaction they were recorded in
+    commits, so that changes which are rolled back leave no activities
+    behind.  Pending activities are written with a single `bulk_create` at
+    the end of each request, once the flush interval has passed or enough
+    activities have accumulated, and when the process exits; those pending
+    when a process is killed are lost.  If `ACTIVITYSTREAM_BUFFER` is
+    disabled, each activity is written as soon as it is recorded, as part of
+    the current transaction.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.time()
+
+    def reset(self):
+        """Discards all pending activities without writing them out."""
+        with self._lock:
+            self._pending = []
+        self._last_flush = time.time()
+
+    def pending_total(self):
+        """Gets the number of activities not yet written out."""
+        with self._lock:
+            return len(self._pending)
+
+    def record(self, activity):
+        """Records an unsaved activity.
+
+        Args:
+            activity: the :model:`activitystream.Activity` to write
+        """
+        if not getattr(settings, 'ACTIVITYSTREAM_BUFFER', True):
+            activity.save()
+            activities_written.send(sender=Activity, activities=[activity])
+            return
+        # Outside of a transaction, this buffers the activity straight away.
+        transaction.on_commit(lambda: self._buffer(activity))
+
+    def _buffer(self, activity):
+        with self._lock:
+            self._pending.append(activity)
+        if self.should_flush():
+            self.flush()
+
+    def should_flush(self):
+        """Checks whether pending activities are due to be written out."""
+        interval = getattr(settings, 'ACTIVITYSTREAM_FLUSH_INTERVAL', 60)
+        threshold = getattr(settings, 'ACTIVITYSTREAM_FLUSH_THRESHOLD', 100)
+        return (time.time() - self._last_flush >= interval or
+                self.pending_total() >= threshold)
+
+    def flush(self):
+        """Writes pending activities to the database.
+
+        Returns:
+            The number of activities written
+        """
+        if not self._flush_lock.acquire(False):
+            # Another thread is already flushing.
+            return 0
+        try:
+            self._last_flush = time.time()
+            with self._lock:
+                activities, self._pending = self._pending, []
+            if not activities:
+                return 0
+            Activity.objects.bulk_create(activities)
+            activities_written.send(sender=Activity, activities=activities)
+            return len(activities)
+        finally:
+            self._flush_lock.release()
+
+
+activity_recorder = ActivityRecorder()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        activity_recorder.flush()
+    except Exception:
+        # The database may no longer be available while shutting down.
+        pass
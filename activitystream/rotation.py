@@ -0,0 +1,129 @@
+import gzip
+import json
+import os
+from collections import (
+    Counter,
+    defaultdict,
+)
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    Activity,
+    ActivityRollup,
+)
+
+
+def get_archive_path(archive_dir, date):
+    """Gets the path of the archive file for a day's activities.
+
+    Archives are partitioned by date, as
+    `<archive_dir>/<year>/<month>/activity-<year>-<month>-<day>.jsonl.gz`.
+    """
+    return os.path.join(
+        archive_dir, date.strftime('%Y'), date.strftime('%m'),
+        'activity-{}.jsonl.gz'.format(date.isoformat()))
+
+
+def archive_activities(archive_dir, rows):
+    """Appends activities to their days' archive files.
+
+    Each activity is written as a line of JSON.  Appending to a gzip file
+    adds another member to it, which gzip readers treat as one stream.
+
+    Args:
+        archive_dir: the directory in which to keep archives
+        rows: a list of activity rows, as from `_get_batch`
+    """
+    by_date = defaultdict(list)
+    for row in rows:
+        # Content types are cached, so this only queries for new ones.
+        ctype = ContentType.objects.get_for_id(row['content_type_id']) \
+            if row['content_type_id'] is not None else None
+        by_date[row['date']].append({
+            'id': row['id'],
+            'time': row['activity_time'].strftime('%Y-%m-%dT%H:%M:%S'),
+            'type': row['activity_type'],
+            'model': '{}:{}'.format(ctype.app_label, ctype.model)
+            if ctype else None,
+            'object_id': row['object_id'],
+        })
+    for date, entries in sorted(by_date.items()):
+        path = get_archive_path(archive_dir, date)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with gzip.open(path, 'ab') as archive:
+            archive.write(b''.join(
+                json.dumps(entry, separators=(',', ':')).encode('utf-8') +
+                b'\n' for entry in entries))
+
+
+def add_to_rollups(rows):
+    """Adds activities to the daily counts of activities by type.
+
+    Args:
+        rows: a list of activity rows, as from `_get_batch`
+    """
+    counts = Counter((row['date'], row['activity_type']) for row in rows)
+    existing = set(ActivityRollup.objects.filter(
+        date__in=set(date for date, _ in counts)).values_list(
+            'date', 'activity_type'))
+    for (date, activity_type), count in counts.items():
+        if (date, activity_type) in existing:
+            ActivityRollup.objects.filter(
+                date=date, activity_type=activity_type).update(
+                    count=F('count') + count)
+    ActivityRollup.objects.bulk_create([
+        ActivityRollup(date=date, activity_type=activity_type, count=count)
+        for (date, activity_type), count in sorted(counts.items())
+        if (date, activity_type) not in existing])
+
+
+def _get_batch(cutoff, after_id, batch_size):
+    rows = list(Activity.objects.filter(
+        activity_time__lt=cutoff, id__gt=after_id).order_by('id').values(
+            'id', 'activity_time', 'activity_type', 'content_type_id',
+            'object_id')[:batch_size])
+    for row in rows:
+        row['date'] = timezone.localtime(row['activity_time']).date()
+    return rows
+
+
+def rotate_activities(cutoff, archive_dir, batch_size=1000, after_id=0):
+    """Moves activities from before a time out of the stream, in batches.
+
+    Activities are worked through in order of id.  Each batch is appended to
+    the archives first, and then counted in the rollups and deleted in one
+    short transaction, so that an interrupted rotation loses nothing and can
+    be resumed from the last id it reported.  At worst, a batch interrupted
+    between the two is archived again, which its ids make easy to spot.
+
+    Args:
+        cutoff: the time before which activities are rotated out
+        archive_dir: the directory in which to keep archives
+        batch_size: how many activities to rotate at a time
+        after_id: only rotate activities with ids greater than this
+
+    Yields:
+        A tuple of the number of activities in each batch and the last id in
+        it
+    """
+    while True:
+        rows = _get_batch(cutoff, after_id, batch_size)
+        if not rows:
+            return
+        archive_activities(archive_dir, rows)
+        with transaction.atomic():
+            add_to_rollups(rows)
+            # Nothing depends on activities, so there is nothing for Django
+            # to collect or signal per row before deleting them.
+            Activity.objects.filter(
+                id__in=[row['id'] for row in rows])._raw_delete(
+                    Activity.objects.db)
+        after_id = rows[-1]['id']
+        yield len(rows), after_id
+        if len(rows) < batch_size:
+            return
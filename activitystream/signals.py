@@ -2,6 +2,7 @@ from django.contrib.auth.signals import (
     user_logged_in,
     user_logged_out,
 )
+from django.core.signals import request_finished
 from django.db.models.signals import (
     post_delete,
     post_save,
@@ -9,7 +10,13 @@ from django.db.models.signals import (
 from django.dispatch import receiver
 from taggit.models import TaggedItem
 
-from .models import Activity
+from .models import (
+    Activity,
+    SiteStatistic,
+)
+from .recorder import activity_recorder
+from .statistics import get_counted_changes
+from social.models import Rating
 from usermgmt.models import Profile
 
 
@@ -90,3 +97,33 @@ def log_tagged_item(sender, **kwargs):
         'tag',
         'tag' if kwargs['created'] else 'update',
         kwargs['instance'])
+
+
+@receiver(request_finished)
+def flush_activities(sender, **kwargs):
+    """Writes out the activities buffered during a request."""
+    activity_recorder.flush()
+
+
+@receiver(post_save)
+def count_create(sender, **kwargs):
+    """Counts created objects into the sitewide statistics.
+
+    Changing a rating moves it from one star count to another.
+    """
+    instance = kwargs['instance']
+    if kwargs['created']:
+        SiteStatistic.adjust(get_counted_changes(instance, 1))
+    elif sender is Rating:
+        previous = getattr(instance, '_previous_rating', None)
+        if previous is not None and previous != instance.rating:
+            SiteStatistic.adjust({
+                'ratings.{}star'.format(previous): -1,
+                'ratings.{}star'.format(instance.rating): 1,
+            })
+
+
+@receiver(post_delete)
+def count_delete(sender, **kwargs):
+    """Counts deleted objects out of the sitewide statistics."""
+    SiteStatistic.adjust(get_counted_changes(kwargs['instance'], -1))
@@ -0,0 +1,235 @@
+import datetime
+
+from django.contrib.auth.models import (
+    Group,
+    User,
+)
+from django.db import (
+    connection,
+    transaction,
+)
+from django.db.models import (
+    Case,
+    Count,
+    Sum,
+    When,
+)
+from taggit.models import (
+    Tag,
+    TaggedItem,
+)
+
+from .models import (
+    ActivityRollup,
+    SiteStatistic,
+)
+from administration.models import Flag
+from promotion.models import (
+    Ad,
+    AdLifecycle,
+    Promotion,
+)
+from publishers.models import Publisher
+from social.models import (
+    Comment,
+    EnjoyItem,
+    Rating,
+)
+from submissions.models import (
+    Folder,
+    Submission,
+)
+from usermgmt.group_models import FriendGroup
+
+
+# Statistics counted up and down as objects are created and deleted, by
+# model label.
+COUNTED_MODELS = {
+    'administration.Flag': 'adminflags',
+    'promotion.Ad': 'ads.total',
+    'publishers.Publisher': 'publishers',
+    'social.Comment': 'comments',
+    'social.EnjoyItem': 'enjoys',
+    'submissions.Folder': 'folders',
+    'taggit.Tag': 'tags.tags',
+    'taggit.TaggedItem': 'tags.taggeditems',
+    'usermgmt.FriendGroup': 'friendgroups',
+}
+
+PROMOTION_KEYS = {
+    Promotion.PROMOTION: 'promotions.promotions',
+    Promotion.PAID_PROMOTION: 'promotions.paid_promotions',
+    Promotion.HIGHLIGHT: 'promotions.highlight',
+}
+
+
+def get_counted_changes(instance, delta):
+    """Gets the statistics which change when an object is created or deleted.
+
+    Args:
+        instance: the object created or deleted
+        delta: 1 if the object was created, -1 if it was deleted
+
+    Returns:
+        A dict of statistic keys to the amounts they change by
+    """
+    label = instance._meta.label
+    if label == 'submissions.Submission':
+        # Deletion cascades to the submission's favorites without sending
+        # `m2m_changed`.
+        return {
+            'submissions': delta,
+            'favorites': delta * instance.favorite_count if delta < 0 else 0,
+        }
+    if label in COUNTED_MODELS:
+        return {COUNTED_MODELS[label]: delta}
+    if label == 'auth.User':
+        return {
+            'users.all': delta,
+            'users.staff': delta if instance.is_staff else 0,
+            'users.superusers': delta if instance.is_superuser else 0,
+        }
+    if label == 'social.Rating':
+        return {
+            'ratings.total': delta,
+            'ratings.{}star'.format(instance.rating): delta,
+        }
+    return {}
+
+
+def _count_all(querysets):
+    """Counts the rows in several querysets with a single query.
+
+    Args:
+        querysets: a list of querysets
+
+    Returns:
+        A list of the number of rows in each queryset
+    """
+    selects = []
+    params = []
+    for queryset in querysets:
+        sql, queryset_params = queryset.order_by().values(
+            'pk').query.sql_with_params()
+        selects.append('(SELECT COUNT(*) FROM ({}) counted)'.format(sql))
+        params.extend(queryset_params)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT {}'.format(', '.join(selects)), params)
+        return list(cursor.fetchone())
+
+
+def compute_statistics():
+    """Computes the sitewide statistics from their source tables.
+
+    Each group of statistics is computed with a grouped aggregate, and the
+    plain counts with a single query between them, so that the whole set
+    takes a handful of queries however many groups, ratings and promotions
+    there are.
+
+    Returns:
+        A dict of statistic keys to their values
+    """
+    stats = {}
+    stats.update(User.objects.aggregate(**{
+        'users.all': Count('id'),
+        'users.staff': Count(Case(When(is_staff=True, then=1))),
+        'users.superusers': Count(Case(When(is_superuser=True, then=1))),
+    }))
+    for name, count in Group.objects.annotate(
+            count=Count('user')).values_list('name', 'count'):
+        stats['groups.{}'.format(name)] = count
+
+    stats['ratings.total'] = 0
+    for rating, _ in Rating.RATING_CHOICES:
+        stats['ratings.{}star'.format(rating)] = 0
+    for rating, count in Rating.objects.order_by().values(
+            'rating').annotate(count=Count('id')).values_list(
+                'rating', 'count'):
+        stats['ratings.{}star'.format(rating)] = count
+        stats['ratings.total'] += count
+
+    stats['promotions.all_active'] = 0
+    for key in PROMOTION_KEYS.values():
+        stats[key] = 0
+    for promotion_type, count in Promotion.objects.filter(
+            promotion_end_date__gte=datetime.date.today()).order_by().values(
+                'promotion_type').annotate(count=Count('id')).values_list(
+                    'promotion_type', 'count'):
+        if promotion_type in PROMOTION_KEYS:
+            stats[PROMOTION_KEYS[promotion_type]] = count
+        stats['promotions.all_active'] += count
+
+    submissions = Submission.objects.aggregate(
+        count=Count('id'), favorites=Sum('favorite_count'))
+    stats['submissions'] = submissions['count']
+    stats['favorites'] = submissions['favorites'] or 0
+    counted = [
+        ('folders', Folder.objects.all()),
+        ('friendgroups', FriendGroup.objects.all()),
+        ('enjoys', EnjoyItem.objects.all()),
+        ('comments', Comment.objects.all()),
+        ('tags.tags', Tag.objects.all()),
+        ('tags.taggeditems', TaggedItem.objects.all()),
+        ('publishers', Publisher.objects.all()),
+        ('ads.total', Ad.objects.all()),
+        ('ads.live', AdLifecycle.objects.filter(live=True)),
+        ('adminflags', Flag.objects.all()),
+    ]
+    stats.update(zip([key for key, _ in counted],
+                     _count_all([queryset for _, queryset in counted])))
+
+    for activity_type, count in ActivityRollup.get_totals().items():
+        stats['activities.{}'.format(activity_type)] = count
+    return stats
+
+
+def refresh_statistics():
+    """Replaces the snapshot of sitewide statistics with fresh ones.
+
+    Returns:
+        A dict of statistic keys to their values
+    """
+    stats = compute_statistics()
+    with transaction.atomic():
+        SiteStatistic.objects.all().delete()
+        SiteStatistic.objects.bulk_create([
+            SiteStatistic(key=key, value=value)
+            for key, value in sorted(stats.items())])
+    return stats
+
+
+def nest_statistics(stats):
+    """Arranges statistics into the nested form of the sitewide data.
+
+    Args:
+        stats: a dict of statistic keys to their values
+
+    Returns:
+        A dict of statistics, with dotted keys nested
+    """
+    nested = {
+        'activities': {},
+        'groups': {},
+    }
+    for key, value in stats.items():
+        # Only split on the first dot, as group names may contain them.
+        parts = key.split('.', 1)
+        if len(parts) == 1:
+            nested[key] = value
+        else:
+            nested.setdefault(parts[0], {})[parts[1]] = value
+    return nested
+
+
+def get_statistics():
+    """Gets the sitewide statistics from the snapshot.
+
+    If no snapshot has been taken yet, one is taken now.
+
+    Returns:
+        A dict of statistics in the nested form of the sitewide data
+    """
+    stats = dict(SiteStatistic.objects.values_list('key', 'value'))
+    if not stats:
+        stats = refresh_statistics()
+    return nest_statistics(stats)
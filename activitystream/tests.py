@@ -1,10 +1,37 @@
+import datetime
 import json
+import mock
 
-from django.contrib.auth.models import User
+from django.contrib.auth.models import (
+    Group,
+    User,
+)
 from django.core.urlresolvers import reverse
-from django.test import TestCase
+from django.db import (
+    connection,
+    transaction,
+)
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from .models import Activity
+from .models import (
+    Activity,
+    ActivityRollup,
+    SiteStatistic,
+)
+from .recorder import activity_recorder
+from .statistics import (
+    compute_statistics,
+    get_statistics,
+    refresh_statistics,
+)
+from social.models import Rating
+from submissions.models import Submission
 from usermgmt.models import Profile
 
 
@@ -36,8 +63,98 @@ class TestModels(ActivityBaseTestCase):
         self.assertEqual(activity, None)
         self.assertEqual(Activity.objects.count(), 2)
 
+    def test_totals_include_rollups(self):
+        ActivityRollup(date=datetime.date(2016, 1, 1),
+                       activity_type='user:reg', count=3).save()
+        ActivityRollup(date=datetime.date(2016, 1, 1),
+                       activity_type='user:login', count=5).save()
+        self.assertEqual(ActivityRollup.get_totals(), {
+            'user:reg': 5,
+            'user:login': 5,
+        })
+
+
+class TestActivityRecorder(ActivityBaseTestCase):
+    def setUp(self):
+        # Buffer only the activities created by the tests themselves.
+        settings = override_settings(ACTIVITYSTREAM_BUFFER=True,
+                                     ACTIVITYSTREAM_FLUSH_THRESHOLD=3)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Activities are buffered in process; don't let them outlive the test.
+        self.addCleanup(activity_recorder.reset)
+        # Tests run in a transaction which never commits, so buffer
+        # activities straight away.
+        patcher = mock.patch('activitystream.recorder.transaction.on_commit',
+                             side_effect=lambda func: func())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_buffers_activities(self):
+        activity = Activity.create('user', 'login', self.foo)
+        self.assertEqual(activity.activity_type, 'user:login')
+        self.assertEqual(activity_recorder.pending_total(), 1)
+        self.assertEqual(Activity.objects.count(), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(activity_recorder.flush(), 1)
+        self.assertEqual(Activity.objects.count(), 3)
+        self.assertEqual(activity_recorder.pending_total(), 0)
+
+    def test_flushes_at_threshold(self):
+        Activity.create('user', 'login', self.foo)
+        Activity.create('user', 'logout', self.foo)
+        self.assertEqual(Activity.objects.count(), 2)
+        Activity.create('user', 'login', self.bar)
+        self.assertEqual(Activity.objects.count(), 5)
+        self.assertEqual(activity_recorder.pending_total(), 0)
+
+    @override_settings(ACTIVITYSTREAM_FLUSH_INTERVAL=0)
+    def test_flushes_after_interval(self):
+        Activity.create('user', 'login', self.foo)
+        self.assertEqual(Activity.objects.count(), 3)
+
+    def test_flushes_at_end_of_request(self):
+        self.client.login(username='foo', password='a good password')
+        self.client.get(reverse('activitystream:sitewide_data'))
+        self.assertEqual(activity_recorder.pending_total(), 0)
+        self.assertTrue(Activity.objects.filter(
+            activity_type='user:login').exists())
+
+    def test_reset_discards_activities(self):
+        Activity.create('user', 'login', self.foo)
+        activity_recorder.reset()
+        self.assertEqual(activity_recorder.flush(), 0)
+        self.assertEqual(Activity.objects.count(), 2)
+
+
+@override_settings(ACTIVITYSTREAM_BUFFER=True)
+class TestActivityRecorderTransactions(TransactionTestCase):
+    def setUp(self):
+        self.foo = User.objects.create_user('foo', 'foo@example.com',
+                                            'a good password')
+        self.addCleanup(activity_recorder.reset)
+        activity_recorder.reset()
+
+    def test_buffers_on_commit(self):
+        with transaction.atomic():
+            Activity.create('user', 'login', self.foo)
+            self.assertEqual(activity_recorder.pending_total(), 0)
+        self.assertEqual(activity_recorder.pending_total(), 1)
+
+    def test_discards_on_rollback(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                Activity.create('user', 'login', self.foo)
+                raise ValueError
+        self.assertEqual(activity_recorder.pending_total(), 0)
+
 
 class TestGetStreamView(ActivityBaseTestCase):
+    def get_data(self, response):
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content).decode(
+            'utf-8'))
+
     def generate_activity_items(self):
         self.client.login(username='foo',
                           password='a good password')
@@ -48,7 +165,7 @@ class TestGetStreamView(ActivityBaseTestCase):
     def test_full_stream(self):
         self.generate_activity_items()
         response = self.client.get(reverse('activitystream:get_stream'))
-        data = json.loads(response.content.decode('utf-8'))
+        data = self.get_data(response)
         self.assertEqual(len(data), 5)
         self.assertEqual([item['type'] for item in data], [
             'user:login',
@@ -64,7 +181,7 @@ class TestGetStreamView(ActivityBaseTestCase):
             'activitystream:get_stream', kwargs={
                 'models': 'auth:user',
             }))
-        data = json.loads(response.content.decode('utf-8'))
+        data = self.get_data(response)
         self.assertEqual(len(data), 5)
         self.assertEqual([item['type'] for item in data], [
             'user:login',
@@ -81,7 +198,7 @@ class TestGetStreamView(ActivityBaseTestCase):
                 'models': 'auth:user',
                 'object_id': self.foo.id,
             }))
-        data = json.loads(response.content.decode('utf-8'))
+        data = self.get_data(response)
         self.assertEqual(len(data), 3)
         self.assertEqual([item['type'] for item in data], [
             'user:logout',
@@ -94,13 +211,93 @@ class TestGetStreamView(ActivityBaseTestCase):
         response = self.client.get(reverse('activitystream:get_stream'), {
             'type': 'user:reg',
         })
-        data = json.loads(response.content.decode('utf-8'))
+        data = self.get_data(response)
         self.assertEqual(len(data), 2)
         self.assertEqual([item['type'] for item in data], [
             'user:reg',
             'user:reg',
         ])
 
+    def test_pages_through_stream(self):
+        self.generate_activity_items()
+        url = reverse('activitystream:get_stream')
+        data = self.get_data(self.client.get(url, {'limit': 2}))
+        self.assertEqual([item['type'] for item in data], [
+            'user:login',
+            'user:logout',
+        ])
+        data = self.get_data(self.client.get(url, {
+            'limit': 2,
+            'before': data[-1]['id'],
+        }))
+        self.assertEqual([item['type'] for item in data], [
+            'user:login',
+            'user:reg',
+        ])
+        newest = data[0]['id']
+        data = self.get_data(self.client.get(url, {'since': newest}))
+        self.assertEqual([item['type'] for item in data], [
+            'user:logout',
+            'user:login',
+        ])
+
+    def test_polling_misses_nothing(self):
+        url = reverse('activitystream:get_stream')
+        newest = self.get_data(self.client.get(url, {'limit': 1}))[0]['id']
+        self.generate_activity_items()
+        data = self.get_data(self.client.get(url, {
+            'since': newest,
+            'limit': 2,
+        }))
+        self.assertEqual([item['type'] for item in data], [
+            'user:login',
+            'user:logout',
+        ])
+        data = self.get_data(self.client.get(url, {
+            'since': data[-1]['id'],
+            'limit': 2,
+        }))
+        self.assertEqual([item['type'] for item in data], [
+            'user:login',
+        ])
+
+    @override_settings(ACTIVITYSTREAM_MAX_LIMIT=3)
+    def test_limit_is_capped(self):
+        self.generate_activity_items()
+        response = self.client.get(reverse('activitystream:get_stream'), {
+            'limit': 100,
+        })
+        self.assertEqual(len(self.get_data(response)), 3)
+
+    def test_rejects_bad_cursors(self):
+        response = self.client.get(reverse('activitystream:get_stream'), {
+            'before': 'soon',
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_describes_deleted_objects(self):
+        Profile.objects.filter(user=self.bar).delete()
+        self.bar.delete()
+        data = self.get_data(self.client.get(reverse(
+            'activitystream:get_stream')))
+        self.assertEqual([item['instance'] for item in data], [
+            'user: None',
+            'user: foo',
+        ])
+
+    def test_resolves_objects_in_constant_queries(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.get_data(self.client.get(reverse(
+                    'activitystream:get_stream')))
+            return len(queries)
+
+        expected = count_queries()
+        for i in range(5):
+            user = User.objects.create_user('user{}'.format(i))
+            Activity.create('user', 'login', user)
+        self.assertEqual(count_queries(), expected)
+
 
 class TestSitewideDataView(ActivityBaseTestCase):
     def test_results(self):
@@ -111,7 +308,11 @@ class TestSitewideDataView(ActivityBaseTestCase):
         data['version']['full'] = 'revno'
         self.assertEqual(len(data['version']['short']), 7)
         data['version']['short'] = 'revno'
+        self.assertEqual(sorted(data.pop('render_cache').keys()), [
+            'chars', 'hit_rate', 'hits', 'max_chars', 'max_size', 'misses',
+            'size'])
         self.assertEqual(data, {
+            u'activities': {u'user:reg': 2},
             u'adminflags': 0,
             u'ads': {u'live': 0, u'total': 0},
             u'comments': 0,
@@ -138,3 +339,90 @@ class TestSitewideDataView(ActivityBaseTestCase):
                          u'short': u'revno',
                          u'version': u'pre-release'}
         })
+
+
+class TestSiteStatistics(ActivityBaseTestCase):
+    def setUp(self):
+        refresh_statistics()
+
+    def get_stat(self, key):
+        return SiteStatistic.objects.get(key=key).value
+
+    def add_submission(self):
+        submission = Submission(
+            owner=self.foo,
+            title='Submission',
+            content_raw='Content',
+            ctime=timezone.now())
+        submission.save()
+        return submission
+
+    def test_computed_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            compute_statistics()
+        for i in range(3):
+            Group.objects.create(name='Group {}'.format(i))
+            Rating(owner=self.foo, submission=self.add_submission(),
+                   rating=i + 1).save()
+        with self.assertNumQueries(len(queries)):
+            stats = compute_statistics()
+        self.assertEqual(stats['groups.Group 2'], 0)
+        self.assertEqual(stats['ratings.total'], 3)
+        self.assertEqual(stats['ratings.3star'], 1)
+        self.assertEqual(stats['ratings.5star'], 0)
+
+    def test_read_from_snapshot(self):
+        with self.assertNumQueries(1):
+            stats = get_statistics()
+        self.assertEqual(stats['users']['all'], 2)
+        self.assertEqual(stats['activities'], {'user:reg': 2})
+
+    def test_snapshot_taken_when_missing(self):
+        SiteStatistic.objects.all().delete()
+        self.assertEqual(get_statistics()['users']['all'], 2)
+        self.assertEqual(self.get_stat('users.all'), 2)
+
+    def test_counts_created_and_deleted(self):
+        submission = self.add_submission()
+        self.assertEqual(self.get_stat('submissions'), 1)
+        User.objects.create_user('baz', is_staff=True)
+        self.assertEqual(self.get_stat('users.all'), 3)
+        self.assertEqual(self.get_stat('users.staff'), 1)
+        self.assertEqual(self.get_stat('users.superusers'), 0)
+        submission.delete()
+        self.assertEqual(self.get_stat('submissions'), 0)
+
+    def test_counts_ratings_by_stars(self):
+        rating = Rating(owner=self.foo, submission=self.add_submission(),
+                        rating=2)
+        rating.save()
+        self.assertEqual(self.get_stat('ratings.total'), 1)
+        self.assertEqual(self.get_stat('ratings.2star'), 1)
+        rating.rating = 4
+        rating.save()
+        self.assertEqual(self.get_stat('ratings.total'), 1)
+        self.assertEqual(self.get_stat('ratings.2star'), 0)
+        self.assertEqual(self.get_stat('ratings.4star'), 1)
+        rating.delete()
+        self.assertEqual(self.get_stat('ratings.total'), 0)
+        self.assertEqual(self.get_stat('ratings.4star'), 0)
+
+    def test_counts_favorites(self):
+        submission = self.add_submission()
+        self.bar.profile.favorited_submissions.add(submission)
+        self.assertEqual(self.get_stat('favorites'), 1)
+        self.bar.profile.favorited_submissions.clear()
+        self.assertEqual(self.get_stat('favorites'), 0)
+
+    def test_deleting_submission_counts_out_favorites(self):
+        submission = self.add_submission()
+        self.foo.profile.favorited_submissions.add(submission)
+        self.bar.profile.favorited_submissions.add(submission)
+        self.assertEqual(self.get_stat('favorites'), 2)
+        submission.refresh_from_db()
+        submission.delete()
+        self.assertEqual(self.get_stat('favorites'), 0)
+
+    def test_drift_does_not_go_negative(self):
+        SiteStatistic.adjust({'submissions': -1})
+        self.assertEqual(self.get_stat('submissions'), 0)
@@ -1,80 +1,113 @@
-import datetime
 import json
 
-from django.contrib.auth.models import (
-    Group,
-    User,
-)
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.http import HttpResponse
-from django.views.decorators.cache import cache_page
-from taggit.models import (
-    Tag,
-    TaggedItem,
+from django.http import (
+    HttpResponse,
+    StreamingHttpResponse,
 )
 
 from .models import Activity
-from administration.models import Flag
+from .statistics import get_statistics
+from core.prefetch import prefetch_generic
 from core.templatetags.git_revno import git_revno
-from promotion.models import (
-    Ad,
-    AdLifecycle,
-    Promotion,
-)
-from publishers.models import Publisher
-from social.models import (
-    Comment,
-    EnjoyItem,
-    Rating,
-)
-from submissions.models import (
-    Folder,
-    Submission,
-)
-from usermgmt.group_models import FriendGroup
+from honeycomb_markdown import render_cache
 
 
-def generate_stream_entry(activity):
+def generate_stream_entry(activity, objects=None):
     """Generates an entry in the JSON stream of activities.
 
     This provides more readable results in the stream.
 
     Args:
         activity: the :model:`activitystream.Activity` object
+        objects: objects fetched by `prefetch_generic`, if any; otherwise
+            the object the activity refers to is fetched on its own
 
     Returns:
         A dict containing more readable information
     """
     entry = {
+        'id': activity.id,
         'time': activity.activity_time.strftime('%Y-%m-%dT%H:%M:%S'),
         'type': activity.activity_type,
     }
     if activity.content_type:
+        if objects is None:
+            object_model = activity.object_model
+        else:
+            object_model = objects.get(
+                (activity.content_type_id, activity.object_id))
         # Just get the string representation of the object.
         entry['instance'] = "{}: {}".format(
-            activity.content_type.name, str(activity.object_model))
+            activity.content_type.name, str(object_model))
     return entry
 
 
-@cache_page(60 * 15)
+def stream_entries(stream, limit, batch_size=100, oldest_first=False):
+    """Serializes activities to a JSON list a batch at a time.
+
+    Args:
+        stream: a queryset of activities, ordered by id
+        limit: the maximum number of activities to serialize
+        batch_size: how many activities to fetch at a time
+        oldest_first: whether the stream is in ascending order of id rather
+            than descending
+
+    Yields:
+        Chunks of the JSON list
+    """
+    yield '['
+    separator = ''
+    last = None
+    while limit > 0:
+        if last is None:
+            batch = stream
+        elif oldest_first:
+            batch = stream.filter(id__gt=last)
+        else:
+            batch = stream.filter(id__lt=last)
+        batch = list(batch[:min(batch_size, limit)])
+        if not batch:
+            break
+        objects = prefetch_generic(batch)
+        yield separator + ','.join(
+            json.dumps(generate_stream_entry(activity, objects),
+                       separators=(',', ':'))
+            for activity in batch)
+        separator = ','
+        limit -= len(batch)
+        last = batch[-1].id
+    yield ']'
+
+
 def get_stream(request, models=None, object_id=None):
     """View for retrieving the activity stream.
 
     The stream may be limited to a model, a specific object, or potentially an
-    activity type.
+    activity type.  Activities are returned a page at a time, and streamed to
+    the client as they are serialized.  Pages are newest first; to fetch the
+    next page, pass the id of the last activity received as `before`.  To
+    poll for new activities, pass the id of the newest received as `since`;
+    those after it are then returned oldest first, so that after a burst of
+    more than a page of activities, the next poll carries on from the last
+    activity received without missing any.
 
     Args:
         request: the Django request object.  If `type` is in request.GET,
-            that is used on filtering the response by activity type
+            that is used on filtering the response by activity type.
+            `since` and `before` limit the stream to activities after or
+            before the given ids, and `limit` sets how many to return, up to
+            `ACTIVITYSTREAM_MAX_LIMIT`
         models: a comma separated list of models.  Each entry in the list is
             a tuple in the form of app_label:model.
         object_id: an object ID, such as a submission ID, to be passed with
             models (e.g: models=submissions:submission, object_id=1)
 
     Returns:
-        A JSON object containing the stream.
+        A streamed JSON list of activities.
     """
-    stream = Activity.objects.select_related('content_type')
+    stream = Activity.objects.select_related('content_type').order_by('-id')
 
     # Filter on certain content types if provided.
     if models:
@@ -93,75 +126,44 @@ def get_stream(request, models=None, object_id=None):
     if request.GET.get('type') is not None:
         stream = stream.filter(
             activity_type__in=request.GET['type'].split(','))
-    data = []
-    for activity in stream:
-        data.append(generate_stream_entry(activity))
-    return HttpResponse(
-        json.dumps(data, separators=[',', ':']),
+
+    # Page through the stream by id.
+    oldest_first = bool(request.GET.get('since'))
+    try:
+        if oldest_first:
+            stream = stream.filter(id__gt=int(request.GET['since'])).order_by(
+                'id')
+        if request.GET.get('before'):
+            stream = stream.filter(id__lt=int(request.GET['before']))
+        limit = min(int(request.GET.get(
+            'limit', settings.ACTIVITYSTREAM_DEFAULT_LIMIT)),
+            settings.ACTIVITYSTREAM_MAX_LIMIT)
+    except ValueError:
+        return HttpResponse(
+            json.dumps({'error': 'since, before and limit must be integers'}),
+            content_type='application/json', status=400)
+    return StreamingHttpResponse(
+        stream_entries(stream, max(limit, 0), oldest_first=oldest_first),
         content_type='application/json')
 
 
 def _get_sitewide_data():
     """Builds a dict of data surrounding the site
 
-    This function is fairly expensive and should be wrapped in a view or
-    template that caches the results.
+    Statistics are read from the snapshot taken by the refresh_statistics
+    command, in which the hottest counters are kept up to date in between.
     """
-    active_promotions = Promotion.objects.filter(
-        promotion_end_date__gte=datetime.date.today())
-    return {
-        'version': git_revno(),
-        'users': {
-            'all': User.objects.count(),
-            'staff': User.objects.filter(is_staff=True).count(),
-            'superusers': User.objects.filter(is_superuser=True).count(),
-        },
-        'groups': dict([(group.name, group.user_set.count())
-                        for group in Group.objects.all()]),
-        'submissions': Submission.objects.count(),
-        'folders': Folder.objects.count(),
-        'friendgroups': FriendGroup.objects.count(),
-        'ratings': {
-            'total': Rating.objects.count(),
-            '1star': Rating.objects.filter(rating=1).count(),
-            '2star': Rating.objects.filter(rating=2).count(),
-            '3star': Rating.objects.filter(rating=3).count(),
-            '4star': Rating.objects.filter(rating=4).count(),
-            '5star': Rating.objects.filter(rating=5).count(),
-        },
-        'favorites':
-            Activity.objects.filter(activity_type='SOCIAL_FAVORITE').count() -
-            Activity.objects.filter(activity_type='SOCIAL_UNFAVORITE').count(),
-        'enjoys': EnjoyItem.objects.count(),
-        'comments': Comment.objects.count(),
-        'tags': {
-            'tags': Tag.objects.count(),
-            'taggeditems': TaggedItem.objects.count(),
-        },
-        'publishers': Publisher.objects.count(),
-        'promotions': {
-            'all_active': active_promotions.count(),
-            'promotions':
-                active_promotions.filter(
-                    promotion_type=Promotion.PROMOTION).count(),
-            'paid_promotions':
-                active_promotions.filter(
-                    promotion_type=Promotion.PAID_PROMOTION).count(),
-            'highlight': active_promotions.filter(
-                promotion_type=Promotion.HIGHLIGHT).count(),
-        },
-        'ads': {
-            'total': Ad.objects.count(),
-            'live': AdLifecycle.objects.filter(live=True).count(),
-        },
-        'adminflags': Flag.objects.count(),
-    }
+    data = get_statistics()
+    data['version'] = git_revno()
+    return data
 
 
-@cache_page(60 * 60)
 def sitewide_data(request):
     """View for retrieving the sitewide data."""
     data = _get_sitewide_data()
+
+    # Include statistics about this process for monitoring.
+    data['render_cache'] = render_cache.get_stats()
     return HttpResponse(
         json.dumps(data, separators=[',', ':']),
         content_type='application/json')
@@ -22,9 +22,37 @@ from .forms import (
 from .models import (
     Flag,
 )
+from core.prefetch import prefetch_generic
+from social.models import Comment
+from submissions.models import Submission
 from usermgmt.models import Notification
 
 
+def prefetch_flags(flags):
+    """Loads everything needed to list flags with `list-flags-snippet.html`.
+
+    Users are joined, and flagged objects, along with what any comments among
+    them were left on, are fetched with one query per type rather than one
+    per flag.
+
+    Args:
+        flags: a queryset of flags
+
+    Returns:
+        A list of the flags
+    """
+    flags = list(flags.select_related('flagged_by__profile',
+                                      'resolved_by__profile'))
+    objects = prefetch_generic(flags, select_related={
+        Comment: ('owner__profile',),
+        Submission: ('owner',),
+    })
+    prefetch_generic(
+        [obj for obj in objects.values() if isinstance(obj, Comment)],
+        select_related={Submission: ('owner',)})
+    return flags
+
+
 @permission_required('administration.can_list_social_flags',
                      raise_exception=True)
 @permission_required('administration.can_list_content_flags',
@@ -37,7 +65,7 @@ def list_all_flags(request):
         flags = Flag.objects.filter(resolved=None)
     return render(request, 'list_flags.html', {
         'title': 'All flags',
-        'flags': flags,
+        'flags': prefetch_flags(flags),
         'tab': 'flags',
     })
 
@@ -49,7 +77,7 @@ def list_social_flags(request):
     flags = Flag.objects.filter(flag_type=Flag.SOCIAL)
     return render(request, 'list_flags.html', {
         'title': 'Social flags',
-        'flags': flags,
+        'flags': prefetch_flags(flags),
         'tab': 'flags',
     })
 
@@ -61,7 +89,7 @@ def list_content_flags(request):
     flags = Flag.objects.filter(flag_type=Flag.CONTENT)
     return render(request, 'list_flags.html', {
         'title': 'Social flags',
-        'flags': flags,
+        'flags': prefetch_flags(flags),
         'tab': 'flags',
     })
 
@@ -181,7 +209,7 @@ def list_participating_flags(request):
     flags = Flag.objects.filter(query)
     return render(request, 'list_flags.html', {
         'title': 'My flags',
-        'flags': flags,
+        'flags': prefetch_flags(flags),
         'tab': 'flags',
     })
 
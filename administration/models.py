@@ -1,6 +1,5 @@
 from __future__ import unicode_literals
 import hashlib
-import markdown
 
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -8,10 +7,14 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.urlresolvers import reverse
 from django.db import models
 
-from honeycomb_markdown import HoneycombMarkdown
+from core.models import DirtyFieldsMixin
+from honeycomb_markdown import (
+    ADMIN,
+    render,
+)
 
 
-class Application(models.Model):
+class Application(DirtyFieldsMixin, models.Model):
     PUBLISHER = 'p'
     CLAIM_PUBLISHER = 'c'
     EVENT = 'e'
@@ -68,19 +71,7 @@ class Application(models.Model):
         })
 
     def save(self, *args, **kwargs):
-        self.body_rendered = markdown.markdown(
-            self.body_raw,
-            extensions=[
-                'pymdownx.extra',
-                'markdown.extensions.codehilite',
-                'markdown.extensions.smarty',
-                'pymdownx.headeranchor',
-                'pymdownx.magiclink',
-                'pymdownx.smartsymbols',
-                'pymdownx.tilde',
-                'pymdownx.mark',
-                HoneycombMarkdown(),
-            ])
+        self.body_rendered = render(self.body_raw, ADMIN)
         super(Application, self).save(*args, **kwargs)
 
     class Meta:
@@ -100,7 +91,7 @@ class Application(models.Model):
         )
 
 
-class Flag(models.Model):
+class Flag(DirtyFieldsMixin, models.Model):
     """Represents an item flagged for administrative attention."""
     SOCIAL = 's'
     CONTENT = 'c'
@@ -149,19 +140,7 @@ class Flag(models.Model):
         })
 
     def save(self, *args, **kwargs):
-        self.body_rendered = markdown.markdown(
-            self.body_raw,
-            extensions=[
-                'pymdownx.extra',
-                'markdown.extensions.codehilite',
-                'markdown.extensions.smarty',
-                'pymdownx.headeranchor',
-                'pymdownx.magiclink',
-                'pymdownx.smartsymbols',
-                'pymdownx.tilde',
-                'pymdownx.mark',
-                HoneycombMarkdown(),
-            ])
+        self.body_rendered = render(self.body_raw, ADMIN)
         super(Flag, self).save(*args, **kwargs)
 
     def __str__(self):
@@ -183,7 +162,7 @@ class Flag(models.Model):
         )
 
 
-class Ban(models.Model):
+class Ban(DirtyFieldsMixin, models.Model):
     """Represents a temporary or permanent ban on a user."""
     # The user being banned
     user = models.ForeignKey(User)
@@ -215,19 +194,7 @@ class Ban(models.Model):
         return hashlib.sha1(hashtext.encode('utf-8')).hexdigest()
 
     def save(self, *args, **kwargs):
-        self.reason_rendered = markdown.markdown(
-            self.reason_raw,
-            extensions=[
-                'pymdownx.extra',
-                'markdown.extensions.codehilite',
-                'markdown.extensions.smarty',
-                'pymdownx.headeranchor',
-                'pymdownx.magiclink',
-                'pymdownx.smartsymbols',
-                'pymdownx.tilde',
-                'pymdownx.mark',
-                HoneycombMarkdown(),
-            ])
+        self.reason_rendered = render(self.reason_raw, ADMIN)
         super(Ban, self).save(*args, **kwargs)
 
     class Meta:
@@ -1,7 +1,9 @@
 import mock
 
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.test import tag
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from taggit.models import Tag
 
@@ -65,6 +67,35 @@ class TestListAllFlagsViewAsSuperuser(BaseFlagTestCase):
         self.assertContains(response, 'bad submission')
         self.assertContains(response, 'kinda gross')
 
+    def test_lists_flags_take_constant_queries(self):
+        def add_flags():
+            Flag(
+                flag_type=Flag.SOCIAL,
+                flagged_by=self.user,
+                object_model=self.submission1,
+                subject='bad submission',
+                body_raw='bad to the bone, really').save()
+            Flag(
+                flag_type=Flag.SOCIAL,
+                flagged_by=self.user,
+                resolved_by=self.social_mod,
+                object_model=self.user,
+                subject='bad user',
+                body_raw='just the worst').save()
+
+        add_flags()
+        self.client.login(username='superuser',
+                          password='superuser pass')
+        url = reverse('administration:list_all_flags')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        for i in range(5):
+            add_flags()
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+        self.assertContains(response, 'bad user', count=6)
+
     def test_lists_inactive_flags(self):
         Flag(
             flag_type=Flag.SOCIAL,
@@ -2,6 +2,7 @@ from django.contrib.auth.decorators import login_required
 from django.db.models import Q
 from django.shortcuts import render
 
+from .flag_views import prefetch_flags
 from .models import (
     Application,
     Ban,
@@ -69,6 +70,6 @@ def dashboard(request):
         'tab': 'dashboard',
         'title': 'Administration Dashboard',
         'applications': applications,
-        'flags': flags,
+        'flags': prefetch_flags(flags),
         'bans': bans,
     })
@@ -1,3 +1,46 @@
-# from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.utils import timezone
+
+from submissions.models import Submission
+from usermgmt.models import Profile
+
+
+class TestSuggestViews(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.foo = User.objects.create_user('foo', 'foo@example.com',
+                                           'a good password')
+        Profile(user=cls.foo).save()
+        cls.foobar = User.objects.create_user('foobar', 'foobar@example.com',
+                                              'a good password')
+        cls.foo.profile.watched_users.add(cls.foobar)
+        User.objects.create_user('bar', 'bar@example.com', 'a good password')
+        submission = Submission(owner=cls.foo, title='Submission',
+                                content_raw='Hello', ctime=timezone.now())
+        submission.save(update_content=True)
+        submission.tags.add('fox', 'foxes')
+        submission = Submission(owner=cls.foo, title='Another submission',
+                                content_raw='Hello', ctime=timezone.now())
+        submission.save(update_content=True)
+        submission.tags.add('foxes')
+
+    def get_json(self, name, prefix):
+        response = self.client.get(reverse('api:{}'.format(name)),
+                                   {'prefix': prefix})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_user_suggest(self):
+        self.assertEqual(self.get_json('user_suggest', 'fo'), [])
+        self.assertEqual(self.get_json('user_suggest', 'FOO'),
+                         ['foobar', 'foo'])
+        self.assertEqual(self.get_json('user_suggest', 'baz'), [])
+
+    def test_tag_suggest(self):
+        self.assertEqual(self.get_json('tag_suggest', 'f'), [])
+        self.assertEqual(self.get_json('tag_suggest', 'fox'),
+                         ['foxes', 'fox'])
@@ -8,4 +8,5 @@ urlpatterns = [
     url('^$', empty_view, name='url'),
     url('^$', empty_view, name='v1.url'),
     url('^user_suggest/$', views.user_suggest, name='user_suggest'),
+    url('^tag_suggest/$', views.tag_suggest, name='tag_suggest'),
 ]
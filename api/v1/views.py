@@ -1,8 +1,12 @@
 import json
 
-from django.contrib.auth.models import User
 from django.http import HttpResponse
 
+from core.suggest import (
+    tag_index,
+    user_index,
+)
+
 
 def jr(content):
     return HttpResponse(json.dumps(content, separators=[',', ':']),
@@ -13,6 +17,11 @@ def user_suggest(request):
     prefix = request.GET.get('prefix', '')
     if len(prefix) < 3:
         return jr([])
-    suggestions = [u.username for
-                   u in User.objects.filter(username__startswith=prefix)[:10]]
-    return jr(suggestions)
+    return jr(user_index.suggest(prefix, 10))
+
+
+def tag_suggest(request):
+    prefix = request.GET.get('prefix', '')
+    if len(prefix) < 2:
+        return jr([])
+    return jr(tag_index.suggest(prefix, 10))
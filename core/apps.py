@@ -5,3 +5,6 @@ from django.apps import AppConfig
 
 class AppConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        import core.signals  # noqa: F401
@@ -0,0 +1,174 @@
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends import locmem
+from django.utils.encoding import force_bytes
+
+
+# Keys longer than this, or with characters memcached does not allow, are
+# hashed.
+MAX_KEY_LENGTH = 200
+
+
+def make_key(key, key_prefix, version):
+    """Builds cache keys as `<prefix>:<version>:<key>`.
+
+    This is used as the `KEY_FUNCTION` of each cache, so that keys are safe
+    for any backend whatever goes into them.  Bumping `CACHE_VERSION` starts
+    every key afresh, such as after a deploy which changes what is cached.
+    """
+    key = '{}:{}:{}'.format(key_prefix, version, key)
+    if len(key) > MAX_KEY_LENGTH or any(
+            ord(char) < 33 or ord(char) > 126 for char in key):
+        key = '{}:{}:hashed:{}'.format(
+            key_prefix, version, hashlib.sha1(force_bytes(key)).hexdigest())
+    return key
+
+
+class LRUCache(locmem.LocMemCache):
+    """A local memory cache which discards the least recently used entries
+    when it is full.
+
+    Django's local memory cache culls entries arbitrarily, which throws out
+    hot entries as readily as cold ones.
+    """
+
+    def __init__(self, name, params):
+        # Entries are kept in order of use, most recent last.
+        locmem._caches.setdefault(name, OrderedDict())
+        super(LRUCache, self).__init__(name, params)
+
+    def _touch(self, key):
+        self._cache[key] = self._cache.pop(key)
+
+    def get(self, key, default=None, version=None, acquire_lock=True):
+        value = super(LRUCache, self).get(
+            key, default=default, version=version, acquire_lock=acquire_lock)
+        if acquire_lock:
+            internal_key = self.make_key(key, version=version)
+            with self._lock.writer():
+                if internal_key in self._cache:
+                    self._touch(internal_key)
+        return value
+
+    def _set(self, key, value, timeout=locmem.DEFAULT_TIMEOUT):
+        self._cache.pop(key, None)
+        super(LRUCache, self)._set(key, value, timeout=timeout)
+
+    def _cull(self):
+        if self._cull_frequency == 0:
+            self.clear()
+        else:
+            doomed = list(self._cache)[:max(
+                len(self._cache) // self._cull_frequency, 1)]
+            for key in doomed:
+                self._delete(key)
+
+
+def get_namespace_key(namespace):
+    return 'namespace:{}'.format(namespace)
+
+
+def get_namespace_version(namespace):
+    """Gets the current version of a namespace of keys.
+
+    Keys in a namespace include its version, so that every key in it can be
+    invalidated at once by moving to a new version, without having to know
+    what the keys are.
+
+    Args:
+        namespace: the name of the namespace
+
+    Returns:
+        A token identifying the version
+    """
+    key = get_namespace_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # Another process may have started a version first.
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def invalidate_namespaces(*namespaces):
+    """Invalidates every key in namespaces.
+
+    Args:
+        namespaces: the names of the namespaces
+    """
+    cache.set_many(dict((get_namespace_key(namespace), uuid.uuid4().hex)
+                        for namespace in namespaces), None)
+
+
+def make_namespaced_key(namespace, *parts):
+    """Builds a key in a namespace.
+
+    Args:
+        namespace: the name of the namespace
+        parts: values making up the rest of the key
+
+    Returns:
+        The key, including the namespace's current version
+    """
+    return ':'.join([namespace, get_namespace_version(namespace)] +
+                    [str(part) for part in parts])
+
+
+def get_or_compute(key, compute, timeout=None):
+    """Gets a value from the cache, computing it if need be, while making
+    sure that only one process computes it at a time.
+
+    Values are kept for `CACHE_GRACE_PERIOD` seconds past their timeout.
+    Once a value is due, the first process to ask for it takes a lock and
+    refreshes it, while others carry on with the stale value rather than
+    all recomputing it at once.  If there is no value at all, processes wait
+    up to `CACHE_LOCK_WAIT` seconds for the one holding the lock before
+    computing it themselves.
+
+    The lock is taken with `cache.add`, which the file based cache does not
+    make atomic, so under that backend two processes may now and then both
+    refresh a value.  They still store the same result.
+
+    Args:
+        key: the cache key
+        compute: a function which computes the value
+        timeout: how long, in seconds, the value is fresh for; defaults to
+            the cache's timeout
+
+    Returns:
+        The value
+    """
+    if timeout is None:
+        timeout = cache.default_timeout
+    lock_key = '{}:lock'.format(key)
+    lock_timeout = getattr(settings, 'CACHE_LOCK_TIMEOUT', 30)
+    entry = cache.get(key)
+    if entry is not None:
+        value, refresh_at = entry
+        if time.time() < refresh_at or not cache.add(
+                lock_key, True, lock_timeout):
+            return value
+        locked = True
+    else:
+        locked = cache.add(lock_key, True, lock_timeout)
+        if not locked:
+            deadline = time.time() + getattr(settings, 'CACHE_LOCK_WAIT', 2)
+            while time.time() < deadline:
+                time.sleep(0.05)
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry[0]
+    try:
+        value = compute()
+        cache.set(key, (value, time.time() + timeout),
+                  timeout + getattr(settings, 'CACHE_GRACE_PERIOD', 60))
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.utils.safestring import mark_safe
+
+from .cache import (
+    get_or_compute,
+    invalidate_namespaces,
+    make_namespaced_key,
+)
+
+
+# The kinds of activity shown in the front page's recent activity fragment
+FRONT_STREAM_TYPES = (
+    'comment:create',
+    'social:favorite',
+    'social:rate',
+    'social:enjoy',
+    'submission:create',
+    'tag:create',
+    'publisher:create',
+)
+
+
+def get_fragment_namespace(name):
+    return 'fragment:{}'.format(name)
+
+
+def invalidate_fragments(*names):
+    """Discards every cached copy of fragments, whoever they were rendered
+    for.
+
+    Args:
+        names: the names of the fragments
+    """
+    invalidate_namespaces(*[get_fragment_namespace(name) for name in names])
+
+
+def get_fragment(name, render, vary_on=()):
+    """Gets a rendered fragment, rendering it only if it is not cached.
+
+    Only one process re-renders a fragment at a time (see
+    `core.cache.get_or_compute`).
+
+    Args:
+        name: the name of the fragment
+        render: a function which renders the fragment
+        vary_on: values which the fragment differs by, if any, such as a
+            reader's visibility hash
+
+    Returns:
+        The rendered fragment
+    """
+    return mark_safe(get_or_compute(
+        make_namespaced_key(get_fragment_namespace(name), *vary_on), render,
+        timeout=getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 5)))
@@ -1,4 +1,11 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from usermgmt.models import Notification
 
 
 class Command(BaseCommand):
@@ -7,4 +14,46 @@ class Command(BaseCommand):
     This should be run from a cron job on a regular basis as specified in
     settings.py
     """
-    pass
+    help = ("Deletes notifications older than NOTIFICATION_EXPIRATION days, "
+            "counting them as expired on their targets' profiles.")
+
+    def add_arguments(self, parser):
+        """Adds arguments via argparse"""
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            type=int,
+            default=1000,
+            help='The number of notifications to delete at a time.')
+        parser.add_argument(
+            '--dry-run',
+            dest='dry_run',
+            action='store_true',
+            help='Report what would be cleared without deleting anything.')
+        parser.add_argument(
+            '--after-id',
+            dest='after_id',
+            type=int,
+            default=0,
+            help='Resume an interrupted run after the last id it reported.')
+
+    def handle(self, *args, **kwargs):
+        """Expires old notifications in batches, reporting progress."""
+        dry_run = kwargs.get('dry_run', False)
+        verb = 'would be cleared' if dry_run else 'cleared'
+        cutoff = timezone.now() - timedelta(
+            days=settings.NOTIFICATION_EXPIRATION)
+        started = time.time()
+        total = 0
+        for count, last_id in Notification.objects.expire_older_than(
+                cutoff,
+                batch_size=kwargs.get('batch_size', 1000),
+                after_id=kwargs.get('after_id', 0),
+                dry_run=dry_run):
+            total += count
+            self.stdout.write('{} notifications {} through id {}.'.format(
+                count, verb, last_id))
+        elapsed = time.time() - started
+        self.stdout.write(
+            '{} notifications {} in {:.2f}s ({:.0f} rows/sec).'.format(
+                total, verb, elapsed, total / elapsed if elapsed else 0))
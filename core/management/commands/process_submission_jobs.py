@@ -0,0 +1,59 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from submissions.processing import (
+    reclaim_stale_jobs,
+    run_pending_jobs,
+)
+
+
+class Command(BaseCommand):
+    """A command for running queued submission processing jobs.
+
+    This should be run from a cron job on a regular basis if
+    `SUBMISSION_PROCESSING_EAGER` is disabled in settings.py
+    """
+    help = ("Renders content and munges files for submissions which have "
+            "been queued for processing.")
+
+    def add_arguments(self, parser):
+        """Adds arguments via argparse"""
+        parser.add_argument(
+            '--limit',
+            dest='limit',
+            type=int,
+            default=None,
+            help='The maximum number of jobs to run.')
+        parser.add_argument(
+            '--retry-failed',
+            dest='retry_failed',
+            action='store_true',
+            help='Retry jobs which have previously failed.')
+        parser.add_argument(
+            '--max-attempts',
+            dest='max_attempts',
+            type=int,
+            default=3,
+            help='Do not retry jobs which have failed this many times.')
+        parser.add_argument(
+            '--stale-after',
+            dest='stale_after',
+            type=int,
+            default=30,
+            help='Requeue jobs which have been running for this many '
+                 'minutes, as their worker has likely died.')
+
+    def handle(self, *args, **kwargs):
+        """Requeues abandoned jobs, then drains the queue of processing
+        jobs."""
+        reclaimed = reclaim_stale_jobs(datetime.timedelta(
+            minutes=kwargs.get('stale_after', 30)))
+        if reclaimed:
+            self.stdout.write('{} stale jobs requeued.'.format(reclaimed))
+        succeeded, failed = run_pending_jobs(
+            limit=kwargs.get('limit'),
+            retry_failed=kwargs.get('retry_failed', False),
+            max_attempts=kwargs.get('max_attempts', 3))
+        self.stdout.write('{} jobs processed, {} failed.'.format(
+            succeeded, failed))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from activitystream.statistics import refresh_statistics
+
+
+class Command(BaseCommand):
+    """A command for taking a fresh snapshot of the sitewide statistics.
+
+    The hottest statistics are counted as things change, but the rest, such
+    as group membership and active promotions, are only brought up to date
+    by this command, so it should be run from a cron job on a regular basis.
+    """
+    help = "Recomputes the sitewide statistics from their source tables."
+
+    def handle(self, *args, **kwargs):
+        """Refreshes the statistics, reporting how long it took."""
+        started = time.time()
+        stats = refresh_statistics()
+        self.stdout.write('{} statistics refreshed in {:.2f}s.'.format(
+            len(stats), time.time() - started))
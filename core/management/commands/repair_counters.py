@@ -0,0 +1,196 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    Count,
+    Sum,
+)
+
+from social.models import Rating
+from submissions.models import Submission
+from tags.models import TagStatistic
+from taggit.models import (
+    Tag,
+    TaggedItem,
+)
+from usermgmt.models import (
+    Notification,
+    Profile,
+    get_notification_counter_field,
+)
+
+
+def _chunks(ids, size=500):
+    ids = list(ids)
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+class Command(BaseCommand):
+    """A command for recomputing denormalized counters.
+
+    Counters are kept up to date as things change, so this is only needed
+    after adding a counter, or to repair drift from changes made outside of
+    the ORM.
+    """
+    help = "Recomputes denormalized counters from their source tables."
+
+    def repair_favorite_counts(self):
+        """Recomputes `Submission.favorite_count`.
+
+        Favorites are counted in a single grouped query, and submissions are
+        then updated in bulk, one query per distinct count.
+
+        Returns:
+            The number of submissions whose counts were wrong
+        """
+        counts = Profile.favorited_submissions.through.objects.values(
+            'submission_id').annotate(count=Count('profile_id')).values_list(
+                'submission_id', 'count')
+        by_count = defaultdict(list)
+        for submission_id, count in counts:
+            by_count[count].append(submission_id)
+        favorited = set().union(*by_count.values())
+        repaired = 0
+        with transaction.atomic():
+            # Submissions with no favorites left
+            stale = Submission.objects.exclude(favorite_count=0).values_list(
+                'id', flat=True)
+            for chunk in _chunks(set(stale) - favorited):
+                repaired += Submission.objects.filter(id__in=chunk).update(
+                    favorite_count=0)
+            for count, ids in by_count.items():
+                for chunk in _chunks(ids):
+                    repaired += Submission.objects.filter(
+                        id__in=chunk).exclude(favorite_count=count).update(
+                            favorite_count=count)
+        return repaired
+
+    def repair_rating_totals(self):
+        """Recomputes the rating totals, average and stars on submissions.
+
+        Ratings are summed and counted in a single grouped query, and
+        submissions are then updated in bulk, one query per distinct pair of
+        sum and count.
+
+        Returns:
+            The number of submissions whose totals were wrong
+        """
+        totals = Rating.objects.values('submission_id').annotate(
+            total=Sum('rating'), count=Count('id')).values_list(
+                'submission_id', 'total', 'count')
+        by_totals = defaultdict(list)
+        for submission_id, total, count in totals:
+            by_totals[(total, count)].append(submission_id)
+        rated = set().union(*by_totals.values())
+        by_totals[(0, 0)] = set(Submission.objects.exclude(
+            rating_sum=0, rating_count=0).values_list(
+                'id', flat=True)) - rated
+        repaired = 0
+        with transaction.atomic():
+            for (total, count), ids in by_totals.items():
+                ratings = Submission.summarize_ratings(total, count)
+                for chunk in _chunks(ids):
+                    repaired += Submission.objects.filter(
+                        id__in=chunk).exclude(
+                            rating_sum=total, rating_count=count).update(
+                                rating_sum=total,
+                                rating_count=count,
+                                rating_average=ratings['average'],
+                                rating_stars=ratings['stars'])
+        return repaired
+
+    def repair_notification_counts(self):
+        """Recomputes the notification counters on profiles.
+
+        Notifications are counted by target and type in a single grouped
+        query, and each counter is then updated in bulk, one query per
+        distinct count.
+
+        Returns:
+            The number of profiles whose counters were wrong
+        """
+        fields = ['user_notification_count', 'submission_notification_count',
+                  'message_count', 'admin_notification_count']
+        counts = defaultdict(lambda: dict((field, 0) for field in fields))
+        for target_id, notification_type, count in \
+                Notification.objects.order_by().values(
+                    'target_id', 'notification_type').annotate(
+                        count=Count('id')).values_list(
+                            'target_id', 'notification_type', 'count'):
+            counts[target_id][get_notification_counter_field(
+                notification_type)] += count
+        repaired = set()
+        with transaction.atomic():
+            for field in fields:
+                by_count = defaultdict(list)
+                for target_id, user_counts in counts.items():
+                    if user_counts[field]:
+                        by_count[user_counts[field]].append(target_id)
+                for count, ids in by_count.items():
+                    for chunk in _chunks(ids):
+                        repaired.update(Profile.objects.filter(
+                            user_id__in=chunk).exclude(
+                                **{field: count}).values_list(
+                                    'id', flat=True))
+                        Profile.objects.filter(user_id__in=chunk).update(
+                            **{field: count})
+                # Users with no notifications of this kind left
+                stale = Profile.objects.exclude(**{field: 0}).values_list(
+                    'user_id', flat=True)
+                for chunk in _chunks(set(stale) - set().union(
+                        *by_count.values())):
+                    repaired.update(Profile.objects.filter(
+                        user_id__in=chunk).values_list('id', flat=True))
+                    Profile.objects.filter(user_id__in=chunk).update(
+                        **{field: 0})
+        return len(repaired)
+
+    def repair_tag_statistics(self):
+        """Recomputes the use counts of tags.
+
+        Tagged items are counted in a single grouped query, and statistics
+        are then updated in bulk, one query per distinct count.
+
+        Returns:
+            The number of tags whose counts were wrong or missing
+        """
+        counts = dict(TaggedItem.objects.order_by().values(
+            'tag_id').annotate(count=Count('id')).values_list(
+                'tag_id', 'count'))
+        by_count = defaultdict(list)
+        for tag_id, count in counts.items():
+            by_count[count].append(tag_id)
+        used = set().union(*by_count.values())
+        repaired = 0
+        with transaction.atomic():
+            missing = list(Tag.objects.filter(statistic=None).values_list(
+                'id', flat=True))
+            TagStatistic.objects.bulk_create([
+                TagStatistic(tag_id=tag_id, use_count=counts.get(tag_id, 0))
+                for tag_id in missing])
+            repaired += len(missing)
+            # Tags no longer used
+            stale = TagStatistic.objects.exclude(use_count=0).values_list(
+                'tag_id', flat=True)
+            for chunk in _chunks(set(stale) - used):
+                repaired += TagStatistic.objects.filter(
+                    tag_id__in=chunk).update(use_count=0)
+            for count, ids in by_count.items():
+                for chunk in _chunks(ids):
+                    repaired += TagStatistic.objects.filter(
+                        tag_id__in=chunk).exclude(use_count=count).update(
+                            use_count=count)
+        return repaired
+
+    def handle(self, *args, **kwargs):
+        """Repairs each counter in turn."""
+        self.stdout.write('{} favorite counts repaired.'.format(
+            self.repair_favorite_counts()))
+        self.stdout.write('{} rating totals repaired.'.format(
+            self.repair_rating_totals()))
+        self.stdout.write('{} notification counts repaired.'.format(
+            self.repair_notification_counts()))
+        self.stdout.write('{} tag statistics repaired.'.format(
+            self.repair_tag_statistics()))
@@ -1,4 +1,11 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from activitystream.rotation import rotate_activities
 
 
 class Command(BaseCommand):
@@ -7,4 +14,49 @@ class Command(BaseCommand):
     This should be run from a cron job on a regular basis as specified in
     settings.py
     """
-    pass
+    help = ("Archives activities older than ACTIVITYSTREAM_RETENTION days to "
+            "ACTIVITYSTREAM_ARCHIVE_DIR, counting them in the daily rollups, "
+            "and removes them from the stream.")
+
+    def add_arguments(self, parser):
+        """Adds arguments via argparse"""
+        parser.add_argument(
+            '--days',
+            dest='days',
+            type=int,
+            default=None,
+            help='Rotate activities older than this many days instead.')
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            type=int,
+            default=1000,
+            help='The number of activities to rotate at a time.')
+        parser.add_argument(
+            '--after-id',
+            dest='after_id',
+            type=int,
+            default=0,
+            help='Resume an interrupted run after the last id it reported.')
+
+    def handle(self, *args, **kwargs):
+        """Rotates whole days of old activities, reporting progress."""
+        days = kwargs.get('days')
+        if days is None:
+            days = settings.ACTIVITYSTREAM_RETENTION
+        # Rotate whole days so that each day's archive is written at once.
+        cutoff = timezone.localtime(timezone.now()).replace(
+            hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+        started = time.time()
+        total = 0
+        for count, last_id in rotate_activities(
+                cutoff, settings.ACTIVITYSTREAM_ARCHIVE_DIR,
+                batch_size=kwargs.get('batch_size', 1000),
+                after_id=kwargs.get('after_id', 0)):
+            total += count
+            self.stdout.write('{} activities rotated through id {}.'.format(
+                count, last_id))
+        elapsed = time.time() - started
+        self.stdout.write(
+            '{} activities rotated in {:.2f}s ({:.0f} rows/sec).'.format(
+                total, elapsed, total / elapsed if elapsed else 0))
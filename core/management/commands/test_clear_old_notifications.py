@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.utils import timezone
+from django.utils.six import StringIO
+
+from .clear_old_notifications import Command
+from usermgmt.models import (
+    Notification,
+    Profile,
+)
+
+
+@override_settings(NOTIFICATION_EXPIRATION=30)
+class TestClearOldNotificationsCommand(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.foo = User.objects.create_user('foo', 'foo@example.com',
+                                           'a good password')
+        cls.foo.profile = Profile()
+        cls.foo.profile.save()
+        cls.bar = User.objects.create_user('bar', 'bar@example.com',
+                                           'another good password')
+        cls.bar.profile = Profile()
+        cls.bar.profile.save()
+
+    def notify(self, target, days_old):
+        notification = Notification(
+            target=target,
+            source=self.bar,
+            notification_type=Notification.WATCH,
+            subject=self.bar)
+        notification.save()
+        Notification.objects.filter(pk=notification.pk).update(
+            ctime=timezone.now() - timedelta(days=days_old))
+        return notification
+
+    def test_clears_old_notifications(self):
+        self.notify(self.foo, 40)
+        self.notify(self.bar, 31)
+        recent = self.notify(self.foo, 20)
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle()
+        self.assertIn('2 notifications cleared in', out.getvalue())
+        self.assertIn('rows/sec', out.getvalue())
+        self.assertEqual(list(Notification.objects.all()), [recent])
+        self.assertEqual(Profile.objects.get(
+            user=self.foo).user_notification_count, 1)
+        self.assertEqual(Profile.objects.get(
+            user=self.bar).user_notification_count, 0)
+
+    def test_counts_expired_notifications(self):
+        self.notify(self.foo, 40)
+        self.notify(self.foo, 40)
+        self.notify(self.bar, 40)
+        Profile.objects.filter(user=self.foo).update(expired_notifications=1)
+        cmd = Command(stdout=StringIO())
+        cmd.handle()
+        self.assertEqual(Profile.objects.get(
+            user=self.foo).expired_notifications, 3)
+        self.assertEqual(Profile.objects.get(
+            user=self.bar).expired_notifications, 1)
+
+    def test_clears_in_batches(self):
+        notifications = [self.notify(self.foo, 40) for i in range(5)]
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle(batch_size=2)
+        self.assertIn(
+            '2 notifications cleared through id {}.'.format(
+                notifications[1].id), out.getvalue())
+        self.assertIn(
+            '1 notifications cleared through id {}.'.format(
+                notifications[4].id), out.getvalue())
+        self.assertIn('5 notifications cleared in', out.getvalue())
+        self.assertEqual(Notification.objects.count(), 0)
+        self.assertEqual(Profile.objects.get(
+            user=self.foo).expired_notifications, 5)
+
+    def test_updates_expired_counts_once_per_batch(self):
+        for i in range(3):
+            self.notify(self.foo, 40)
+            self.notify(self.bar, 40)
+        cutoff = timezone.now() - timedelta(days=30)
+        batches = Notification.objects.expire_older_than(cutoff)
+        # Fetching, deleting, the counters, the expired counts and the
+        # savepoints around the changes.
+        with self.assertNumQueries(8):
+            self.assertEqual(next(batches)[0], 6)
+
+    def test_resumes_after_id(self):
+        first = self.notify(self.foo, 40)
+        self.notify(self.foo, 40)
+        cmd = Command(stdout=StringIO())
+        cmd.handle(after_id=first.id)
+        self.assertEqual(list(Notification.objects.all()), [first])
+        self.assertEqual(Profile.objects.get(
+            user=self.foo).expired_notifications, 1)
+
+    def test_dry_run(self):
+        self.notify(self.foo, 40)
+        self.notify(self.foo, 40)
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle(dry_run=True, batch_size=1)
+        self.assertIn('2 notifications would be cleared in', out.getvalue())
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(Profile.objects.get(
+            user=self.foo).expired_notifications, 0)
+
+    def test_nothing_to_clear(self):
+        self.notify(self.foo, 1)
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle()
+        self.assertIn('0 notifications cleared in', out.getvalue())
+        self.assertEqual(Notification.objects.count(), 1)
@@ -0,0 +1,78 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.utils import timezone
+from django.utils.six import StringIO
+
+from .process_submission_jobs import Command
+from submissions.models import (
+    ProcessingJob,
+    Submission,
+)
+from submissions.processing import queue_processing
+from usermgmt.models import Profile
+
+
+@override_settings(SUBMISSION_PROCESSING_EAGER=False)
+class TestProcessSubmissionJobsCommand(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.foo = User.objects.create_user('foo', 'foo@example.com',
+                                           'a good password')
+        cls.foo.profile = Profile()
+        cls.foo.profile.save()
+
+    def create_job(self, title):
+        submission = Submission(
+            owner=self.foo,
+            title=title,
+            content_raw='Content for {}'.format(title),
+            ctime=timezone.now())
+        submission.save()
+        return queue_processing(submission)
+
+    def test_drains_queue(self):
+        self.create_job('Submission 1')
+        self.create_job('Submission 2')
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle(limit=None, retry_failed=False, max_attempts=3)
+        self.assertIn('2 jobs processed, 0 failed.', out.getvalue())
+        self.assertEqual(ProcessingJob.objects.filter(
+            status=ProcessingJob.DONE).count(), 2)
+        self.assertEqual(Submission.objects.filter(
+            processing_status=Submission.READY).count(), 2)
+
+    def test_limit(self):
+        self.create_job('Submission 1')
+        self.create_job('Submission 2')
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle(limit=1, retry_failed=False, max_attempts=3)
+        self.assertIn('1 jobs processed, 0 failed.', out.getvalue())
+        self.assertEqual(ProcessingJob.objects.filter(
+            status=ProcessingJob.PENDING).count(), 1)
+
+    def test_requeues_stale_jobs(self):
+        stale = self.create_job('Submission 1')
+        running = self.create_job('Submission 2')
+        ProcessingJob.objects.filter(pk=stale.pk).update(
+            status=ProcessingJob.RUNNING,
+            mtime=timezone.now() - datetime.timedelta(minutes=31))
+        ProcessingJob.objects.filter(pk=running.pk).update(
+            status=ProcessingJob.RUNNING, mtime=timezone.now())
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle(limit=None, retry_failed=False, max_attempts=3,
+                   stale_after=30)
+        self.assertIn('1 stale jobs requeued.', out.getvalue())
+        self.assertIn('1 jobs processed, 0 failed.', out.getvalue())
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ProcessingJob.DONE)
+        self.assertEqual(stale.attempts, 2)
+        running.refresh_from_db()
+        self.assertEqual(running.status, ProcessingJob.RUNNING)
@@ -0,0 +1,34 @@
+from django.contrib.auth.models import (
+    Group,
+    User,
+)
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from .refresh_statistics import Command
+from activitystream.models import SiteStatistic
+
+
+class TestRefreshStatisticsCommand(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.foo = User.objects.create_user('foo', 'foo@example.com',
+                                           'a good password')
+        cls.group = Group.objects.create(name='Moderators')
+        cls.group.user_set.add(cls.foo)
+
+    def test_takes_snapshot(self):
+        stdout = StringIO()
+        Command(stdout=stdout).handle()
+        self.assertIn('statistics refreshed in', stdout.getvalue())
+        stats = dict(SiteStatistic.objects.values_list('key', 'value'))
+        self.assertEqual(stats['users.all'], 1)
+        self.assertEqual(stats['groups.Moderators'], 1)
+
+    def test_replaces_stale_statistics(self):
+        SiteStatistic.objects.create(key='users.all', value=50)
+        SiteStatistic.objects.create(key='groups.Old', value=3)
+        Command(stdout=StringIO()).handle()
+        stats = dict(SiteStatistic.objects.values_list('key', 'value'))
+        self.assertEqual(stats['users.all'], 1)
+        self.assertNotIn('groups.Old', stats)
@@ -0,0 +1,134 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.six import StringIO
+
+from .repair_counters import Command
+from social.models import Rating
+from submissions.models import Submission
+from tags.models import TagStatistic
+from usermgmt.models import (
+    Notification,
+    Profile,
+)
+
+
+class TestRepairCountersCommand(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.foo = User.objects.create_user('foo', 'foo@example.com',
+                                           'a good password')
+        cls.foo.profile = Profile()
+        cls.foo.profile.save()
+        cls.bar = User.objects.create_user('bar', 'bar@example.com',
+                                           'another good password')
+        cls.bar.profile = Profile()
+        cls.bar.profile.save()
+        cls.submission1 = Submission(
+            owner=cls.foo,
+            title='Submission 1',
+            content_raw='Content for submission 1',
+            ctime=timezone.now())
+        cls.submission1.save()
+        cls.submission2 = Submission(
+            owner=cls.foo,
+            title='Submission 2',
+            content_raw='Content for submission 2',
+            ctime=timezone.now())
+        cls.submission2.save()
+        cls.foo.profile.favorited_submissions.add(cls.submission1)
+        cls.bar.profile.favorited_submissions.add(
+            cls.submission1, cls.submission2)
+
+    def test_repairs_favorite_counts(self):
+        Submission.objects.filter(pk=self.submission1.pk).update(
+            favorite_count=0)
+        Submission.objects.filter(pk=self.submission2.pk).update(
+            favorite_count=5)
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle()
+        self.assertIn('2 favorite counts repaired.', out.getvalue())
+        self.assertEqual(Submission.objects.get(
+            pk=self.submission1.pk).favorite_count, 2)
+        self.assertEqual(Submission.objects.get(
+            pk=self.submission2.pk).favorite_count, 1)
+
+    def test_resets_counts_without_favorites(self):
+        Profile.favorited_submissions.through.objects.filter(
+            submission=self.submission2).delete()
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle()
+        self.assertIn('1 favorite counts repaired.', out.getvalue())
+        self.assertEqual(Submission.objects.get(
+            pk=self.submission2.pk).favorite_count, 0)
+
+    def test_leaves_correct_counts_alone(self):
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle()
+        self.assertIn('0 favorite counts repaired.', out.getvalue())
+        self.assertIn('0 rating totals repaired.', out.getvalue())
+        self.assertIn('0 notification counts repaired.', out.getvalue())
+        self.assertIn('0 tag statistics repaired.', out.getvalue())
+
+    def test_repairs_rating_totals(self):
+        Rating(owner=self.bar, submission=self.submission1, rating=2).save()
+        Rating(owner=self.foo, submission=self.submission1, rating=5).save()
+        Submission.objects.filter(pk=self.submission1.pk).update(
+            rating_sum=0, rating_count=0, rating_average=0, rating_stars='')
+        Submission.objects.filter(pk=self.submission2.pk).update(
+            rating_sum=4, rating_count=1)
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle()
+        self.assertIn('2 rating totals repaired.', out.getvalue())
+        submission1 = Submission.objects.get(pk=self.submission1.pk)
+        self.assertEqual(submission1.rating_sum, 7)
+        self.assertEqual(submission1.rating_count, 2)
+        self.assertEqual(float(submission1.rating_average), 3.5)
+        self.assertEqual(submission1.rating_stars,
+                         '&#x2605;&#x2605;&#x2605;&#x2606;&#x2606;')
+        submission2 = Submission.objects.get(pk=self.submission2.pk)
+        self.assertEqual(submission2.rating_sum, 0)
+        self.assertEqual(submission2.rating_count, 0)
+
+    def test_repairs_notification_counts(self):
+        for notification_type in [Notification.FAVORITE,
+                                  Notification.FAVORITE,
+                                  Notification.MESSAGE]:
+            Notification(
+                target=self.foo,
+                source=self.bar,
+                notification_type=notification_type,
+                subject=self.submission1).save()
+        Profile.objects.filter(user=self.foo).update(
+            submission_notification_count=0, message_count=3)
+        Profile.objects.filter(user=self.bar).update(
+            user_notification_count=4)
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle()
+        self.assertIn('2 notification counts repaired.', out.getvalue())
+        self.assertEqual(
+            Profile.objects.get(user=self.foo).get_notifications_counts(), {
+                'user_notifications': 0,
+                'submission_notifications': 2,
+                'messages': 1,
+                'admin_notifications': 0,
+            })
+        self.assertEqual(Profile.objects.get(
+            user=self.bar).user_notification_count, 0)
+
+    def test_repairs_tag_statistics(self):
+        self.submission1.tags.add('red', 'green')
+        self.submission2.tags.add('red')
+        TagStatistic.objects.filter(tag__name='red').update(use_count=7)
+        TagStatistic.objects.filter(tag__name='green').delete()
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle()
+        self.assertIn('2 tag statistics repaired.', out.getvalue())
+        self.assertEqual(dict(TagStatistic.objects.values_list(
+            'tag__name', 'use_count')), {'red': 2, 'green': 1})
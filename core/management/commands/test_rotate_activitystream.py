@@ -0,0 +1,119 @@
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.utils import timezone
+from django.utils.six import StringIO
+
+from .rotate_activitystream import Command
+from activitystream.models import (
+    Activity,
+    ActivityRollup,
+)
+from activitystream.rotation import get_archive_path
+
+
+class TestRotateActivitystreamCommand(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.foo = User.objects.create_user('foo', 'foo@example.com',
+                                           'a good password')
+
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        settings = override_settings(
+            ACTIVITYSTREAM_ARCHIVE_DIR=self.archive_dir,
+            ACTIVITYSTREAM_RETENTION=30)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        Activity.objects.all().delete()
+
+    def log(self, activity_type, days_old):
+        app, action = activity_type.split(':')
+        activity = Activity.create(app, action, self.foo)
+        Activity.objects.filter(pk=activity.pk).update(
+            activity_time=timezone.now() - timedelta(days=days_old))
+        return Activity.objects.get(pk=activity.pk)
+
+    def read_archive(self, activity):
+        path = get_archive_path(
+            self.archive_dir,
+            timezone.localtime(activity.activity_time).date())
+        with gzip.open(path, 'rb') as archive:
+            return [json.loads(line.decode('utf-8'))
+                    for line in archive.read().splitlines()]
+
+    def test_rotates_old_activities(self):
+        old = self.log('user:login', 40)
+        self.log('user:logout', 40)
+        recent = self.log('user:login', 1)
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle()
+        self.assertIn('2 activities rotated in', out.getvalue())
+        self.assertIn('rows/sec', out.getvalue())
+        self.assertEqual(list(Activity.objects.all()), [recent])
+        entries = self.read_archive(old)
+        self.assertEqual([entry['type'] for entry in entries],
+                         ['user:login', 'user:logout'])
+        self.assertEqual(entries[0]['id'], old.id)
+        self.assertEqual(entries[0]['model'], 'auth:user')
+        self.assertEqual(entries[0]['object_id'], self.foo.id)
+
+    def test_counts_rotated_activities(self):
+        old = self.log('user:login', 40)
+        self.log('user:login', 40)
+        self.log('user:logout', 40)
+        cmd = Command(stdout=StringIO())
+        cmd.handle(batch_size=1)
+        date = timezone.localtime(old.activity_time).date()
+        self.assertEqual(
+            list(ActivityRollup.objects.values_list(
+                'date', 'activity_type', 'count')),
+            [(date, 'user:login', 2), (date, 'user:logout', 1)])
+        self.assertEqual(len(self.read_archive(old)), 3)
+
+    def test_appends_to_archives(self):
+        first = self.log('user:login', 40)
+        Command(stdout=StringIO()).handle()
+        second = self.log('user:logout', 40)
+        Activity.objects.filter(pk=second.pk).update(
+            activity_time=first.activity_time)
+        Command(stdout=StringIO()).handle()
+        self.assertEqual(
+            [entry['id'] for entry in self.read_archive(first)],
+            [first.id, second.id])
+        self.assertEqual(ActivityRollup.get_totals(),
+                         {'user:login': 1, 'user:logout': 1})
+
+    def test_rotates_in_batches(self):
+        activities = [self.log('user:login', 40) for i in range(3)]
+        out = StringIO()
+        cmd = Command(stdout=out)
+        cmd.handle(batch_size=2)
+        self.assertIn('2 activities rotated through id {}.'.format(
+            activities[1].id), out.getvalue())
+        self.assertIn('1 activities rotated through id {}.'.format(
+            activities[2].id), out.getvalue())
+        self.assertEqual(Activity.objects.count(), 0)
+
+    def test_resumes_after_id(self):
+        first = self.log('user:login', 40)
+        self.log('user:login', 40)
+        cmd = Command(stdout=StringIO())
+        cmd.handle(after_id=first.id)
+        self.assertEqual(list(Activity.objects.all()), [first])
+
+    def test_days(self):
+        self.log('user:login', 10)
+        cmd = Command(stdout=StringIO())
+        cmd.handle(days=5)
+        self.assertEqual(Activity.objects.count(), 0)
@@ -1,12 +1,14 @@
 from __future__ import print_function
-import markdown
 import os
 
 from django.contrib.flatpages.models import FlatPage
 from django.contrib.sites.models import Site
 from django.core.management.base import BaseCommand
 
-from honeycomb_markdown import HoneycombMarkdown
+from honeycomb_markdown import (
+    ADMIN,
+    render,
+)
 
 
 def mockable_print(val):
@@ -54,22 +56,11 @@ class Command(BaseCommand):
             page_name = '/{}/'.format(
                 '/'.join(page.split('-')).replace('.md', ''))
 
-            # Render any markdown.
+            # Render any markdown.  Flatpages are rendered rarely enough that
+            # there's no point in caching them.
             with open(filename, 'r') as f:
                 content = f.read()
-            rendered_content = markdown.markdown(
-                content,
-                extensions=[
-                    'pymdownx.extra',
-                    'markdown.extensions.codehilite',
-                    'markdown.extensions.smarty',
-                    'pymdownx.headeranchor',
-                    'pymdownx.magiclink',
-                    'pymdownx.smartsymbols',
-                    'pymdownx.tilde',
-                    'pymdownx.mark',
-                    HoneycombMarkdown(),
-                ])
+            rendered_content = render(content, ADMIN, use_cache=False)
 
             # Retrieve the flatpage and update it.
             try:
@@ -1,5 +1,103 @@
 from __future__ import unicode_literals
 
-# from django.db import models
+from django.db.models import (
+    F,
+    FileField,
+)
 
-# Create your models here.
+
+class DirtyFieldsMixin(object):
+    """A mixin for models which tracks changes to fields loaded from the
+    database, so that saving an existing object only writes the columns that
+    have actually changed.
+
+    This is intended for models with large text fields, where rewriting the
+    whole row to bump a counter is wasteful.  Objects constructed in Python
+    rather than loaded from the database are saved in full.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(DirtyFieldsMixin, cls).from_db(
+            db, field_names, values)
+        instance._reset_tracked_fields()
+        return instance
+
+    def _get_tracked_value(self, field):
+        value = getattr(self, field.attname)
+        if isinstance(field, FileField):
+            # Compare files by name, treating uncommitted uploads as changes.
+            return (value.name, getattr(value, '_committed', True))
+        return value
+
+    def _get_loaded_fields(self):
+        # Deferred fields are not in the instance dict and are skipped so that
+        # checking them does not cause a query.
+        return [field for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname in self.__dict__]
+
+    def _reset_tracked_fields(self):
+        self._tracked_fields = dict(
+            (field.attname, self._get_tracked_value(field))
+            for field in self._get_loaded_fields())
+
+    def get_dirty_fields(self):
+        """Gets the names of fields which have changed since loading.
+
+        Returns:
+            A list of field attribute names, or None if changes are not being
+            tracked for this object
+        """
+        if not hasattr(self, '_tracked_fields'):
+            return None
+        return [field.attname for field in self._get_loaded_fields()
+                if field.attname not in self._tracked_fields or
+                self._tracked_fields[field.attname] !=
+                self._get_tracked_value(field)]
+
+    def save(self, *args, **kwargs):
+        """Overridden save method.
+
+        If no `update_fields` are specified and the object was loaded from the
+        database, only the changed fields are written, along with any fields
+        set on every save (`auto_now`).  If nothing has changed, no query is
+        made and no `pre_save` or `post_save` signals are sent, so nothing is
+        recorded in the activity stream either.
+        """
+        if ('update_fields' not in kwargs and
+                not kwargs.get('force_insert') and
+                not self._state.adding):
+            dirty_fields = self.get_dirty_fields()
+            if dirty_fields:
+                dirty_fields += [
+                    field.attname for field in self._meta.concrete_fields
+                    if getattr(field, 'auto_now', False) and
+                    field.attname not in dirty_fields]
+            if dirty_fields is not None:
+                kwargs['update_fields'] = dirty_fields
+        super(DirtyFieldsMixin, self).save(*args, **kwargs)
+        if hasattr(self, '_tracked_fields'):
+            self._reset_tracked_fields()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super(DirtyFieldsMixin, self).refresh_from_db(*args, **kwargs)
+        self._reset_tracked_fields()
+
+    def increment(self, field_name, amount=1):
+        """Atomically increments a counter field.
+
+        The database is updated with an `F()` expression, so concurrent
+        increments are not lost, and the field on this object is adjusted to
+        match without being marked as changed.
+
+        Args:
+            field_name: the name of the field to increment
+            amount: the amount by which to increment it; may be negative
+        """
+        type(self)._default_manager.filter(pk=self.pk).update(
+            **{field_name: F(field_name) + amount})
+        field = self._meta.get_field(field_name)
+        value = getattr(self, field.attname) + amount
+        setattr(self, field.attname, value)
+        if hasattr(self, '_tracked_fields'):
+            self._tracked_fields[field.attname] = value
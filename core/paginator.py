@@ -0,0 +1,191 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPaginator(object):
+    """Paginates a queryset by position rather than by page number.
+
+    Pages are fetched with a filter on the ordering fields of the first or
+    last object of the neighbouring page (keyset pagination), so deep pages
+    are as cheap to fetch as the first one, and pages stay stable as new
+    objects are added.  The ordering must be unique, so it should end with
+    the primary key, and its fields must not be nullable.
+
+    Counting every result can be as expensive as fetching a page, so counts
+    may be capped with `count_limit`.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('ctime', 'id'),
+                 count_limit=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = ordering
+        self.count_limit = count_limit
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-'))
+            for name in ordering]
+
+    def _get_count(self):
+        if not hasattr(self, '_count'):
+            if self.count_limit is None:
+                self._count = self.queryset.count()
+            else:
+                self._count = self.queryset[:self.count_limit + 1].count()
+        return self._count
+
+    @property
+    def count(self):
+        """The number of results, capped at `count_limit` if set."""
+        if self.count_is_approximate:
+            return self.count_limit
+        return self._get_count()
+
+    @property
+    def count_is_approximate(self):
+        """Whether there are more results than `count_limit`."""
+        return (self.count_limit is not None and
+                self._get_count() > self.count_limit)
+
+    def encode_cursor(self, obj):
+        """Gets the cursor token for an object's position in the ordering."""
+        values = [field.value_to_string(obj) for field in self.fields]
+        return base64.urlsafe_b64encode(
+            json.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, token):
+        """Gets the ordering values from a cursor token.
+
+        Raises:
+            InvalidCursor: if the token is malformed
+        """
+        try:
+            token = str(token)
+            values = json.loads(base64.urlsafe_b64decode(
+                token + '=' * (-len(token) % 4)).decode('utf-8'))
+            if len(values) != len(self.fields):
+                raise InvalidCursor(token)
+            return [field.to_python(value)
+                    for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, UnicodeError, binascii.Error,
+                ValidationError):
+            raise InvalidCursor(token)
+
+    def _filter_from(self, values, forward):
+        """Builds the filter for objects after (or before) a position."""
+        query = Q()
+        for i, name in enumerate(self.ordering):
+            descending = name.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            clause = Q(**{'{}__{}'.format(name.lstrip('-'), lookup):
+                          values[i]})
+            for prev_name, value in zip(self.ordering[:i], values[:i]):
+                clause &= Q(**{prev_name.lstrip('-'): value})
+            query |= clause
+        return query
+
+    def _reverse_ordering(self):
+        return [name[1:] if name.startswith('-') else '-' + name
+                for name in self.ordering]
+
+    def page(self, after=None, before=None):
+        """Gets a page of results.
+
+        Invalid or stale tokens fall back to the first page, or to the last
+        page if there is nothing after the given position.
+
+        Args:
+            after: a cursor token; the page starts after this position
+            before: a cursor token; the page ends before this position
+
+        Returns:
+            A `CursorPage`
+        """
+        try:
+            if after:
+                values = self.decode_cursor(after)
+                objects = list(self.queryset.order_by(*self.ordering).filter(
+                    self._filter_from(values, True))[:self.per_page + 1])
+                if objects:
+                    return CursorPage(
+                        objects[:self.per_page], self,
+                        has_next=len(objects) > self.per_page,
+                        has_previous=True)
+                return self.last_page()
+            if before:
+                values = self.decode_cursor(before)
+                objects = list(self.queryset.order_by(
+                    *self._reverse_ordering()).filter(
+                        self._filter_from(values, False))[:self.per_page + 1])
+                if objects:
+                    return CursorPage(
+                        list(reversed(objects[:self.per_page])), self,
+                        has_next=True,
+                        has_previous=len(objects) > self.per_page)
+        except InvalidCursor:
+            pass
+        return self.first_page()
+
+    def first_page(self):
+        objects = list(self.queryset.order_by(
+            *self.ordering)[:self.per_page + 1])
+        return CursorPage(objects[:self.per_page], self,
+                          has_next=len(objects) > self.per_page,
+                          has_previous=False)
+
+    def last_page(self):
+        objects = list(self.queryset.order_by(
+            *self._reverse_ordering())[:self.per_page + 1])
+        return CursorPage(list(reversed(objects[:self.per_page])), self,
+                          has_next=False,
+                          has_previous=len(objects) > self.per_page)
+
+
+class CursorPage(object):
+    """A page of results from a `CursorPaginator`."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return '<Cursor page of {} objects>'.format(len(self))
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_token(self):
+        """The token for the following page, or None if there is none."""
+        if self._has_next and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_token(self):
+        """The token for the preceding page, or None if there is none."""
+        if self._has_previous and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0])
@@ -0,0 +1,52 @@
+def prefetch_generic(instances, field='object_model', select_related=None):
+    """Loads the objects a generic foreign key refers to across a list of
+    instances, with one query per content type rather than one per instance.
+
+    Fetched objects are cached on the instances, so that accessing the
+    generic foreign key no longer makes a query.  Unlike
+    `prefetch_related`, this leaves instances whose objects have been
+    deleted untouched; such instances still look up their object if it is
+    accessed, so callers which must avoid that can use the returned dict.
+
+    Args:
+        instances: a list of model instances sharing a generic foreign key
+        field: the name of the generic foreign key
+        select_related: an optional dict of models to the relations to join
+            when fetching objects of that model
+
+    Returns:
+        A dict of (content type id, object id) pairs to the objects fetched
+    """
+    if not instances:
+        return {}
+    select_related = select_related or {}
+    gfk = getattr(type(instances[0]), field)
+    ct_attname = type(instances[0])._meta.get_field(
+        gfk.ct_field).get_attname()
+
+    # Group object ids by content type.
+    ids_by_ctype = {}
+    for instance in instances:
+        ct_id = getattr(instance, ct_attname)
+        object_id = getattr(instance, gfk.fk_field)
+        if ct_id is not None and object_id is not None:
+            ids_by_ctype.setdefault(ct_id, set()).add(object_id)
+
+    objects = {}
+    for ct_id, ids in ids_by_ctype.items():
+        model = gfk.get_content_type(id=ct_id).model_class()
+        if model is None:
+            # The model has been removed from the site.
+            continue
+        queryset = model._base_manager.all()
+        if model in select_related:
+            queryset = queryset.select_related(*select_related[model])
+        for object_id, obj in queryset.in_bulk(ids).items():
+            objects[(ct_id, object_id)] = obj
+
+    for instance in instances:
+        obj = objects.get((getattr(instance, ct_attname),
+                           getattr(instance, gfk.fk_field)))
+        if obj is not None:
+            setattr(instance, gfk.cache_attr, obj)
+    return objects
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Runs tests against the dummy cache, whichever profile is configured.
+
+    Tests then need no cache server and never see each other's entries.
+    Tests of caching itself override CACHES with a local memory cache.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super(TestRunner, self).setup_test_environment(**kwargs)
+        self._cache_settings = override_settings(CACHES={
+            'default': dict(settings.CACHES['default'],
+                            **settings.CACHE_PROFILES['dummy']),
+        })
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_settings.disable()
+        super(TestRunner, self).teardown_test_environment(**kwargs)
@@ -2,6 +2,7 @@ from django.utils import timezone
 from haystack import indexes
 
 from submissions.models import Submission
+from submissions.utils import prefetch_for_listing
 
 
 class SubmissionIndex(indexes.SearchIndex, indexes.Indexable):
@@ -17,3 +18,7 @@ class SubmissionIndex(indexes.SearchIndex, indexes.Indexable):
         """Used when the entire index for model is updated."""
         return self.get_model().objects.filter(
             ctime__lte=timezone.now())
+
+    def read_queryset(self, using=None):
+        """Used when loading search results for display."""
+        return prefetch_for_listing(self.get_model()._default_manager.all())
@@ -0,0 +1,99 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+from taggit.models import (
+    Tag,
+    TaggedItem,
+)
+
+from .fragments import (
+    FRONT_STREAM_TYPES,
+    invalidate_fragments,
+)
+from .suggest import (
+    tag_index,
+    user_index,
+)
+from activitystream.recorder import activities_written
+from submissions.models import Submission
+from usermgmt.models import Profile
+
+
+@receiver(post_save, sender=Submission)
+def invalidate_front_submissions(sender, **kwargs):
+    """Invalidates the front page's recent submissions when a submission is
+    saved."""
+    invalidate_fragments('front-submissions')
+
+
+@receiver(post_delete, sender=Submission)
+def invalidate_front_on_submission_delete(sender, **kwargs):
+    """Invalidates the front page when a submission is deleted, as it may
+    appear in both the recent submissions and the recent activity."""
+    invalidate_fragments('front-submissions', 'front-activity')
+
+
+@receiver(activities_written)
+def invalidate_front_activity(sender, activities, **kwargs):
+    """Invalidates the front page's recent activity when activities it shows
+    are written."""
+    if any(activity.activity_type in FRONT_STREAM_TYPES
+           for activity in activities):
+        invalidate_fragments('front-activity')
+
+
+@receiver(post_save, sender=User)
+def add_suggested_user(sender, instance, created, **kwargs):
+    """Adds new users to the username suggestions."""
+    if created:
+        user_index.add(instance.username)
+
+
+@receiver(post_delete, sender=User)
+def remove_suggested_user(sender, instance, **kwargs):
+    """Removes deleted users from the username suggestions."""
+    user_index.remove(instance.username)
+
+
+@receiver(m2m_changed, sender=Profile.watched_users.through)
+def rank_suggested_users(sender, instance, action, reverse, pk_set, **kwargs):
+    """Ranks users in the username suggestions as they are watched and
+    unwatched."""
+    if (action not in ('post_add', 'post_remove') or reverse or
+            not pk_set or not user_index.loaded):
+        return
+    delta = 1 if action == 'post_add' else -1
+    for username in User.objects.filter(pk__in=pk_set).values_list(
+            'username', flat=True):
+        user_index.adjust(username, delta)
+
+
+@receiver(post_save, sender=Tag)
+def add_suggested_tag(sender, instance, created, **kwargs):
+    """Adds new tags to the tag suggestions."""
+    if created:
+        tag_index.add(instance.name)
+
+
+@receiver(post_delete, sender=Tag)
+def remove_suggested_tag(sender, instance, **kwargs):
+    """Removes deleted tags from the tag suggestions."""
+    tag_index.remove(instance.name)
+
+
+@receiver(post_save, sender=TaggedItem)
+def rank_tagged_suggestion(sender, instance, created, **kwargs):
+    """Ranks tags in the tag suggestions as items are tagged."""
+    if created and tag_index.loaded:
+        tag_index.adjust(instance.tag.name, 1)
+
+
+@receiver(post_delete, sender=TaggedItem)
+def rank_untagged_suggestion(sender, instance, **kwargs):
+    """Ranks tags in the tag suggestions as items are untagged."""
+    if tag_index.loaded:
+        tag_index.adjust(instance.tag.name, -1)
@@ -11,6 +11,11 @@ $(function () {
       .focus()
   });
 
+  $(document).on('click', '.load-replies', function(evt) {
+    evt.preventDefault();
+    loadReplies($(this));
+  });
+
   $('.user_suggest input').on('keyup', function(evt) {
     var prefix = $(this).val();
     if (prefix.length < 3) {
@@ -48,3 +53,18 @@ function updateUserSuggest(prefix, data) {
     input.val($(this).text());
   })
 }
+
+function loadReplies(link) {
+  var url = link.attr('href');
+  $.getJSON(url, function(data) {
+    var replies = $(data.html);
+    link.before(replies);
+    replies.find('[data-toggle="tooltip"]').tooltip();
+    if (data.next) {
+      link.attr('href', url.split('?')[0] + '?after=' +
+        encodeURIComponent(data.next));
+    } else {
+      link.remove();
+    }
+  });
+}
@@ -0,0 +1,218 @@
+from bisect import (
+    bisect_left,
+    insort,
+)
+import heapq
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count
+from taggit.models import Tag
+
+from .cache import (
+    get_namespace_key,
+    get_namespace_version,
+)
+
+
+class PrefixIndex(object):
+    """An in-memory index of names for suggesting them as they are typed.
+
+    Names are kept in a list sorted case-insensitively, so that the names
+    starting with a prefix are found with a binary search rather than a scan
+    of the table, and ranked by a popularity score.
+
+    Each process keeps its own copy, loaded from the database the first time
+    it is needed.  Names added or removed in one process are applied there in
+    place, and logged in the cache under a new version of the index's
+    namespace, so that other processes apply the same changes rather than
+    reload their copies.  A process only reloads when it has fallen behind by
+    more than the log holds, or when its copy is `SUGGEST_INDEX_TIMEOUT`
+    seconds old.  Scores elsewhere may lag until then, as may every change
+    when the cache does not keep values, as with the dummy cache.
+    """
+
+    # The most changes kept in the log for other processes to apply
+    LOG_LENGTH = 100
+
+    def __init__(self, namespace, load):
+        """Creates an index.
+
+        Args:
+            namespace: the name of the index's cache namespace
+            load: a function which returns (name, score) pairs for every name
+                in the index
+        """
+        self.namespace = namespace
+        self._load = load
+        self._lock = threading.Lock()
+        self._entries = []
+        self._scores = {}
+        self._version = None
+        self._loaded_at = None
+
+    def reset(self):
+        """Discards the index, so that it is loaded afresh when next used."""
+        with self._lock:
+            self._entries = []
+            self._scores = {}
+            self._loaded_at = None
+
+    @property
+    def loaded(self):
+        """Whether this process has loaded the index."""
+        return self._loaded_at is not None
+
+    @property
+    def _log_key(self):
+        return '{}:log'.format(get_namespace_key(self.namespace))
+
+    def _is_fresh(self):
+        timeout = getattr(settings, 'SUGGEST_INDEX_TIMEOUT', 60 * 5)
+        return self.loaded and time.time() - self._loaded_at < timeout
+
+    def _is_current(self):
+        if not self._is_fresh():
+            return False
+        # If the cache keeps no version, there are no changes to apply.
+        version = cache.get(get_namespace_key(self.namespace))
+        return version is None or version == self._version
+
+    def _catch_up(self):
+        # Applies the changes logged since this copy's version, if they are
+        # all still in the log.
+        if not self._is_fresh():
+            return False
+        log = dict((previous, change) for previous, change in
+                   cache.get(self._log_key) or [])
+        version = cache.get(get_namespace_key(self.namespace))
+        changes = []
+        current = self._version
+        while current != version:
+            if current not in log or len(changes) > len(log):
+                return False
+            current, action, name, score = log[current]
+            changes.append((action, name, score))
+        for action, name, score in changes:
+            if action == 'add':
+                self._add(name, score)
+            else:
+                self._remove(name)
+        self._version = version
+        return True
+
+    def _ensure_loaded(self):
+        if self._is_current():
+            return
+        with self._lock:
+            # Another thread may have brought the index up to date while this
+            # one waited for the lock.
+            if self._is_current() or self._catch_up():
+                return
+            version = get_namespace_version(self.namespace)
+            scores = dict((name, score or 0) for name, score in self._load())
+            self._entries = sorted((name.lower(), name) for name in scores)
+            self._scores = scores
+            self._version = version
+            self._loaded_at = time.time()
+
+    def _add(self, name, score):
+        if name not in self._scores:
+            insort(self._entries, (name.lower(), name))
+        self._scores[name] = score
+
+    def _remove(self, name):
+        if self._scores.pop(name, None) is not None:
+            self._entries.remove((name.lower(), name))
+
+    def _changed(self, action, name, score=0):
+        # Log the change for other processes to apply.  Changes logged at the
+        # same moment by two processes may lose one of them from the log, in
+        # which case other processes pick it up when they next reload.
+        key = get_namespace_key(self.namespace)
+        previous = cache.get(key)
+        version = uuid.uuid4().hex
+        if previous is not None:
+            log = cache.get(self._log_key) or []
+            log.append((previous, (version, action, name, score)))
+            cache.set(self._log_key, log[-self.LOG_LENGTH:], None)
+        cache.set(key, version, None)
+        # A copy which was behind catches up on its next use instead.
+        if previous is None or previous == self._version:
+            self._version = version
+
+    def add(self, name, score=0):
+        """Adds a name to the index.
+
+        Args:
+            name: the name to add
+            score: the name's popularity
+        """
+        with self._lock:
+            # If the index is not loaded, the name is read when it is.
+            if self.loaded:
+                self._add(name, score)
+            self._changed('add', name, score)
+
+    def remove(self, name):
+        """Removes a name from the index.
+
+        Args:
+            name: the name to remove
+        """
+        with self._lock:
+            self._remove(name)
+            self._changed('remove', name)
+
+    def adjust(self, name, delta):
+        """Adjusts the popularity of a name in this process's copy.
+
+        Args:
+            name: the name whose score changes
+            delta: the amount to change the score by
+        """
+        if not self.loaded:
+            # The score will be read when the index is loaded.
+            return
+        with self._lock:
+            if name in self._scores:
+                self._scores[name] = max(self._scores[name] + delta, 0)
+
+    def suggest(self, prefix, limit=10):
+        """Suggests names starting with a prefix, most popular first.
+
+        Args:
+            prefix: the start of the name, in any case
+            limit: the most names to suggest
+
+        Returns:
+            A list of names, ordered by popularity and then alphabetically
+        """
+        self._ensure_loaded()
+        prefix = prefix.lower()
+        entries = self._entries
+        start = bisect_left(entries, (prefix,))
+        end = bisect_left(entries, (prefix + u'\uffff',), start)
+        scores = self._scores
+        return [name for _, name in heapq.nsmallest(
+            limit, entries[start:end],
+            key=lambda entry: (-scores.get(entry[1], 0), entry))]
+
+
+def load_users():
+    """Loads usernames, scored by how many users watch them."""
+    return User.objects.annotate(
+        popularity=Count('watched_by')).values_list('username', 'popularity')
+
+
+def load_tags():
+    """Loads tag names, scored by how many items are tagged with them."""
+    return Tag.objects.values_list('name', 'statistic__use_count')
+
+
+user_index = PrefixIndex('suggest-users', load_users)
+tag_index = PrefixIndex('suggest-tags', load_tags)
@@ -1,5 +1,51 @@
+import time
+
+from markdown import Markdown
+import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import (
+    cache,
+    caches,
+)
 from django.core.urlresolvers import reverse
-from django.test import TestCase
+from django.db import connection
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from taggit.models import Tag
+
+from .cache import (
+    MAX_KEY_LENGTH,
+    get_namespace_version,
+    get_or_compute,
+    invalidate_namespaces,
+    make_key,
+    make_namespaced_key,
+)
+from .paginator import CursorPaginator
+from .prefetch import prefetch_generic
+from .suggest import (
+    PrefixIndex,
+    tag_index,
+    user_index,
+)
+from .views import render_recent_submissions
+from activitystream.models import Activity
+from honeycomb_markdown import (
+    ADMIN,
+    FULL,
+    LITE,
+    RenderCache,
+    get_renderer,
+    render,
+    render_cache,
+)
+from submissions.models import Submission
+from usermgmt.models import Profile
 
 
 class TestFrontView(TestCase):
@@ -7,8 +53,630 @@ class TestFrontView(TestCase):
         response = self.client.get(reverse('core:front'))
         self.assertEqual(response.status_code, 200)
 
+    def test_recent_submissions_take_constant_queries(self):
+        foo = User.objects.create_user('foo', 'foo@example.com',
+                                       'a good password')
+        Profile(user=foo, display_name='Mx Foo Bar').save()
+
+        def add_submissions(count):
+            for i in range(count):
+                submission = Submission(
+                    owner=foo,
+                    title='Listed submission {}'.format(i),
+                    content_raw='Listed',
+                    ctime=timezone.now())
+                submission.save(update_content=True)
+                submission.tags.add('listed', 'listed-{}'.format(i))
+                foo.profile.favorited_submissions.add(submission)
+            # Only count queries for the submission list, not the activity
+            # stream beside it.
+            Activity.objects.all().delete()
+
+        add_submissions(2)
+        self.client.get(reverse('core:front'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('core:front'))
+        add_submissions(8)
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(reverse('core:front'))
+        self.assertContains(response, 'Listed submission 7')
+
+
+class TestFrontViewFragments(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.foo = User.objects.create_user('foo', 'foo@example.com',
+                                           'a good password')
+        Profile(user=cls.foo, display_name='Mx Foo Bar',
+                can_see_adult_submissions=True).save()
+
+    def setUp(self):
+        settings = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'test-fragments',
+            },
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def add_submission(self, title, **kwargs):
+        submission = Submission(
+            owner=self.foo,
+            title=title,
+            content_raw='Content',
+            ctime=timezone.now(),
+            **kwargs)
+        submission.save(update_content=True)
+        return submission
+
+    def test_fragments_shared(self):
+        self.add_submission('Shared submission')
+        self.client.get(reverse('core:front'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('core:front'))
+        self.assertContains(response, 'Shared submission')
+
+    def test_new_submissions_shown(self):
+        self.client.get(reverse('core:front'))
+        self.add_submission('New submission')
+        response = self.client.get(reverse('core:front'))
+        self.assertContains(response, 'New submission')
+
+    def test_readers_see_their_own_submissions(self):
+        self.add_submission('Adult submission', adult_rating=True)
+        # Only look for the submission among recent submissions.
+        Activity.objects.all().delete()
+        response = self.client.get(reverse('core:front'))
+        self.assertNotContains(response, 'Adult submission')
+        self.client.login(username='foo', password='a good password')
+        response = self.client.get(reverse('core:front'))
+        self.assertContains(response, 'Adult submission')
+        self.assertContains(response, 'Welcome, Mx Foo Bar')
+        self.client.logout()
+        response = self.client.get(reverse('core:front'))
+        self.assertNotContains(response, 'Adult submission')
+        self.assertNotContains(response, 'Welcome, Mx Foo Bar')
+
+    def test_readers_with_same_context_share_submissions(self):
+        self.add_submission('Shared submission')
+        for username in ('bar', 'baz'):
+            user = User.objects.create_user(
+                username, '{}@example.com'.format(username),
+                'a good password')
+            Profile(user=user).save()
+        with mock.patch('core.views.render_recent_submissions',
+                        wraps=render_recent_submissions) as render:
+            for username in ('bar', 'baz'):
+                self.client.login(username=username,
+                                  password='a good password')
+                response = self.client.get(reverse('core:front'))
+                self.assertContains(response, 'Shared submission')
+        self.assertEqual(render.call_count, 1)
+
+    def test_shown_activities_invalidate(self):
+        submission = self.add_submission('Submission')
+        namespace = 'fragment:front-activity'
+        version = get_namespace_version(namespace)
+        Activity.create('user', 'login', self.foo)
+        self.assertEqual(get_namespace_version(namespace), version)
+        Activity.create('social', 'enjoy', submission)
+        self.assertNotEqual(get_namespace_version(namespace), version)
+
 
 class TestFlatpageListView(TestCase):
     def test_renders(self):
         response = self.client.get(reverse('core:flatpage_list'))
         self.assertEqual(response.status_code, 200)
+
+
+class TestMarkdownRender(TestCase):
+    def test_full_strips_tags(self):
+        self.assertEqual(
+            render('<script>alert(1)</script>*foo*', FULL),
+            '<p>alert(1)<em>foo</em></p>')
+
+    def test_admin_keeps_tags(self):
+        self.assertEqual(
+            render('<div class="x">foo</div>', ADMIN),
+            '<div class="x">foo</div>')
+
+    def test_lite_skips_user_links(self):
+        self.assertEqual(render('~foo', LITE), '<p>~foo</p>')
+        self.assertIn('name-user-link', render('~foo', FULL))
+
+    def test_renderer_reused_and_reset(self):
+        self.assertIs(get_renderer(FULL), get_renderer(FULL))
+        self.assertIsNot(get_renderer(FULL), get_renderer(LITE))
+
+        # Footnotes from one render must not leak into the next
+        self.assertIn('footnote', render('foo[^1]\n\n[^1]: bar', FULL))
+        self.assertNotIn('footnote', render('baz', FULL))
+
+
+class TestMarkdownRenderCache(TestCase):
+    def setUp(self):
+        render_cache.clear()
+
+    def test_cached_render_reused(self):
+        with mock.patch.object(Markdown, 'convert') as mock_convert:
+            mock_convert.return_value = '<p>rendered</p>'
+            self.assertEqual(render('foo', FULL), '<p>rendered</p>')
+            self.assertEqual(render('foo', FULL), '<p>rendered</p>')
+        self.assertEqual(mock_convert.call_count, 1)
+        stats = render_cache.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_keyed_on_profile_and_text(self):
+        render('foo', FULL)
+        render('foo', LITE)
+        render('bar', FULL)
+        self.assertEqual(render_cache.get_stats()['misses'], 3)
+        self.assertNotEqual(RenderCache.get_key('foo', FULL),
+                            RenderCache.get_key('foo', LITE))
+
+    def test_skip_cache(self):
+        render('foo', FULL, use_cache=False)
+        self.assertEqual(render_cache.get_stats()['misses'], 0)
+        self.assertEqual(render_cache.get_stats()['size'], 0)
+
+    def test_size_bounded(self):
+        cache = RenderCache(2)
+        cache.set('a', '1')
+        cache.set('b', '2')
+        cache.get('a')
+        cache.set('c', '3')
+        self.assertEqual(cache.get_stats()['size'], 2)
+
+        # The least recently used entry is evicted; the dummy cache backend
+        # won't have it either.
+        self.assertEqual(cache.get('a'), '1')
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('c'), '3')
+
+    def test_length_bounded(self):
+        cache = RenderCache(10, max_chars=5, max_entry_chars=4)
+        cache.set('a', '12')
+        cache.set('b', '34')
+        cache.set('c', '56')
+        self.assertEqual(cache.get_stats()['size'], 2)
+        self.assertEqual(cache.get_stats()['chars'], 4)
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.get('c'), '56')
+
+        # Renders over the entry limit are not kept in process.
+        cache.set('d', '12345')
+        self.assertEqual(cache.get_stats()['size'], 2)
+        self.assertEqual(cache.get('d'), None)
+
+
+class TestDirtyFieldsMixin(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.foo = User.objects.create_user('foo', 'foo@example.com',
+                                           'a good password')
+        cls.foo.profile = Profile()
+        cls.foo.profile.save()
+        cls.submission = Submission(
+            owner=cls.foo,
+            title='Submission 1',
+            content_raw='Content',
+            content_rendered='<p>Content</p>',
+            ctime=timezone.now())
+        cls.submission.save(update_content=True)
+
+    def test_constructed_objects_not_tracked(self):
+        self.assertEqual(self.submission.get_dirty_fields(), None)
+
+    def test_only_changed_fields_saved(self):
+        submission = Submission.objects.get(pk=self.submission.pk)
+        self.assertEqual(submission.get_dirty_fields(), [])
+        submission.hidden = True
+        self.assertEqual(submission.get_dirty_fields(), ['hidden'])
+        with CaptureQueriesContext(connection) as queries:
+            submission.save(update_content=True)
+        updates = [q['sql'] for q in queries.captured_queries
+                   if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"hidden"', updates[0])
+        self.assertNotIn('"content_rendered"', updates[0])
+        self.assertEqual(submission.get_dirty_fields(), [])
+        self.assertTrue(Submission.objects.get(pk=submission.pk).hidden)
+
+    def test_unchanged_object_not_saved(self):
+        submission = Submission.objects.get(pk=self.submission.pk)
+        with self.assertNumQueries(0):
+            submission.save(update_content=True)
+
+    def test_deferred_fields_not_loaded(self):
+        submission = Submission.objects.defer('content_raw').get(
+            pk=self.submission.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(submission.get_dirty_fields(), [])
+
+    def test_file_fields(self):
+        submission = Submission.objects.get(pk=self.submission.pk)
+        submission.icon = 'uploads/foo.png'
+        self.assertEqual(submission.get_dirty_fields(), ['icon'])
+
+    def test_increment(self):
+        submission = Submission.objects.get(pk=self.submission.pk)
+        other = Submission.objects.get(pk=self.submission.pk)
+        submission.increment('views')
+        other.increment('views', 2)
+        self.assertEqual(submission.views, 1)
+        self.assertEqual(submission.get_dirty_fields(), [])
+        self.assertEqual(Submission.objects.get(pk=submission.pk).views, 3)
+
+    def test_refresh_from_db(self):
+        submission = Submission.objects.get(pk=self.submission.pk)
+        Submission.objects.filter(pk=submission.pk).update(views=5)
+        submission.refresh_from_db()
+        self.assertEqual(submission.views, 5)
+        self.assertEqual(submission.get_dirty_fields(), [])
+
+
+class TestCursorPaginator(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('foo', 'foo@example.com',
+                                            'a good password')
+        # Share ctimes between submissions to make sure ids break ties.
+        now = timezone.now()
+        cls.submissions = []
+        for i in range(7):
+            submission = Submission(owner=cls.user,
+                                    title='Submission {}'.format(i),
+                                    ctime=now - timezone.timedelta(
+                                        minutes=i // 2))
+            submission.save(update_content=True)
+            cls.submissions.append(submission)
+        cls.ordered = sorted(cls.submissions, key=lambda s: (s.ctime, s.id))
+
+    def get_paginator(self, **kwargs):
+        return CursorPaginator(Submission.objects.all(), 3, **kwargs)
+
+    def test_first_page(self):
+        page = self.get_paginator().page()
+        self.assertEqual(list(page), self.ordered[:3])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+        self.assertIsNone(page.previous_token)
+
+    def test_walk_forward_and_back(self):
+        paginator = self.get_paginator()
+        page = paginator.page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.page(after=page.next_token)
+            seen += list(page)
+        self.assertEqual(seen, self.ordered)
+        page = paginator.page(before=page.previous_token)
+        self.assertEqual(list(page), self.ordered[3:6])
+        page = paginator.page(before=page.previous_token)
+        self.assertEqual(list(page), self.ordered[:3])
+        self.assertFalse(page.has_previous())
+
+    def test_descending(self):
+        paginator = self.get_paginator(ordering=('-ctime', '-id'))
+        page = paginator.page()
+        page = paginator.page(after=page.next_token)
+        self.assertEqual(list(page), list(reversed(self.ordered))[3:6])
+
+    def test_stale_cursor_shows_last_page(self):
+        paginator = self.get_paginator()
+        token = paginator.encode_cursor(self.ordered[-1])
+        page = paginator.page(after=token)
+        self.assertEqual(list(page), self.ordered[4:])
+        self.assertFalse(page.has_next())
+
+    def test_invalid_cursor_shows_first_page(self):
+        paginator = self.get_paginator()
+        for token in ('garbage', 'WzFd', '!!'):
+            self.assertEqual(list(paginator.page(after=token)),
+                             self.ordered[:3])
+
+    def test_page_query_does_not_count(self):
+        paginator = self.get_paginator()
+        with CaptureQueriesContext(connection) as queries:
+            paginator.page(after=paginator.page().next_token)
+        self.assertEqual(len(queries), 2)
+        for query in queries:
+            self.assertNotIn('COUNT', query['sql'])
+
+    def test_count(self):
+        paginator = self.get_paginator()
+        self.assertEqual(paginator.count, 7)
+        self.assertFalse(paginator.count_is_approximate)
+
+    def test_count_limit(self):
+        paginator = self.get_paginator(count_limit=5)
+        self.assertEqual(paginator.count, 5)
+        self.assertTrue(paginator.count_is_approximate)
+
+
+class TestPrefetchGeneric(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.foo = User.objects.create_user('foo', 'foo@example.com',
+                                           'a good password')
+        Profile(user=cls.foo, display_name='Mx Foo Bar').save()
+        cls.submissions = []
+        for i in range(3):
+            submission = Submission(
+                owner=cls.foo,
+                title='Submission {}'.format(i),
+                content_raw='Content',
+                ctime=timezone.now())
+            submission.save(update_content=True)
+            cls.submissions.append(submission)
+        Activity.objects.all().delete()
+        for submission in cls.submissions:
+            Activity.create('submission', 'create', submission)
+        Activity.create('user', 'reg', cls.foo)
+
+    def test_one_query_per_type(self):
+        activities = list(Activity.objects.order_by('id'))
+        with self.assertNumQueries(2):
+            objects = prefetch_generic(activities)
+        self.assertEqual(len(objects), 4)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [activity.object_model for activity in activities],
+                self.submissions + [self.foo])
+
+    def test_select_related(self):
+        activities = list(Activity.objects.order_by('id'))
+        prefetch_generic(activities, select_related={
+            Submission: ('owner__profile',),
+        })
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                activities[0].object_model.owner.profile.display_name,
+                'Mx Foo Bar')
+
+    def test_deleted_objects_left_out(self):
+        deleted = self.submissions[0]
+        Submission.objects.filter(id=deleted.id).delete()
+        activities = list(Activity.objects.filter(
+            activity_type='submission:create').order_by('id'))
+        objects = prefetch_generic(activities)
+        self.assertEqual(len(objects), 2)
+        self.assertNotIn((activities[0].content_type_id, deleted.id),
+                         objects)
+        # The activity still refers to what it was about.
+        self.assertEqual(activities[0].object_id, deleted.id)
+        self.assertIsNotNone(activities[0].content_type_id)
+
+    def test_empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(prefetch_generic([]), {})
+
+
+class CacheTestCase(TestCase):
+    cache_settings = {
+        'BACKEND': 'core.cache.LRUCache',
+        'LOCATION': 'test-cache',
+        'KEY_FUNCTION': 'core.cache.make_key',
+    }
+
+    def setUp(self):
+        settings = override_settings(CACHES={'default': self.cache_settings})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+
+
+class TestMakeKey(TestCase):
+    def test_prefix_and_version(self):
+        self.assertEqual(make_key('foo', 'honeycomb', 2), 'honeycomb:2:foo')
+
+    def test_unsafe_keys_hashed(self):
+        for key in ('groups.Some group', 'x' * MAX_KEY_LENGTH):
+            made = make_key(key, 'honeycomb', 1)
+            self.assertTrue(made.startswith('honeycomb:1:hashed:'))
+            self.assertNotIn(' ', made)
+            self.assertNotEqual(made, make_key(key + 'y', 'honeycomb', 1))
+
+
+class TestTestRunner(TestCase):
+    def test_runs_tests_against_dummy_cache(self):
+        cache.set('foo', 'bar')
+        self.assertIsNone(cache.get('foo'))
+
+
+class TestLRUCache(CacheTestCase):
+    cache_settings = dict(CacheTestCase.cache_settings, **{
+        'LOCATION': 'test-lru-cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 3,
+            'CULL_FREQUENCY': 3,
+        },
+    })
+
+    def test_discards_least_recently_used(self):
+        lru = caches['default']
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.set('c', 3)
+        lru.get('a')
+        lru.set('d', 4)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get_many(['a', 'c', 'd']),
+                         {'a': 1, 'c': 3, 'd': 4})
+
+
+class TestNamespaces(CacheTestCase):
+    def test_invalidate(self):
+        key = make_namespaced_key('things', 1)
+        self.assertEqual(make_namespaced_key('things', 1), key)
+        other = make_namespaced_key('others', 1)
+        invalidate_namespaces('things')
+        self.assertNotEqual(make_namespaced_key('things', 1), key)
+        self.assertEqual(make_namespaced_key('others', 1), other)
+
+
+@override_settings(CACHE_GRACE_PERIOD=60, CACHE_LOCK_WAIT=0)
+class TestGetOrCompute(CacheTestCase):
+    def setUp(self):
+        super(TestGetOrCompute, self).setUp()
+        self.compute = mock.Mock(side_effect=[1, 2, 3])
+
+    def test_computes_once(self):
+        self.assertEqual(get_or_compute('key', self.compute, 60), 1)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 1)
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_refreshes_due_values(self):
+        get_or_compute('key', self.compute, 60)
+        with mock.patch('core.cache.time.time',
+                        return_value=time.time() + 61):
+            self.assertEqual(get_or_compute('key', self.compute, 60), 2)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 2)
+
+    def test_stale_value_used_while_refreshing(self):
+        get_or_compute('key', self.compute, 60)
+        cache.add('key:lock', True)
+        with mock.patch('core.cache.time.time',
+                        return_value=time.time() + 61):
+            self.assertEqual(get_or_compute('key', self.compute, 60), 1)
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_computes_if_lock_holder_is_slow(self):
+        cache.add('key:lock', True)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 1)
+        # The lock is still the other process's to release.
+        self.assertTrue(cache.get('key:lock'))
+
+    def test_lock_released_on_error(self):
+        compute = mock.Mock(side_effect=ValueError)
+        with self.assertRaises(ValueError):
+            get_or_compute('key', compute, 60)
+        self.assertIsNone(cache.get('key:lock'))
+
+
+class TestPrefixIndex(CacheTestCase):
+    def setUp(self):
+        super(TestPrefixIndex, self).setUp()
+        self.names = [('Foxtrot', 1), ('fox', 5), ('foxglove', 5),
+                      ('bar', 9)]
+        self.index = PrefixIndex('things', lambda: self.names)
+        for index in (user_index, tag_index):
+            index.reset()
+            self.addCleanup(index.reset)
+
+    def test_suggest_by_popularity(self):
+        self.assertEqual(self.index.suggest('FOX'),
+                         ['fox', 'foxglove', 'Foxtrot'])
+        self.assertEqual(self.index.suggest('fox', 2), ['fox', 'foxglove'])
+        self.assertEqual(self.index.suggest('foxt'), ['Foxtrot'])
+        self.assertEqual(self.index.suggest('zebra'), [])
+
+    def test_loads_once(self):
+        self.index.suggest('fox')
+        self.names = []
+        self.assertEqual(self.index.suggest('bar'), ['bar'])
+
+    def test_add_remove_adjust(self):
+        self.index.suggest('fox')
+        self.index.add('foxy', 2)
+        self.index.remove('foxglove')
+        self.index.adjust('Foxtrot', 10)
+        self.assertEqual(self.index.suggest('fox'),
+                         ['Foxtrot', 'fox', 'foxy'])
+
+    def test_reloads_once_when_waiting_for_lock(self):
+        self.index.suggest('fox')
+        invalidate_namespaces('things')
+        load = mock.Mock(return_value=self.names)
+        self.index._load = load
+        # Another thread reloads the index while this one waits for the lock.
+        with mock.patch.object(self.index, '_is_current',
+                               side_effect=[False, True]):
+            self.index.suggest('fox')
+        self.assertEqual(load.call_count, 0)
+
+    def test_reloads_when_changed_elsewhere(self):
+        self.index.suggest('fox')
+        self.names = [('foxes', 1)]
+        invalidate_namespaces('things')
+        self.assertEqual(self.index.suggest('fox'), ['foxes'])
+
+    def test_applies_changes_made_elsewhere(self):
+        other = PrefixIndex('things', lambda: self.names)
+        other.suggest('fox')
+        self.index.suggest('fox')
+        self.index.add('foxy', 2)
+        self.index.remove('foxglove')
+        other._load = mock.Mock(return_value=[])
+        self.assertEqual(other.suggest('fox'), ['fox', 'foxy', 'Foxtrot'])
+        self.assertEqual(other._load.call_count, 0)
+
+    def test_reloads_when_behind_the_log(self):
+        other = PrefixIndex('things', lambda: self.names)
+        other.suggest('fox')
+        self.index.suggest('fox')
+        with mock.patch.object(PrefixIndex, 'LOG_LENGTH', 1):
+            self.index.add('foxy', 2)
+            self.index.add('foxier', 1)
+        self.names = [('foxes', 1)]
+        self.assertEqual(other.suggest('fox'), ['foxes'])
+
+    @override_settings(SUGGEST_INDEX_TIMEOUT=60)
+    def test_reloads_when_old(self):
+        self.index.suggest('fox')
+        self.names = [('foxes', 1)]
+        with mock.patch('core.suggest.time.time',
+                        return_value=time.time() + 61):
+            self.assertEqual(self.index.suggest('fox'), ['foxes'])
+
+    def test_users(self):
+        foo = User.objects.create_user('foo', 'foo@example.com',
+                                       'a good password')
+        Profile(user=foo).save()
+        User.objects.create_user('foobar', 'foobar@example.com',
+                                 'a good password')
+        self.assertEqual(user_index.suggest('foo'), ['foo', 'foobar'])
+        foobaz = User.objects.create_user('foobaz', 'foobaz@example.com',
+                                          'a good password')
+        foo.profile.watched_users.add(foobaz)
+        with self.assertNumQueries(0):
+            self.assertEqual(user_index.suggest('foo'),
+                             ['foobaz', 'foo', 'foobar'])
+        foobaz.delete()
+        self.assertEqual(user_index.suggest('foo'), ['foo', 'foobar'])
+
+    def test_tags(self):
+        foo = User.objects.create_user('foo', 'foo@example.com',
+                                       'a good password')
+        submission = Submission(owner=foo, title='Submission',
+                                content_raw='Hello', ctime=timezone.now())
+        submission.save(update_content=True)
+        submission.tags.add('fox')
+        Tag.objects.create(name='foxes', slug='foxes')
+        self.assertEqual(tag_index.suggest('fo'), ['fox', 'foxes'])
+        submission.tags.add('foxes', 'fur')
+        submission.tags.remove('fox')
+        with self.assertNumQueries(0):
+            self.assertEqual(tag_index.suggest('f'), ['foxes', 'fur', 'fox'])
+        Tag.objects.get(name='fox').delete()
+        self.assertEqual(tag_index.suggest('fox'), ['foxes'])
+
+
+class TestPrefixIndexWithoutCache(TestCase):
+    def setUp(self):
+        user_index.reset()
+        self.addCleanup(user_index.reset)
+
+    def test_loads_once(self):
+        User.objects.create_user('foo', 'foo@example.com', 'a good password')
+        self.assertEqual(user_index.suggest('fo'), ['foo'])
+        with self.assertNumQueries(0):
+            self.assertEqual(user_index.suggest('fo'), ['foo'])
+            self.assertEqual(user_index.suggest('f'), ['foo'])
+        User.objects.create_user('foobar', 'foobar@example.com',
+                                 'a good password')
+        with self.assertNumQueries(0):
+            self.assertEqual(user_index.suggest('fo'), ['foo', 'foobar'])
@@ -3,20 +3,77 @@ import random
 from django.conf import settings
 from django.core.urlresolvers import reverse
 from django.shortcuts import render
+from django.template.loader import render_to_string
 from django.views.decorators.cache import cache_page
 
+from .fragments import (
+    FRONT_STREAM_TYPES,
+    get_fragment,
+)
+from .prefetch import prefetch_generic
 from activitystream.models import Activity
 from activitystream.views import _get_sitewide_data
+from social.models import (
+    Comment,
+    Rating,
+)
 from submissions.models import Submission
 from submissions.utils import (
-    filters_for_anonymous_user,
-    filters_for_authenticated_user,
+    VisibilityContext,
+    prefetch_for_listing,
 )
 
 
-@cache_page(60 * 5)
+def render_recent_submissions(visibility):
+    """Renders the front page's list of recent submissions.
+
+    The list is shared between readers who see the same submissions, so
+    readers' own submissions are filtered like anyone else's.
+
+    Args:
+        visibility: the `VisibilityContext` of the reader
+    """
+    recent_submissions = prefetch_for_listing(Submission.objects.filter(
+        visibility.get_filters(own=False))).order_by('-ctime')[:10]
+    return render_to_string('front-submissions-snippet.html', {
+        'recent_submissions': recent_submissions,
+    })
+
+
+def render_recent_activity():
+    """Renders the front page's stream of recent activity."""
+    static_stream = list(Activity.objects.filter(
+        activity_type__in=FRONT_STREAM_TYPES)[:10])
+    # Load what the activities refer to, and what the comments among those
+    # were left on, with one query per type.
+    objects = prefetch_generic(static_stream, select_related={
+        Comment: ('owner__profile',),
+        Rating: ('submission__owner__profile',),
+        Submission: ('owner__profile',),
+    })
+    prefetch_generic(
+        [obj for obj in objects.values() if isinstance(obj, Comment)],
+        select_related={Submission: ('owner',)})
+    return render_to_string('front-activity-snippet.html', {
+        'static_stream': static_stream,
+    })
+
+
+def render_sitewide_data():
+    """Renders the front page's overview of sitewide data."""
+    return render_to_string('front-sitewide-snippet.html', {
+        'static_sitewide_data': _get_sitewide_data(),
+    })
+
+
 def front(request):
-    """View for the front page of the site."""
+    """View for the front page of the site.
+
+    The page is assembled from separately cached fragments.  Recent activity
+    and sitewide data are the same for everyone, and recent submissions are
+    shared between readers who can see the same submissions, leaving only
+    the greeting to be rendered for each reader.
+    """
     # Provide logged-in users with a greeting as the subtitle
     greetings = settings.GREETINGS if hasattr(settings, 'GREETINGS') else [
         'Good to see you out and about',
@@ -27,38 +84,19 @@ def front(request):
         'Hope your writing is going well',
         "Keep on keepin' on"
     ]
-
-    # Get a list of activities on the site for a static activity stream
-    # TODO replace this with a dynamic fetch for better caching
-    # @makyo 2016-11-06 #52
-    static_stream = Activity.objects.filter(
-        activity_type__in=[
-            'comment:create',
-            'social:favorite',
-            'social:rate',
-            'social:enjoy',
-            'submission:create',
-            'tag:create',
-            'publisher:create',
-        ])[:10]
-
-    # Get a list of recent submissions on the site
-    recent_submissions = Submission.objects.filter(
-        filters_for_authenticated_user(request.user) if
-        request.user.is_authenticated() else filters_for_anonymous_user()
-    ).order_by('-ctime')[:10]
-
-    # Get sitewide data for a static overview of the site
-    # TODO replace this with a dynamic fetch for better caching
-    # @makyo 2016-11-06 #52
-    static_sitewide_data = _get_sitewide_data()
+    visibility = VisibilityContext.for_reader(request.user)
     title = 'Welcome, {}'.format(request.user.profile.get_display_name()) \
         if request.user.is_authenticated else ''
     return render(request, 'front.html', {
         'greetings': greetings,
-        'static_sitewide_data': static_sitewide_data,
-        'static_stream': static_stream,
-        'recent_submissions': recent_submissions,
+        'recent_submissions': get_fragment(
+            'front-submissions',
+            lambda: render_recent_submissions(visibility),
+            vary_on=[visibility.get_hash()]),
+        'recent_activity': get_fragment(
+            'front-activity', render_recent_activity),
+        'sitewide_data': get_fragment(
+            'front-sitewide', render_sitewide_data),
         'title': title,
         'subtitle': random.choice(greetings),
     })
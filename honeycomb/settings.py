@@ -80,6 +80,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'honeycomb.wsgi.application'
 
+TEST_RUNNER = 'core.runner.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/1.10/ref/settings/#databases
@@ -179,24 +181,78 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-# Caching mechanisms
-CACHES = {
-    # Enable this backend for no caching.
-    'default': {
+# Caching mechanisms.  Choose a profile with CACHE_PROFILE, or the
+# HONEYCOMB_CACHE_PROFILE environment variable:
+#  - dummy: no caching
+#  - locmem: a local memory cache for each process, which discards the least
+#    recently used entries when full.  Invalidation only reaches the process
+#    which made the change, so this is only safe with a single process.
+#  - file (the default): a cache on disk, shared between processes on one
+#    machine.  The cache/ directory is ignored by git.  Adding a key is not
+#    atomic, so the locks which keep processes from refreshing the same value
+#    at once may occasionally be taken twice.
+#  - memcached, redis: a cache shared between machines.  Redis needs the
+#    django-redis package.
+# Tests run against the dummy cache (see core.runner.TestRunner), and tests of
+# caching itself override CACHES with a local memory cache.
+# TODO production should use memcached or redis
+CACHE_PROFILES = {
+    'dummy': {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
     },
-    # Enable this backend for default caching in local memory.
-    # 'default': {
-    #     'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    #     'LOCATION': 'dev-cache',
-    # }
-    # TODO production should use memcached
-    # 'default': {
-    #     'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
-    #     'LOCATION': '127.0.0.1:11211',
-    # }
+    'locmem': {
+        'BACKEND': 'core.cache.LRUCache',
+        'LOCATION': 'honeycomb',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211',
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    },
+}
+CACHE_PROFILE = os.environ.get('HONEYCOMB_CACHE_PROFILE', 'file')
+
+# Bump the version to start every cache key afresh.
+CACHE_VERSION = 1
+CACHES = {
+    'default': dict(CACHE_PROFILES[CACHE_PROFILE], **{
+        'KEY_PREFIX': 'honeycomb',
+        'KEY_FUNCTION': 'core.cache.make_key',
+        'VERSION': CACHE_VERSION,
+    }),
 }
 
+# Expensive cached values are kept for this many seconds (the grace period)
+# past their timeout, so that one process can refresh them while others use
+# the stale value.  The process refreshing a value holds a lock for at most
+# the lock timeout, and processes finding no value at all wait up to the lock
+# wait for it before computing it themselves.
+CACHE_GRACE_PERIOD = 60
+CACHE_LOCK_TIMEOUT = 30
+CACHE_LOCK_WAIT = 2
+
+# Rendered markdown is kept in a per-process LRU cache of this many entries and
+# characters in all, as well as in the named cache above for the given time in
+# seconds.  Renders longer than the entry limit skip the per-process cache.
+MARKDOWN_RENDER_CACHE = 'default'
+MARKDOWN_RENDER_CACHE_SIZE = 1000
+MARKDOWN_RENDER_CACHE_MAX_CHARS = 20 * 1000 * 1000
+MARKDOWN_RENDER_CACHE_MAX_ENTRY_CHARS = 100 * 1000
+MARKDOWN_RENDER_CACHE_TIMEOUT = 60 * 60 * 24
+
 # Search engine connections
 HAYSTACK_CONNECTIONS = {
     'default': {
@@ -215,12 +271,80 @@ HAYSTACK_CONNECTIONS = {
 # Make tags case insensitive
 TAGGIT_CASE_INSENSITIVE = True
 
+# Tags are weighed in the tag cloud from TAGCLOUD_MIN for the least used to
+# TAGCLOUD_MAX for the most used, and listed this many at a time.
+TAGCLOUD_MIN = 1.0
+TAGCLOUD_MAX = 5.0
+TAGCLOUD_PAGE_SIZE = 500
+
+# Usernames and tags are suggested from an index kept in memory, which each
+# process reloads once it is this old (in seconds) to catch up on changes in
+# popularity made elsewhere.
+SUGGEST_INDEX_TIMEOUT = 60 * 5
+
 # Base URL pattern for submissions
 SUBMISSION_BASE = ('^~(?P<username>[^/]+)/(?P<submission_id>\d+)-'
                    '(?P<submission_slug>[-\w]+)/')
 
+# Whether submission content processing (markdown rendering, file conversion
+# and image resizing) happens as soon as a submission is saved.  If False,
+# processing jobs are queued and run by the process_submission_jobs command.
+# TODO production should set this to False and run the command from cron
+SUBMISSION_PROCESSING_EAGER = True
+
+# Submission views are counted in memory and written out in batches, once the
+# interval (in seconds) has passed or the threshold of pending views is
+# reached.  Repeat views by the same reader within the de-duplication window
+# (in seconds) are only counted once.
+SUBMISSION_VIEW_FLUSH_INTERVAL = 60
+SUBMISSION_VIEW_FLUSH_THRESHOLD = 100
+SUBMISSION_VIEW_DEDUPLICATION_WINDOW = 60 * 30
+
+# Whether activities are buffered in memory and written in batches at the end
+# of each request, or sooner once the interval (in seconds) has passed or the
+# threshold of pending activities is reached.  Activities are only buffered
+# once their transaction commits, and those still pending when a process is
+# killed are lost.  If False, each activity is written as it happens.
+# TODO production should set this to True
+ACTIVITYSTREAM_BUFFER = False
+ACTIVITYSTREAM_FLUSH_INTERVAL = 60
+ACTIVITYSTREAM_FLUSH_THRESHOLD = 100
+
+# The activity stream returns this many activities unless asked for more, up
+# to the maximum.
+ACTIVITYSTREAM_DEFAULT_LIMIT = 100
+ACTIVITYSTREAM_MAX_LIMIT = 1000
+
+# How long (in seconds) to cache what each reader is allowed to see.  Cached
+# entries are invalidated when blocks, groups or blocked tags change.
+VISIBILITY_CACHE_TIMEOUT = 60 * 60
+
+# How long (in seconds) to cache fragments of pages, such as the front page's
+# recent submissions.  Fragments are also invalidated when what they show
+# changes.
+FRAGMENT_CACHE_TIMEOUT = 60 * 5
+
+# Listings stop counting results after this many, showing "1000+" instead.
+PAGINATION_COUNT_LIMIT = 1000
+
+# Submission pages show this many top-level comments at a time, each with
+# replies nested up to the given depth, and load at most the given number of
+# replies with the page or with each request for more.  Further replies are
+# loaded as the reader expands them.
+COMMENTS_PER_PAGE = 25
+COMMENT_REPLY_DEPTH = 3
+COMMENT_REPLY_LIMIT = 100
+
 # How often to run various commands through cron
 ACTIVITYSTREAM_ROTATION = 1  # Rotation period in days
+ACTIVITYSTREAM_RETENTION = 30  # Age in days at which activities are archived
+NOTIFICATION_EXPIRATION = 180  # Age in days at which notifications expire
+
+# Rotated activities are archived here as gzipped JSON lines, one file per
+# day, and counted by type and day in the database.  The default is ignored
+# by git; production should keep archives outside of the checkout.
+ACTIVITYSTREAM_ARCHIVE_DIR = os.path.join(BASE_DIR, 'archive',
+                                          'activitystream')
 
 # Login conventions
 LOGIN_URL = '/login/'
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "honeycomb.settings")
 
 application = get_wsgi_application()
+
+# Write buffered submission views out periodically, even when idle.
+from submissions.view_counter import view_counter  # noqa: E402
+view_counter.start_timer()
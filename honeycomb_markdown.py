@@ -1,9 +1,15 @@
+from collections import OrderedDict
 import hashlib
 import re
+import threading
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import caches
 from django.core.urlresolvers import reverse
+from django.utils.html import strip_tags
 
+from markdown import Markdown
 from markdown.preprocessors import Preprocessor
 from markdown.extensions import Extension
 from markdown.inlinepatterns import Pattern
@@ -148,3 +154,180 @@ class HoneycombMarkdownLite(Extension):
         md.postprocessors['tablefix'] = TableFix(md)
         md.postprocessors['dlfix'] = DLFix(md)
         md.postprocessors['abbrfix'] = ABBRFix(md)
+
+
+# Rendering profiles.  Full and lite profiles strip HTML from the source before
+# rendering; lite additionally skips user links (which require database
+# lookups).  The admin profile renders the source as-is, and is used for
+# administrative content and flatpages.
+FULL = 'full'
+LITE = 'lite'
+ADMIN = 'admin'
+PROFILES = {
+    FULL: (HoneycombMarkdown, True),
+    LITE: (HoneycombMarkdownLite, True),
+    ADMIN: (HoneycombMarkdown, False),
+}
+EXTENSIONS = [
+    'pymdownx.extra',
+    'markdown.extensions.codehilite',
+    'markdown.extensions.smarty',
+    'pymdownx.headeranchor',
+    'pymdownx.magiclink',
+    'pymdownx.smartsymbols',
+    'pymdownx.tilde',
+    'pymdownx.mark',
+]
+
+# Bump this whenever the profiles or extension configuration change so that
+# previously cached renders are no longer used.
+RENDER_VERSION = 1
+
+# Markdown instances are not thread safe, so each thread gets its own set.
+_renderers = threading.local()
+
+
+class RenderCache(object):
+    """A cache of rendered markdown keyed by profile and source hash.
+
+    Renders are looked up in a size-bounded, in-process LRU cache first, then
+    in the Django cache named by the `MARKDOWN_RENDER_CACHE` setting (which
+    may be shared between processes).  The in-process cache is bounded both
+    by its number of entries and by the total length of the renders in it,
+    and renders longer than `max_entry_chars`, such as whole novels, are only
+    kept in the Django cache.  Hits and misses are counted for monitoring.
+    """
+
+    def __init__(self, max_size, max_chars=None, max_entry_chars=None):
+        self.max_size = max_size
+        self.max_chars = max_chars
+        self.max_entry_chars = max_entry_chars
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._chars = 0
+
+    @staticmethod
+    def get_key(text, profile):
+        return 'markdown:{}:{}:{}'.format(
+            profile, RENDER_VERSION,
+            hashlib.sha1(text.encode('utf-8')).hexdigest())
+
+    @staticmethod
+    def get_backend():
+        return caches[getattr(settings, 'MARKDOWN_RENDER_CACHE', 'default')]
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = self._entries.pop(key)
+                self.hits += 1
+                return self._entries[key]
+        rendered = self.get_backend().get(key)
+        with self._lock:
+            if rendered is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._store(key, rendered)
+        return rendered
+
+    def set(self, key, rendered):
+        self.get_backend().set(
+            key, rendered,
+            getattr(settings, 'MARKDOWN_RENDER_CACHE_TIMEOUT', 60 * 60 * 24))
+        with self._lock:
+            self._store(key, rendered)
+
+    def _store(self, key, rendered):
+        if key in self._entries:
+            self._chars -= len(self._entries.pop(key))
+        if (self.max_entry_chars is not None and
+                len(rendered) > self.max_entry_chars):
+            return
+        self._entries[key] = rendered
+        self._chars += len(rendered)
+        while len(self._entries) > self.max_size or (
+                self.max_chars is not None and self._chars > self.max_chars):
+            self._chars -= len(self._entries.popitem(last=False)[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+            self.hits = self.misses = 0
+
+    def get_stats(self):
+        """Gets hit and miss counts for this process."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': float(self.hits) / total if total else 0.0,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'chars': self._chars,
+                'max_chars': self.max_chars,
+            }
+
+
+render_cache = RenderCache(
+    getattr(settings, 'MARKDOWN_RENDER_CACHE_SIZE', 1000),
+    getattr(settings, 'MARKDOWN_RENDER_CACHE_MAX_CHARS', 20 * 1000 * 1000),
+    getattr(settings, 'MARKDOWN_RENDER_CACHE_MAX_ENTRY_CHARS', 100 * 1000))
+
+
+def get_renderer(profile):
+    """Gets the configured Markdown instance for a profile in this thread.
+
+    Instances are created once per thread and reused, as building one
+    requires loading and configuring every extension.
+
+    Args:
+        profile: the name of the rendering profile
+
+    Returns:
+        A `markdown.Markdown` instance
+    """
+    if not hasattr(_renderers, 'instances'):
+        _renderers.instances = {}
+    if profile not in _renderers.instances:
+        extension, _ = PROFILES[profile]
+        _renderers.instances[profile] = Markdown(
+            extensions=[extension()] + EXTENSIONS)
+    return _renderers.instances[profile]
+
+
+def render(text, profile=FULL, use_cache=True):
+    """Renders markdown to HTML using a shared, pre-configured renderer.
+
+    Identical source is only rendered once; subsequent renders are served from
+    the render cache.  Note that user links are looked up at render time, so
+    cached renders will not reflect users created or changed since.
+
+    Args:
+        text: the markdown source to render
+        profile: the name of the rendering profile (`FULL`, `LITE`, or
+            `ADMIN`)
+        use_cache: whether to use the render cache; one-off renders need not
+            take up space in it
+
+    Returns:
+        The rendered HTML
+    """
+    _, strip = PROFILES[profile]
+    if use_cache:
+        key = render_cache.get_key(text, profile)
+        rendered = render_cache.get(key)
+        if rendered is not None:
+            return rendered
+    md = get_renderer(profile)
+    try:
+        rendered = md.convert(strip_tags(text) if strip else text)
+    finally:
+        md.reset()
+    if use_cache:
+        render_cache.set(key, rendered)
+    return rendered
@@ -1,5 +1,4 @@
 from __future__ import unicode_literals
-import markdown
 from PIL import Image
 
 from django.contrib.auth.models import User
@@ -8,11 +7,14 @@ from django.core.urlresolvers import reverse
 from django.db import models
 from django.template.defaultfilters import slugify
 from django.utils import timezone
-from django.utils.html import strip_tags
 from submitify.models import Call
 
 from administration.models import Flag
-from honeycomb_markdown import HoneycombMarkdown
+from core.models import DirtyFieldsMixin
+from honeycomb_markdown import (
+    FULL,
+    render,
+)
 
 
 def _upload_path(instance, filename, upload_type):
@@ -36,7 +38,7 @@ def newsitem_path(instance, filename):
     return _upload_path(instance.publisher, filename, 'newsitem')
 
 
-class Publisher(models.Model):
+class Publisher(DirtyFieldsMixin, models.Model):
     """A page on the site representing a publisher, collecting submissions by
     site members who are employed by or contracted under that publisher.
     """
@@ -81,19 +83,7 @@ class Publisher(models.Model):
 
     def save(self, *args, **kwargs):
         self.slug = slugify(self.name)
-        self.body_rendered = markdown.markdown(
-            strip_tags(self.body_raw),
-            extensions=[
-                HoneycombMarkdown(),
-                'pymdownx.extra',
-                'markdown.extensions.codehilite',
-                'markdown.extensions.smarty',
-                'pymdownx.headeranchor',
-                'pymdownx.magiclink',
-                'pymdownx.smartsymbols',
-                'pymdownx.tilde',
-                'pymdownx.mark',
-            ])
+        self.body_rendered = render(self.body_raw, FULL)
 
         super(Publisher, self).save(*args, **kwargs)
 
@@ -113,7 +103,7 @@ class Publisher(models.Model):
         })
 
 
-class NewsItem(models.Model):
+class NewsItem(DirtyFieldsMixin, models.Model):
     """An item of news from the publisher on their page."""
     publisher = models.ForeignKey(Publisher, on_delete=models.CASCADE)
     owner = models.ForeignKey(User)
@@ -128,19 +118,7 @@ class NewsItem(models.Model):
         ordering = ['-ctime']
 
     def save(self, *args, **kwargs):
-        self.body_rendered = markdown.markdown(
-            strip_tags(self.body_raw),
-            extensions=[
-                HoneycombMarkdown(),
-                'pymdownx.extra',
-                'markdown.extensions.codehilite',
-                'markdown.extensions.smarty',
-                'pymdownx.headeranchor',
-                'pymdownx.magiclink',
-                'pymdownx.smartsymbols',
-                'pymdownx.tilde',
-                'pymdownx.mark',
-            ])
+        self.body_rendered = render(self.body_raw, FULL)
 
         super(NewsItem, self).save(*args, **kwargs)
 
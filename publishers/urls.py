@@ -35,8 +35,6 @@ publisher_patterns = [
 ]
 urlpatterns = [
     url(r'^publishers/$', views.list_publishers, name='list_publishers'),
-    url(r'^publishers/(?P<page>\d+)/$', views.list_publishers,
-        name='list_publishers'),
     url(r'^publishers/create/$', views.create_publisher,
         name='create_publisher'),
     url(r'^publisher/(?P<publisher_slug>[-_\w]+)/',
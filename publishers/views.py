@@ -29,16 +29,14 @@ from .models import (
     NewsItem,
     Publisher,
 )
+from core.paginator import CursorPaginator
 
 
-def list_publishers(request, page=1):
+def list_publishers(request):
     """View for listing publishers.
 
     If the user is not an admin with permission to add publishers, publishers
     without owners will not be shown.
-
-    Args:
-        page: the current page of publishers to list
     """
 
     # List all publishers if the user is an admin, otherwise only the ones with
@@ -47,12 +45,12 @@ def list_publishers(request, page=1):
         qs = Publisher.objects.all()
     else:
         qs = Publisher.objects.filter(owner__isnull=False)
-    paginator = Paginator(qs, request.user.profile.results_per_page if
-                          request.user.is_authenticated else 25)
-    try:
-        publishers = paginator.page(page)
-    except EmptyPage:
-        publishers = paginator.page(paginator.num_pages)
+    paginator = CursorPaginator(
+        qs, request.user.profile.results_per_page if
+        request.user.is_authenticated else 25,
+        ordering=('name', 'id'))
+    publishers = paginator.page(after=request.GET.get('after'),
+                                before=request.GET.get('before'))
     return render(request, 'list_publishers.html', {
         'title': 'Publishers',
         'publishers': publishers,
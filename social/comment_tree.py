@@ -0,0 +1,172 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count
+
+from .models import Comment
+from administration.models import Flag
+from core.paginator import CursorPaginator
+
+
+# Replies are paged through in thread order.
+REPLY_ORDERING = ('path',)
+
+
+def get_thread(obj):
+    """Gets the comments posted on an object.
+
+    Args:
+        obj: the object commented on, such as a submission
+
+    Returns:
+        A queryset of the object's comments
+    """
+    return Comment.objects.filter(
+        content_type=ContentType.objects.get_for_model(obj),
+        object_id=obj.id)
+
+
+def get_subtree(comment):
+    """Gets a comment and all of its replies, however deeply nested.
+
+    Args:
+        comment: the comment at the top of the subtree
+
+    Returns:
+        A queryset of the comments in the subtree
+    """
+    return Comment.objects.filter(path__startswith=comment.path)
+
+
+def attach_active_flags(comments):
+    """Sets `active_flag` on each comment to its unresolved flag, if any.
+
+    Flags and their participants are fetched for all of the comments at
+    once, rather than with a query per comment.
+
+    Args:
+        comments: a list of comments
+    """
+    flags = {}
+    if comments:
+        for flag in Flag.objects.filter(
+                content_type=ContentType.objects.get_for_model(Comment),
+                object_id__in=[comment.id for comment in comments],
+                resolved=None).prefetch_related('participants'):
+            flags.setdefault(flag.object_id, flag)
+    for comment in comments:
+        comment.active_flag = flags.get(comment.id)
+
+
+def prepare_comments(comments):
+    """Joins what's needed to display comments, and counts their replies.
+
+    Args:
+        comments: a queryset of comments
+
+    Returns:
+        The queryset, with each comment annotated with `reply_count`
+    """
+    return comments.select_related(
+        'owner__profile', 'target_object_owner').annotate(
+            reply_count=Count('children'))
+
+
+def get_replies_cursor(comment):
+    """Gets the cursor token for fetching replies after a comment."""
+    return CursorPaginator(
+        Comment.objects.none(), 1, ordering=REPLY_ORDERING).encode_cursor(
+            comment)
+
+
+def assemble_tree(comments):
+    """Assembles loaded comments into a tree.
+
+    Each comment is given a list of `replies`, its `active_flag`, and, if
+    not all of its replies were loaded, `has_more_replies` along with
+    `next_replies_token` for fetching the rest.  Comments whose parents were
+    not loaded become the roots of the tree.
+
+    Args:
+        comments: a list of comments from `prepare_comments`
+
+    Returns:
+        The list of root comments, in thread order
+    """
+    comments = sorted(comments, key=lambda comment: comment.path)
+    attach_active_flags(comments)
+
+    # Ordering by path means parents always come before their replies.
+    by_id = {}
+    roots = []
+    for comment in comments:
+        comment.replies = []
+        by_id[comment.id] = comment
+        if comment.parent_id in by_id:
+            by_id[comment.parent_id].replies.append(comment)
+        else:
+            roots.append(comment)
+    for comment in comments:
+        comment.has_more_replies = comment.reply_count > len(comment.replies)
+        comment.next_replies_token = (
+            get_replies_cursor(comment.replies[-1])
+            if comment.has_more_replies and comment.replies else None)
+    return roots
+
+
+def load_comment_tree(comments, max_depth=None):
+    """Loads comments and assembles them into a tree.
+
+    The comments, their owners' profiles and their active flags are fetched
+    in a constant number of queries, however large the thread.
+
+    Args:
+        comments: a queryset of comments, such as from `get_thread` or
+            `get_subtree`
+        max_depth: if set, replies nested deeper than this are not loaded
+
+    Returns:
+        The list of root comments, oldest first
+    """
+    if max_depth is not None:
+        comments = comments.filter(depth__lte=max_depth)
+    return assemble_tree(list(prepare_comments(comments)))
+
+
+def load_replies(comments, max_depth=None, limit=None):
+    """Loads replies beneath a run of sibling comments, such as a page of
+    them.
+
+    Consecutive siblings and everything beneath them occupy a single range
+    of paths, so replies are fetched with one range scan, in thread order,
+    and then assembled beneath the comments.  Replies past the depth or
+    limit are left to be loaded on demand.
+
+    Args:
+        comments: a list of sibling comments from `prepare_comments`, in
+            path order
+        max_depth: if set, how many levels of replies to load
+        limit: if set, the maximum number of replies to load
+
+    Returns:
+        The comments, with their replies loaded
+    """
+    replies = []
+    if comments:
+        last = comments[-1]
+        # The path a next sibling of the last comment would have bounds the
+        # range, whatever the database's collation.
+        end = last.path[:-len(Comment.get_path_segment(last.id))] + \
+            Comment.get_path_segment(last.id + 1)
+        # Root paths are global, so the range also covers other threads'
+        # comments and the page's own later siblings.
+        replies = prepare_comments(Comment.objects.filter(
+            content_type_id=comments[0].content_type_id,
+            object_id=comments[0].object_id,
+            path__gt=comments[0].path, path__lt=end).exclude(
+                depth=comments[0].depth)).order_by('path')
+        if max_depth is not None:
+            replies = replies.filter(
+                depth__lte=comments[0].depth + max_depth)
+        if limit is not None:
+            replies = replies[:limit]
+    assemble_tree(list(comments) + list(replies))
+    return comments
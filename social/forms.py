@@ -5,6 +5,13 @@ from .models import Comment
 
 class CommentForm(forms.ModelForm):
     """A form for posting comments."""
+    def clean_parent(self):
+        parent = self.cleaned_data.get('parent')
+        if parent is not None and parent.depth >= Comment.MAX_DEPTH:
+            raise forms.ValidationError(
+                'Replies cannot be nested any deeper')
+        return parent
+
     class Meta:
         model = Comment
         fields = (
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 21:41
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def set_comment_paths(apps, schema_editor):
+    """Fills in paths for existing comments.
+
+    Replies are always posted after their parents, so walking comments in id
+    order sees every parent before its children.
+    """
+    Comment = apps.get_model('social', 'Comment')
+    paths = {}
+    for comment_id, parent_id in Comment.objects.order_by('id').values_list(
+            'id', 'parent_id').iterator():
+        parent_path, parent_depth = paths.get(parent_id, ('', -1))
+        path = '{}{:010d}/'.format(parent_path, comment_id)
+        paths[comment_id] = (path, parent_depth + 1)
+        Comment.objects.filter(id=comment_id).update(
+            path=path, depth=parent_depth + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0005_auto_20161105_2129'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, max_length=1000),
+        ),
+        migrations.RunPython(set_comment_paths, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,4 @@
 from __future__ import unicode_literals
-import markdown
 
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.fields import (
@@ -7,15 +6,21 @@ from django.contrib.contenttypes.fields import (
     GenericRelation,
 )
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
-from django.utils.html import strip_tags
+from django.db import (
+    models,
+    transaction,
+)
 
 from administration.models import Flag
-from honeycomb_markdown import HoneycombMarkdown
+from core.models import DirtyFieldsMixin
+from honeycomb_markdown import (
+    FULL,
+    render,
+)
 from submissions.models import Submission
 
 
-class Comment(models.Model):
+class Comment(DirtyFieldsMixin, models.Model):
     """A comment posted on a page on the site.
 
     Comments may be posted on pages for:
@@ -36,6 +41,17 @@ class Comment(models.Model):
     object_id = models.PositiveIntegerField()
     object_model = GenericForeignKey('content_type', 'object_id')
 
+    # Position in the thread, as the zero-padded ids of the comment and its
+    # ancestors from the root down (e.g. '0000000001/0000000004/'), so that
+    # ordering by path walks the thread depth-first and a subtree is a single
+    # range scan.
+    path = models.CharField(max_length=1000, blank=True, db_index=True)
+    depth = models.PositiveIntegerField(default=0)
+
+    # Each comment adds an 11-character segment to the path, which leaves
+    # room for this many levels of replies beneath a root comment.
+    MAX_DEPTH = 1000 // 11 - 1
+
     # Comment body
     ctime = models.DateTimeField(auto_now_add=True)
     body_raw = models.TextField(verbose_name='Comment')
@@ -45,22 +61,37 @@ class Comment(models.Model):
 
     flags = GenericRelation(Flag)
 
+    @staticmethod
+    def get_path_segment(comment_id):
+        """Gets the part of a path contributed by a comment."""
+        return '{:010d}/'.format(comment_id)
+
     def save(self, *args, **kwargs):
-        self.body_rendered = markdown.markdown(
-            strip_tags(self.body_raw),
-            extensions=[
-                'pymdownx.extra',
-                'markdown.extensions.codehilite',
-                'markdown.extensions.smarty',
-                'pymdownx.headeranchor',
-                'pymdownx.magiclink',
-                'pymdownx.smartsymbols',
-                'pymdownx.tilde',
-                'pymdownx.mark',
-                HoneycombMarkdown(),
-            ])
+        self.body_rendered = render(self.body_raw, FULL)
         super(Comment, self).save(*args, **kwargs)
 
+        # The path includes the comment's own id, so it can only be set once
+        # the comment has been inserted.
+        if not self.path:
+            if self.parent_id is None:
+                self.path = self.get_path_segment(self.id)
+                self.depth = 0
+            else:
+                self.path = self.parent.path + self.get_path_segment(self.id)
+                self.depth = self.parent.depth + 1
+            Comment.objects.filter(pk=self.pk).update(
+                path=self.path, depth=self.depth)
+            if hasattr(self, '_tracked_fields'):
+                self._reset_tracked_fields()
+
+    def get_ancestor_ids(self):
+        """Gets the ids of the comment's ancestors from its path.
+
+        Returns:
+            A list of ids, starting from the root of the thread
+        """
+        return [int(segment) for segment in self.path.split('/')[:-2]]
+
     def __str__(self):
         return "{}'s comment on {}".format(
             self.owner.profile.get_display_name(),
@@ -104,6 +135,56 @@ class Rating(models.Model):
     def get_stars(self):
         return '&#x2605;' * self.rating + '&#x2606;' * (5 - self.rating)
 
+    def _lock_submission(self):
+        """Locks the rated submission's row until the transaction ends."""
+        return Submission.objects.select_for_update().get(
+            pk=self.submission_id)
+
+    def _update_cached_submission(self, submission):
+        """Copies new rating totals onto the submission cached on this
+        rating, if any, so that it doesn't go stale."""
+        cached = getattr(self, Rating._meta.get_field(
+            'submission').get_cache_name(), None)
+        if cached is not None and cached is not submission:
+            for field in ('rating_sum', 'rating_count', 'rating_stars',
+                          'rating_average'):
+                setattr(cached, field, getattr(submission, field))
+
+    def save(self, *args, **kwargs):
+        """Overridden save method.
+
+        Adjusts the submission's rating totals by the difference this rating
+        makes, rather than recounting every rating.
+        """
+        with transaction.atomic():
+            submission = self._lock_submission()
+            previous = None
+            if self.pk is not None:
+                previous = Rating.objects.filter(pk=self.pk).values_list(
+                    'rating', flat=True).first()
+            # Kept for the sitewide statistics, which count ratings by stars.
+            self._previous_rating = previous
+            super(Rating, self).save(*args, **kwargs)
+            if previous is None:
+                submission.adjust_rating(self.rating, 1)
+            else:
+                submission.adjust_rating(self.rating - previous, 0)
+        self._update_cached_submission(submission)
+
+    def delete(self, *args, **kwargs):
+        """Overridden delete method.
+
+        Takes the rating out of the submission's rating totals.  Ratings
+        deleted along with their owner are not counted out; the
+        repair_counters command recomputes totals in bulk.
+        """
+        with transaction.atomic():
+            submission = self._lock_submission()
+            result = super(Rating, self).delete(*args, **kwargs)
+            submission.adjust_rating(-self.rating, -1)
+        self._update_cached_submission(submission)
+        return result
+
 
 class EnjoyItem(models.Model):
     # The user enjoying the submission
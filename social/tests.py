@@ -1,9 +1,22 @@
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.core.urlresolvers import reverse
-from django.test import TestCase
+from django.db import connection
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
+from .comment_tree import (
+    get_replies_cursor,
+    get_subtree,
+    get_thread,
+    load_comment_tree,
+    load_replies,
+    prepare_comments,
+)
 from .models import (
     Comment,
     Rating,
@@ -491,6 +504,220 @@ class TestCommentModel(BaseSocialSubmissionViewTestCase):
         self.assertEqual(self.comment.get_active_flag(), flag)
 
 
+class BaseCommentTreeTestCase(BaseSocialSubmissionViewTestCase):
+    def reply(self, parent, body='Reply', object_model=None):
+        comment = Comment(
+            owner=self.foo,
+            target_object_owner=self.foo,
+            object_model=object_model or self.submission,
+            parent=parent,
+            body_raw=body)
+        comment.save()
+        return comment
+
+
+class TestCommentTree(BaseCommentTreeTestCase):
+    def test_paths(self):
+        reply = self.reply(self.comment)
+        nested = self.reply(reply)
+        self.assertEqual(self.comment.path, '{:010d}/'.format(
+            self.comment.id))
+        self.assertEqual(nested.path, '{:010d}/{:010d}/{:010d}/'.format(
+            self.comment.id, reply.id, nested.id))
+        self.assertEqual(nested.depth, 2)
+        self.assertEqual(Comment.objects.get(pk=nested.pk).path, nested.path)
+        self.assertEqual(nested.get_ancestor_ids(),
+                         [self.comment.id, reply.id])
+        self.assertEqual(self.comment.get_ancestor_ids(), [])
+
+    def test_get_subtree(self):
+        reply = self.reply(self.comment)
+        nested = self.reply(reply)
+        other = self.reply(None)
+        self.assertEqual(list(get_subtree(reply).order_by('path')),
+                         [reply, nested])
+        self.assertNotIn(other, get_subtree(self.comment))
+
+    def test_load_comment_tree(self):
+        reply1 = self.reply(self.comment, 'Reply 1')
+        nested = self.reply(reply1, 'Nested')
+        reply2 = self.reply(self.comment, 'Reply 2')
+        root2 = self.reply(None, 'Root 2')
+        roots = load_comment_tree(get_thread(self.submission))
+        self.assertEqual(roots, [self.comment, root2])
+        self.assertEqual(roots[0].replies, [reply1, reply2])
+        self.assertEqual(roots[0].replies[0].replies, [nested])
+        self.assertEqual(roots[1].replies, [])
+
+    def test_load_comment_tree_max_depth(self):
+        reply = self.reply(self.comment)
+        self.reply(reply)
+        roots = load_comment_tree(get_thread(self.submission), max_depth=1)
+        self.assertEqual(roots[0].replies, [reply])
+        self.assertEqual(roots[0].replies[0].replies, [])
+
+    def test_load_comment_tree_attaches_flags(self):
+        reply = self.reply(self.comment)
+        flag = Flag(
+            flagged_by=self.foo,
+            object_model=reply,
+            flagged_object_owner=self.foo,
+            flag_type=Flag.SOCIAL,
+            subject='Flagged reply',
+            body_raw='Test flag')
+        flag.save()
+        roots = load_comment_tree(get_thread(self.submission))
+        self.assertIsNone(roots[0].active_flag)
+        self.assertEqual(roots[0].replies[0].active_flag, flag)
+
+    def test_load_comment_tree_takes_constant_queries(self):
+        parent = self.comment
+        for i in range(3):
+            parent = self.reply(parent)
+        with CaptureQueriesContext(connection) as queries:
+            load_comment_tree(get_thread(self.submission))
+        for i in range(20):
+            parent = self.reply(parent if i % 2 else self.comment)
+        with self.assertNumQueries(len(queries)):
+            roots = load_comment_tree(get_thread(self.submission))
+            for comment in roots[0].replies:
+                comment.owner.profile.get_display_name()
+
+    def test_view_submission_takes_constant_queries(self):
+        self.reply(self.comment)
+        url = self.submission.get_absolute_url()
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        parent = self.comment
+        for i in range(20):
+            parent = self.reply(parent)
+        with self.assertNumQueries(len(queries)):
+            self.client.get(url)
+
+
+class TestCommentPagination(BaseCommentTreeTestCase):
+    def test_load_replies_within_range(self):
+        reply = self.reply(self.comment)
+        nested = self.reply(reply)
+        root2 = self.reply(None)
+        self.reply(root2)
+        comments = list(prepare_comments(get_thread(self.submission).filter(
+            id=self.comment.id)))
+        load_replies(comments)
+        self.assertEqual(comments[0].replies, [reply])
+        self.assertEqual(comments[0].replies[0].replies, [nested])
+
+    def test_load_replies_ignores_other_threads(self):
+        other = Submission(
+            owner=self.foo,
+            title='Other submission',
+            content_raw='Content',
+            ctime=timezone.now())
+        other.save(update_content=True)
+        root2 = self.reply(None, 'Root 2')
+        other_root = self.reply(None, 'Other root', other)
+        self.reply(other_root, 'Other reply', other)
+        reply1 = self.reply(self.comment, 'Reply 1')
+        reply2 = self.reply(root2, 'Reply 2')
+        comments = list(prepare_comments(get_thread(
+            self.submission).filter(depth=0).order_by('path')))
+        self.assertEqual(comments, [self.comment, root2])
+        load_replies(comments, limit=2)
+        self.assertEqual(comments[0].replies, [reply1])
+        self.assertEqual(comments[1].replies, [reply2])
+        self.assertFalse(comments[1].has_more_replies)
+
+    def test_load_replies_limits(self):
+        reply1 = self.reply(self.comment)
+        self.reply(reply1)
+        reply2 = self.reply(self.comment)
+        comments = list(prepare_comments(get_thread(self.submission).filter(
+            id=self.comment.id)))
+        load_replies(comments, max_depth=1, limit=1)
+        self.assertEqual(comments[0].replies, [reply1])
+        self.assertTrue(comments[0].has_more_replies)
+        self.assertEqual(comments[0].next_replies_token,
+                         get_replies_cursor(reply1))
+        self.assertEqual(comments[0].replies[0].replies, [])
+        self.assertTrue(comments[0].replies[0].has_more_replies)
+        self.assertIsNone(comments[0].replies[0].next_replies_token)
+        self.assertNotIn(reply2, comments[0].replies)
+
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_root_comments_paginated(self):
+        self.reply(None, 'Root 2')
+        self.reply(None, 'Root 3')
+        response = self.client.get(self.submission.get_absolute_url())
+        self.assertContains(response, 'Root 2')
+        self.assertNotContains(response, 'Root 3')
+        response = self.client.get('{}?after={}'.format(
+            self.submission.get_absolute_url(),
+            response.context['root_level_comments'].next_token))
+        self.assertNotContains(response, 'Root 2')
+        self.assertContains(response, 'Root 3')
+
+    @override_settings(COMMENT_REPLY_LIMIT=2)
+    def test_more_replies_loaded_on_demand(self):
+        self.reply(self.comment, 'Reply 1')
+        reply2 = self.reply(self.comment, 'Reply 2')
+        self.reply(self.comment, 'Reply 3')
+        response = self.client.get(self.submission.get_absolute_url())
+        self.assertContains(response, 'Reply 2')
+        self.assertNotContains(response, 'Reply 3')
+        url = reverse('social:comment_replies', kwargs={
+            'comment_id': self.comment.id})
+        self.assertContains(response, '{}?after={}'.format(
+            url, get_replies_cursor(reply2)))
+        response = self.client.get(url)
+        data = response.json()
+        self.assertIn('Reply 1', data['html'])
+        self.assertIn('Reply 2', data['html'])
+        self.assertNotIn('Reply 3', data['html'])
+        self.assertEqual(data['next'], get_replies_cursor(reply2))
+        response = self.client.get('{}?after={}'.format(url, data['next']))
+        data = response.json()
+        self.assertNotIn('Reply 1', data['html'])
+        self.assertIn('Reply 3', data['html'])
+        self.assertIsNone(data['next'])
+
+    @override_settings(COMMENT_REPLY_DEPTH=1)
+    def test_deep_replies_loaded_on_demand(self):
+        reply = self.reply(self.comment, 'Reply 1')
+        self.reply(reply, 'Nested reply')
+        response = self.client.get(self.submission.get_absolute_url())
+        self.assertContains(response, 'Reply 1')
+        self.assertNotContains(response, 'Nested reply')
+        response = self.client.get(reverse('social:comment_replies', kwargs={
+            'comment_id': reply.id}))
+        self.assertIn('Nested reply', response.json()['html'])
+
+    def test_replies_respect_submission_visibility(self):
+        Submission.objects.filter(pk=self.submission.pk).update(hidden=True)
+        response = self.client.get(reverse('social:comment_replies', kwargs={
+            'comment_id': self.comment.id}))
+        self.assertEqual(response.status_code, 403)
+
+    def test_replies_respect_submission_flags(self):
+        flag = Flag(
+            flagged_by=self.bar,
+            object_model=self.submission,
+            flagged_object_owner=self.foo,
+            flag_type=Flag.CONTENT,
+            subject='Flagged submission',
+            body_raw='Test flag')
+        flag.save()
+        url = reverse('social:comment_replies', kwargs={
+            'comment_id': self.comment.id})
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.login(username='bar', password='another good password')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        flag.participants.add(self.bar)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.login(username='foo', password='a good password')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
 class TestPostCommentView(BaseSocialSubmissionViewTestCase):
     def test_form_renders_if_logged_in(self):
         self.client.login(username='bar',
@@ -558,6 +785,23 @@ class TestPostCommentView(BaseSocialSubmissionViewTestCase):
         self.assertContains(response, 'A Second Comment')
         self.assertContains(response, '<div class="comment-reply">')
 
+    def test_nesting_limited(self):
+        self.client.login(username='bar',
+                          password='another good password')
+        ctype = ContentType.objects.get(app_label='submissions',
+                                        model='submission')
+        Comment.objects.filter(pk=self.comment.pk).update(
+            depth=Comment.MAX_DEPTH)
+        response = self.client.post(reverse('social:post_comment'),
+                                    {
+                                        'content_type': ctype.id,
+                                        'object_id': self.submission.id,
+                                        'body_raw': 'A Second Comment',
+                                        'parent': self.comment.id,
+                                    }, follow=True)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertContains(response, 'Replies cannot be nested any deeper')
+
     def test_notifications(self):
         baz = User.objects.create_user('baz', 'baz@example.com',
                                        'another good password')
@@ -582,6 +826,65 @@ class TestPostCommentView(BaseSocialSubmissionViewTestCase):
                 Notification.SUBMISSION_COMMENT,
             ])
 
+    def test_reply_notifications_sent_once_per_user(self):
+        baz = User.objects.create_user('baz', 'baz@example.com',
+                                       'another good password')
+        baz.profile = Profile(profile_raw='Bazzo', display_name='Bad Wolf')
+        baz.profile.save()
+        parent = self.comment
+        for owner in [self.foo, self.bar, self.foo, baz, self.bar]:
+            parent = Comment(
+                owner=owner,
+                target_object_owner=self.foo,
+                object_model=self.submission,
+                parent=parent,
+                body_raw='Reply')
+            parent.save()
+        self.client.login(username='baz',
+                          password='another good password')
+        ctype = ContentType.objects.get(app_label='submissions',
+                                        model='submission')
+        self.client.post(reverse('social:post_comment'), {
+            'content_type': ctype.id,
+            'object_id': self.submission.id,
+            'body_raw': 'A deep reply',
+            'parent': parent.id,
+        })
+        reply = Comment.objects.get(body_raw='A deep reply')
+        notifications = Notification.objects.filter(
+            notification_type=Notification.COMMENT_REPLY)
+        self.assertEqual(
+            sorted(notification.target.username
+                   for notification in notifications),
+            ['bar', 'foo'])
+        for notification in notifications:
+            self.assertEqual(notification.source, baz)
+            self.assertEqual(notification.subject, reply)
+
+    def test_reply_takes_constant_queries(self):
+        self.client.login(username='foo', password='a good password')
+        ctype = ContentType.objects.get(app_label='submissions',
+                                        model='submission')
+
+        def post_reply(parent):
+            self.client.post(reverse('social:post_comment'), {
+                'content_type': ctype.id,
+                'object_id': self.submission.id,
+                'body_raw': 'Reply',
+                'parent': parent.id,
+            })
+            return Comment.objects.latest('id')
+
+        parent = post_reply(self.comment)
+        with CaptureQueriesContext(connection) as queries:
+            parent = post_reply(parent)
+        # Requests reset the query log, so count these before going on.
+        num_queries = len(queries)
+        for i in range(5):
+            parent = post_reply(parent)
+        with self.assertNumQueries(num_queries):
+            post_reply(parent)
+
     def test_fail(self):
         self.submission.can_comment = False
         self.submission.save()
@@ -903,16 +1206,53 @@ class TestViewNotificationsTimelineView(BaseSocialSubmissionViewTestCase):
             ).save()
         self.client.login(username='foo',
                           password='a good password')
-        response = self.client.get(reverse(
-            'social:view_notifications_timeline'))
-        self.assertContains(response, '>(current)<')
-        self.assertContains(response, '2</a>')
-        response = self.client.get(reverse(
-            'social:view_notifications_timeline', kwargs={
-                'page': 50,
-            }))
-        self.assertContains(response, '>(current)<')
-        self.assertContains(response, '1</a>')
+        url = reverse('social:view_notifications_timeline')
+        response = self.client.get(url)
+        self.assertContains(response, '"list-group-item striped-item"',
+                            count=50)
+        self.assertNotContains(response, '?before=')
+        response = self.client.get('{}?after={}'.format(
+            url, response.context['notifications'].next_token))
+        self.assertContains(response, '"list-group-item striped-item"',
+                            count=49)
+        self.assertContains(response, '?before=')
+        self.assertNotContains(response, '?after=')
+
+    def test_notifications_take_constant_queries(self):
+        def add_notifications():
+            Notification(
+                target=self.foo,
+                source=self.bar,
+                subject=self.submission,
+                notification_type=Notification.FAVORITE,
+            ).save()
+            Notification(
+                target=self.foo,
+                source=self.bar,
+                subject=Rating.objects.create(
+                    owner=self.bar, submission=self.submission, rating=3),
+                notification_type=Notification.RATING,
+            ).save()
+            Notification(
+                target=self.foo,
+                source=self.bar,
+                subject=self.comment,
+                notification_type=Notification.SUBMISSION_COMMENT,
+            ).save()
+
+        add_notifications()
+        self.client.login(username='foo',
+                          password='a good password')
+        url = reverse('social:view_notifications_timeline')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        for i in range(5):
+            add_notifications()
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+        self.assertContains(response, '"list-group-item striped-item"',
+                            count=18)
 
 
 class TestRemoveNotificationsView(BaseSocialViewTestCase):
@@ -959,6 +1299,44 @@ class TestRemoveNotificationsView(BaseSocialViewTestCase):
                                     follow=True)
         self.assertContains(response, 'Permission denied', status_code=403)
 
+    def test_removes_nothing_unless_all_own_notifications(self):
+        Notification(
+            target=self.foo,
+            source=self.bar,
+            notification_type=Notification.WATCH,
+        ).save()
+        Notification(
+            target=self.bar,
+            source=self.foo,
+            notification_type=Notification.WATCH,
+        ).save()
+        self.client.login(username='foo',
+                          password='a good password')
+        response = self.client.post(reverse('social:remove_notifications'),
+                                    {'notification_id': [1, 2]},
+                                    follow=True)
+        self.assertContains(response, 'Permission denied', status_code=403)
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_removes_notifications_by_type(self):
+        for notification_type in [Notification.WATCH, Notification.WATCH,
+                                  Notification.MESSAGE]:
+            Notification(
+                target=self.foo,
+                source=self.bar,
+                notification_type=notification_type,
+            ).save()
+        self.client.login(username='foo',
+                          password='a good password')
+        response = self.client.post(reverse('social:remove_notifications'),
+                                    {'notification_type': Notification.WATCH},
+                                    follow=True)
+        self.assertContains(response, 'Notifications deleted.')
+        self.assertEqual(
+            [notification.notification_type
+             for notification in Notification.objects.all()],
+            [Notification.MESSAGE])
+
 
 class TestNukeNotificationsView(BaseSocialSubmissionViewTestCase):
     def test_nukes_notifications(self):
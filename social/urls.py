@@ -20,8 +20,6 @@ notification_urls = [
         name='view_notifications_categories'),
     url('^timeline/$', views.view_notifications_timeline,
         name='view_notifications_timeline'),
-    url('^timeline/(?P<page>\d+)/$', views.view_notifications_timeline,
-        name='view_notifications_timeline'),
     url('^remove/$', views.remove_notifications, name='remove_notifications'),
     url('^nuke/$', views.nuke_notifications, name='nuke_notifications'),
 ]
@@ -35,6 +33,8 @@ submission_urls = [
 comment_urls = [
     url('^post/$', views.post_comment, name='post_comment'),
     url('^delete/$', views.delete_comment, name='delete_comment'),
+    url('^(?P<comment_id>\d+)/replies/$', views.comment_replies,
+        name='comment_replies'),
 ]
 
 urlpatterns = [
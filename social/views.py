@@ -1,27 +1,43 @@
+import json
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
-from django.core.paginator import (
-    EmptyPage,
-    Paginator,
-)
+from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse
 from django.shortcuts import (
     get_object_or_404,
     redirect,
     render,
 )
+from django.template.loader import render_to_string
 from django.views.decorators.http import require_POST
 
+from .comment_tree import (
+    REPLY_ORDERING,
+    load_replies,
+    prepare_comments,
+)
 from .forms import CommentForm
 from .models import (
     Comment,
     Rating,
 )
 from activitystream.models import Activity
+from administration.templatetags.flag_extras import can_view_flagged_item
+from core.paginator import CursorPaginator
+from core.prefetch import prefetch_generic
 from submissions.models import Submission
-from usermgmt.models import Notification
+from submissions.utils import VisibilityContext
+from usermgmt.models import (
+    Notification,
+    update_notification_counts,
+)
 
 
 @login_required
@@ -81,13 +97,10 @@ def unwatch_user(request, username):
 
         # If there are outstanding notifications about having watched the user,
         # remove them
-        possible_notifications = Notification.objects.filter(
-                target=user,
-                source=request.user,
-                notification_type=Notification.WATCH)
-        if len(possible_notifications) > 0:
-            for notification in possible_notifications:
-                notification.delete()
+        Notification.objects.bulk_delete(Notification.objects.filter(
+            target=user,
+            source=request.user,
+            notification_type=Notification.WATCH))
         Activity.create('social', 'unwatch', request.user)
     return redirect(reverse('usermgmt:view_profile', args=(user.username,)))
 
@@ -261,14 +274,11 @@ def unfavorite_submission(request, username=None, submission_id=None,
 
     # If there are outstanding notifications about having favorited the
     # submission, remove them
-    possible_notifications = Notification.objects.filter(
+    Notification.objects.bulk_delete(Notification.objects.filter(
         target=author,
         source=reader,
         notification_type=Notification.FAVORITE,
-        subject_id=submission_id)
-    if len(possible_notifications) > 0:
-        for notification in possible_notifications:
-            notification.delete()
+        subject_id=submission_id))
     Activity.create('social', 'unfavorite', submission)
     return redirect(reverse('submissions:view_submission',
                     kwargs={
@@ -347,12 +357,7 @@ def rate_submission(request, username=None, submission_id=None,
         subject=rating_object)
     notification.save()
 
-    # Update cached submission rating information
-    ratings = submission.get_average_rating()
-    submission.rating_stars = ratings['stars']
-    submission.rating_average = ratings['average']
-    submission.rating_count = ratings['count']
-    submission.save()
+    # Saving the rating updated the submission's rating information
     Activity.create('social', 'rate', rating_object)
     return redirect(reverse('submissions:view_submission',
                     kwargs={
@@ -402,8 +407,7 @@ def enjoy_submission(request, username=None, submission_id=None,
                         }))
 
     # Add the enjoy vote to the submission
-    submission.enjoy_votes += 1
-    submission.save()
+    submission.increment('enjoy_votes')
     messages.success(request, "Enjoy vote added to submission!")
 
     # Notify the submission author
@@ -432,34 +436,45 @@ def post_comment(request):
         if comment.object_model.can_comment:
             comment.owner = request.user
             comment.target_object_owner = comment.object_model.owner
-            comment.save()
-            form.save_m2m()
-
-            # Notify the object owner that their object has received
-            # a comment if it's not them making the comment.
-            if (isinstance(comment.object_model, Submission)
-                    and request.user != comment.object_model.owner):
-                Notification(
-                    notification_type=Notification.SUBMISSION_COMMENT,
-                    target=comment.target_object_owner,
-                    source=request.user,
-                    subject=comment).save()
-
-            # If the comment is a reply to another comment, notify all parent
-            # comments that their comment has received a comment reply, so
-            # long as the parent comment owner is not the one making the reply.
-            if comment.parent:
-                c = comment
-                while c.parent is not None:
-                    if request.user != c.parent.owner:
-                        Notification(
-                            notification_type=Notification.COMMENT_REPLY,
-                            target=c.parent.owner,
-                            source=request.user,
-                            subject=comment).save()
-                    c = c.parent
+            with transaction.atomic():
+                comment.save()
+                form.save_m2m()
+                notifications = []
+
+                # Notify the object owner that their object has received
+                # a comment if it's not them making the comment.
+                if (isinstance(comment.object_model, Submission)
+                        and request.user != comment.object_model.owner):
+                    notifications.append(Notification(
+                        notification_type=Notification.SUBMISSION_COMMENT,
+                        target=comment.target_object_owner,
+                        source=request.user,
+                        subject=comment))
+
+                # If the comment is a reply to another comment, notify the
+                # owners of all parent comments (once each) that their comment
+                # has received a reply, so long as they are not the one
+                # making the reply.  The parents are found from the comment's
+                # path in a single query.
+                ancestor_ids = comment.get_ancestor_ids()
+                if ancestor_ids:
+                    owner_ids = set(Comment.objects.filter(
+                        id__in=ancestor_ids).exclude(
+                            owner=request.user).values_list(
+                                'owner_id', flat=True))
+                    notifications.extend(Notification(
+                        notification_type=Notification.COMMENT_REPLY,
+                        target_id=owner_id,
+                        source=request.user,
+                        subject=comment) for owner_id in sorted(owner_ids))
+                # Bulk creation skips `save`, so count them here.
+                Notification.objects.bulk_create(notifications)
+                update_notification_counts(
+                    [(notification.target_id, notification.notification_type)
+                     for notification in notifications], 1)
             return redirect(comment.get_absolute_url())
-    messages.error(request, "There was an error posting that comment")
+    messages.error(request, form.errors['parent'][0] if 'parent' in
+                   form.errors else "There was an error posting that comment")
     return redirect(request.META.get('HTTP_REFERER', '/'))
 
 
@@ -490,11 +505,9 @@ def delete_comment(request):
     # Delete any outstanding notifications
     if comment.deleted:
         ctype = ContentType.objects.get(app_label='social', model='comment')
-        possible_notifications = Notification.objects.filter(
+        Notification.objects.bulk_delete(Notification.objects.filter(
             subject_content_type=ctype,
-            subject_id=comment.id)
-        for notification in possible_notifications:
-            notification.delete()
+            subject_id=comment.id))
 
         # As we don't rely on existing signals, create our own activity stream
         # item refering to this comment.
@@ -502,6 +515,54 @@ def delete_comment(request):
     return redirect(comment.object_model.get_absolute_url())
 
 
+def comment_replies(request, comment_id=None):
+    """View for loading replies to a comment on demand.
+
+    Args:
+        request: the Django request object; `after` may be in request.GET to
+            continue from a cursor
+        comment_id: the id of the comment whose replies to load
+
+    Returns:
+        A JSON object with the rendered replies in `html`, and the cursor for
+        the next set of replies, if any, in `next`
+    """
+    parent = get_object_or_404(Comment, id=comment_id)
+    target = parent.object_model
+    if isinstance(target, Submission):
+        can_view = Submission.objects.filter(
+            Q(id=target.id) &
+            VisibilityContext.for_reader(request.user).get_filters(
+                blocked_tags=False)).exists()
+        # Submissions flagged for review are hidden as they are when viewed.
+        active_flag = target.get_active_flag()
+        if (can_view and active_flag is not None and
+                request.user != target.owner):
+            can_view = can_view_flagged_item(request.user, active_flag)
+        if not can_view:
+            return HttpResponse(
+                json.dumps({'error': 'Permission denied'}),
+                content_type='application/json', status=403)
+    paginator = CursorPaginator(
+        prepare_comments(parent.children.all()),
+        settings.COMMENT_REPLY_LIMIT, ordering=REPLY_ORDERING)
+    replies = paginator.page(after=request.GET.get('after'))
+    load_replies(replies.object_list,
+                 max_depth=settings.COMMENT_REPLY_DEPTH - 1,
+                 limit=settings.COMMENT_REPLY_LIMIT)
+    html = render_to_string('subcomments-snippet.html', {
+        'comments': replies.object_list,
+        'can_reply': getattr(target, 'can_comment', True),
+        'comment_form': CommentForm(instance=Comment(
+            content_type=parent.content_type,
+            object_id=parent.object_id)),
+    }, request=request)
+    return HttpResponse(
+        json.dumps({'html': html, 'next': replies.next_token},
+                   separators=[',', ':']),
+        content_type='application/json')
+
+
 @login_required
 def view_notifications_ab(request):
     """View for choosing whether a user sees timeline or category style
@@ -511,23 +572,47 @@ def view_notifications_ab(request):
     return redirect(reverse('social:view_notifications_{}'.format(view)))
 
 
+def prefetch_notifications(notifications):
+    """Loads everything needed to display notifications with
+    `notification-snippet.html`.
+
+    Sources are joined, and subjects, along with what any comments among them
+    were left on, are fetched with one query per type rather than one per
+    notification.
+
+    Args:
+        notifications: a list of notifications
+    """
+    subjects = prefetch_generic(notifications, 'subject', select_related={
+        Rating: ('submission',),
+    })
+    prefetch_generic(
+        [obj for obj in subjects.values() if isinstance(obj, Comment)],
+        select_related={Submission: ('owner',)})
+
+
 @login_required
 def view_notifications_categories(request):
     """View for seeing notifications in category style."""
+    notifications = list(request.user.notification_set.select_related(
+        'source__profile'))
+    prefetch_notifications(notifications)
     return render(request, 'notifications_categories.html', {
         'title': 'Notifications',
-        'notifications': request.user.profile.get_notifications_sorted(),
+        'notifications': request.user.profile.get_notifications_sorted(
+            notifications),
     })
 
 
 @login_required
-def view_notifications_timeline(request, page=1):
+def view_notifications_timeline(request):
     """View for seeing notifications in timeline style."""
-    paginator = Paginator(request.user.notification_set.all(), 50)
-    try:
-        notifications = paginator.page(page)
-    except EmptyPage:
-        notifications = paginator.page(paginator.num_pages)
+    paginator = CursorPaginator(
+        request.user.notification_set.select_related('source__profile'), 50,
+        ordering=('-ctime', '-id'))
+    notifications = paginator.page(after=request.GET.get('after'),
+                                   before=request.GET.get('before'))
+    prefetch_notifications(notifications.object_list)
     return render(request, 'notifications_timeline.html', {
         'title': 'Notifications',
         'notifications': notifications,
@@ -537,22 +622,20 @@ def view_notifications_timeline(request, page=1):
 @login_required
 @require_POST
 def remove_notifications(request):
-    """View for removing selected notifications."""
-    for notification_id in request.POST.getlist('notification_id', []):
-        try:
-            notification = Notification.objects.get(pk=notification_id)
-            if notification.target == request.user:
-                notification.delete()
-            else:
-                messages.error(request, 'One or more of the notifications '
-                               'you attempted to delete does not belong to '
-                               'you.  Some notifications may have been '
-                               'deleted successfully, however.')
-                return render(request, 'permission_denied.html', {
-                    'title': 'Permission denied',
-                }, status=403)
-        except Notification.DoesNotExist:
-            continue
+    """View for removing selected notifications, or all notifications of the
+    selected types."""
+    try:
+        Notification.objects.delete_for_target(
+            request.user, request.POST.getlist('notification_id', []))
+    except PermissionDenied:
+        messages.error(request, 'One or more of the notifications you '
+                       'attempted to delete does not belong to you.  No '
+                       'notifications were deleted.')
+        return render(request, 'permission_denied.html', {
+            'title': 'Permission denied',
+        }, status=403)
+    Notification.objects.delete_by_type(
+        request.user, request.POST.getlist('notification_type', []))
     messages.success(request, 'Notifications deleted.')
     return redirect(reverse('social:view_notifications'))
 
@@ -561,9 +644,8 @@ def remove_notifications(request):
 @require_POST
 def nuke_notifications(request):
     """View for removing all notifications."""
-    notifications = Notification.objects.filter(target=request.user)
-    for notification in notifications:
-        notification.delete()
+    Notification.objects.bulk_delete(
+        Notification.objects.filter(target=request.user))
     request.user.profile.expired_notifications = 0
     request.user.profile.save()
     messages.success(request, 'All notifications nuked.')
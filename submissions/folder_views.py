@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
@@ -19,11 +20,16 @@ from .models import (
     FolderItem,
     Submission,
 )
+from .utils import (
+    get_listing_ordering,
+    prefetch_for_listing,
+)
 from activitystream.models import Activity
+from core.paginator import CursorPaginator
 from core.templatetags.gravatar import gravatar
 
 
-def view_root_level_folders(request, username=None, page=1):
+def view_root_level_folders(request, username=None):
     """View for listing folders at the root level, as well as submissions not
     placed in any folders.
     """
@@ -35,15 +41,17 @@ def view_root_level_folders(request, username=None, page=1):
     folders = user.folder_set.filter(parent=None)
 
     # Get all submissions with no attached folder items
-    members = Submission.objects.filter(owner=user) \
-        .annotate(Count('folderitem')) \
-        .filter(folderitem__count=0)
-    paginator = Paginator(members, request.user.profile.results_per_page if
-                          request.user.is_authenticated else 25)
-    try:
-        submissions = paginator.page(page)
-    except EmptyPage:
-        submissions = paginator.page(paginator.num_pages)
+    members = prefetch_for_listing(
+        Submission.objects.filter(owner=user)
+        .annotate(Count('folderitem'))
+        .filter(folderitem__count=0))
+    sort, ordering = get_listing_ordering(request)
+    paginator = CursorPaginator(
+        members, request.user.profile.results_per_page if
+        request.user.is_authenticated else 25, ordering=ordering,
+        count_limit=settings.PAGINATION_COUNT_LIMIT)
+    submissions = paginator.page(after=request.GET.get('after'),
+                                 before=request.GET.get('before'))
     title = "{} {}'s folders".format(
         gravatar(user.email, size=80),
         user.profile.get_display_name())
@@ -54,9 +62,7 @@ def view_root_level_folders(request, username=None, page=1):
         'title': title,
         'tab': 'folders',
         'subtitle': '/',
-        'url_prefix': reverse('submissions:view_root_level_folders', kwargs={
-            'username': user.username,
-        }),
+        'sort': sort,
     })
 
 
@@ -86,8 +92,9 @@ def view_folder(request, username=None, folder_id=None, folder_slug=None,
 
     # Get submissions in this folder
     # (See above TODO)
-    members = [item.submission for item in
-               FolderItem.objects.filter(folder=folder)]
+    members = prefetch_for_listing(
+        Submission.objects.filter(folderitem__folder=folder)).order_by(
+            'folderitem__position')
     paginator = Paginator(members, request.user.profile.results_per_page if
                           request.user.is_authenticated else 25)
     try:
@@ -235,6 +242,7 @@ def delete_folder(request, username=None, folder_id=None, folder_slug=None):
     return render(request, 'confirm_delete_folder.html', {
         'title': 'Deleting folder "{}"'.format(folder.name),
         'folder': folder,
+        'submissions': prefetch_for_listing(folder.submissions.all()),
     })
 
 
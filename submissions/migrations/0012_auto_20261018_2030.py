@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 20:30
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0011_submission_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('p', 'Pending'), ('r', 'Running'), ('d', 'Done'), ('f', 'Failed')], default='p', max_length=1)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('ctime', models.DateTimeField(auto_now_add=True)),
+                ('mtime', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['ctime'],
+            },
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='processing_status',
+            field=models.CharField(choices=[('r', 'Ready'), ('p', 'Processing'), ('f', 'Processing failed')], default='r', max_length=1),
+        ),
+        migrations.AddField(
+            model_name='processingjob',
+            name='submission',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='submissions.Submission'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 21:31
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0012_auto_20261018_2030'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='favorite_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 21:37
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0013_submission_favorite_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,6 +1,5 @@
 from __future__ import unicode_literals
 import json
-import markdown
 from PIL import Image
 from prose_wc import wc
 import pypandoc
@@ -11,13 +10,14 @@ from django.contrib.contenttypes.fields import GenericRelation
 from django.core.urlresolvers import reverse
 from django.db import models
 from django.template.defaultfilters import slugify
-from django.utils.html import strip_tags
 from taggit.managers import TaggableManager
 
 from administration.models import Flag
+from core.models import DirtyFieldsMixin
 from honeycomb_markdown import (
-    HoneycombMarkdown,
-    HoneycombMarkdownLite,
+    FULL,
+    LITE,
+    render,
 )
 from usermgmt.group_models import FriendGroup
 
@@ -79,8 +79,17 @@ def cover_path(instance, filename):
             filename.split('.')[-1]))
 
 
-class Submission(models.Model):
+class Submission(DirtyFieldsMixin, models.Model):
     """A submission created on the site."""
+    READY = 'r'
+    PROCESSING = 'p'
+    FAILED = 'f'
+    PROCESSING_STATUSES = (
+        (READY, 'Ready'),
+        (PROCESSING, 'Processing'),
+        (FAILED, 'Processing failed'),
+    )
+
     # Submission owner
     owner = models.ForeignKey(User)
 
@@ -129,7 +138,15 @@ class Submission(models.Model):
     rating_average = models.DecimalField(max_digits=3, decimal_places=2,
                                          default=0.0)
     rating_count = models.PositiveIntegerField(default=0)
+    # Maintained by `social.models.Rating`; see the repair_counters command.
+    rating_sum = models.PositiveIntegerField(default=0)
+    # Maintained by signals when favorites are added or removed; see
+    # `submissions.signals` and the repair_counters command.
+    favorite_count = models.PositiveIntegerField(default=0, db_index=True)
     counts = models.CharField(max_length=250)
+    processing_status = models.CharField(max_length=1,
+                                         choices=PROCESSING_STATUSES,
+                                         default=READY)
     tags = TaggableManager()
     flags = GenericRelation(Flag)
 
@@ -148,19 +165,7 @@ class Submission(models.Model):
             self.slug = slugify(self.title)
 
             # Render description
-            self.description_rendered = markdown.markdown(
-                strip_tags(self.description_raw),
-                extensions=[
-                    HoneycombMarkdown(),
-                    'pymdownx.extra',
-                    'markdown.extensions.codehilite',
-                    'markdown.extensions.smarty',
-                    'pymdownx.headeranchor',
-                    'pymdownx.magiclink',
-                    'pymdownx.smartsymbols',
-                    'pymdownx.tilde',
-                    'pymdownx.mark',
-                ])
+            self.description_rendered = render(self.description_raw, FULL)
 
             # Update content from file
             if self.content_file.name:
@@ -173,19 +178,7 @@ class Submission(models.Model):
                         temp.name, 'md')
 
             # Render content
-            self.content_rendered = markdown.markdown(
-                strip_tags(self.content_raw),
-                extensions=[
-                    HoneycombMarkdownLite(),
-                    'pymdownx.extra',
-                    'markdown.extensions.codehilite',
-                    'markdown.extensions.smarty',
-                    'pymdownx.headeranchor',
-                    'pymdownx.magiclink',
-                    'pymdownx.smartsymbols',
-                    'pymdownx.tilde',
-                    'pymdownx.mark',
-                ])
+            self.content_rendered = render(self.content_raw, LITE)
 
             # Calculate counts
             self.set_counts(wc.wc(None, pypandoc.convert(
@@ -207,18 +200,36 @@ class Submission(models.Model):
                 cover.thumbnail((2048, 2048), Image.ANTIALIAS)
                 cover.save(self.cover.path)
 
+    def process_content(self):
+        """Renders the submission's content and munges its files, marking the
+        submission as ready once done.
+
+        This is the expensive portion of saving a submission, and is run from a
+        :model:`submissions.ProcessingJob` rather than within the request.
+        """
+        self.processing_status = Submission.READY
+        self.save(update_content=True)
+
     def get_counts(self):
+        if not self.counts:
+            # Counts are not available until the content has been processed.
+            return {'counts': {'words': 0, 'paragraphs': 0}}
         return json.loads(self.counts)
 
     def set_counts(self, counts_obj):
         self.counts = json.dumps(counts_obj, indent=None)
 
-    def get_average_rating(self):
-        """Gets the average rating of the submission based on all ratings."""
-        total = count = 0
-        for rating in self.rating_set.all():
-            total += rating.rating
-            count += 1
+    @staticmethod
+    def summarize_ratings(total, count):
+        """Summarizes ratings from their sum and count.
+
+        Args:
+            total: the sum of the ratings
+            count: the number of ratings
+
+        Returns:
+            A dict of the stars to display, the average and the count
+        """
         if count > 0:
             return {
                 'stars': '&#x2605;' * int(total / count) +
@@ -229,6 +240,29 @@ class Submission(models.Model):
         else:
             return {'stars': '', 'average': 0, 'count': 0}
 
+    def get_average_rating(self):
+        """Gets the average rating of the submission based on all ratings."""
+        return self.summarize_ratings(self.rating_sum, self.rating_count)
+
+    def adjust_rating(self, sum_delta, count_delta):
+        """Adjusts the submission's rating totals and saves them.
+
+        Callers should hold a lock on the submission's row (see
+        `social.models.Rating.save`) so that concurrent ratings don't
+        overwrite each other.
+
+        Args:
+            sum_delta: the change in the sum of ratings
+            count_delta: the change in the number of ratings
+        """
+        self.rating_sum += sum_delta
+        self.rating_count += count_delta
+        ratings = self.get_average_rating()
+        self.rating_stars = ratings['stars']
+        self.rating_average = ratings['average']
+        self.save(update_fields=[
+            'rating_sum', 'rating_count', 'rating_stars', 'rating_average'])
+
     def get_active_flag(self):
         """Retrieve flag if there is an active flag against this submission"""
         active_flags = self.flags.filter(resolved=None)
@@ -252,6 +286,47 @@ class Submission(models.Model):
                                           self.id)
 
 
+class ProcessingJob(models.Model):
+    """A queued request to process a submission's content.
+
+    Jobs are created when a submission is submitted or edited and are run
+    either immediately or from the `process_submission_jobs` management
+    command, depending on the `SUBMISSION_PROCESSING_EAGER` setting.
+    """
+    PENDING = 'p'
+    RUNNING = 'r'
+    DONE = 'd'
+    FAILED = 'f'
+    JOB_STATUSES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    # The submission to process
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE)
+
+    # Job state
+    status = models.CharField(max_length=1, choices=JOB_STATUSES,
+                              default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    ctime = models.DateTimeField(auto_now_add=True)
+    mtime = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['ctime']
+
+    def __str__(self):
+        return 'Processing job for submission {} ({})'.format(
+            self.submission_id, self.get_status_display())
+
+    def __unicode__(self):
+        return 'Processing job for submission {} ({})'.format(
+            self.submission_id, self.get_status_display())
+
+
 class Folder(models.Model):
     """A folder for storing submissions."""
     # Folder owner
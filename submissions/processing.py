@@ -0,0 +1,140 @@
+import traceback
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    ProcessingJob,
+    Submission,
+)
+
+
+def queue_processing(submission):
+    """Queues a submission for content processing.
+
+    The submission is marked as processing and a
+    :model:`submissions.ProcessingJob` is created for it.  If
+    `SUBMISSION_PROCESSING_EAGER` is set, the job is run immediately;
+    otherwise, it is left for the `process_submission_jobs` command.
+
+    Args:
+        submission: the :model:`submissions.Submission` to process, which
+            must already be saved
+
+    Returns:
+        The generated :model:`submissions.ProcessingJob`
+    """
+    Submission.objects.filter(pk=submission.pk).update(
+        processing_status=Submission.PROCESSING)
+    submission.processing_status = Submission.PROCESSING
+
+    # Jobs always process the latest saved content, so there is no need to
+    # queue another if one is already waiting.
+    job = ProcessingJob.objects.filter(
+        submission=submission,
+        status=ProcessingJob.PENDING).first()
+    if job is None:
+        job = ProcessingJob(submission=submission)
+        job.save()
+    if getattr(settings, 'SUBMISSION_PROCESSING_EAGER', True):
+        run_job(job)
+    return job
+
+
+def claim_job(job):
+    """Atomically marks a job as running.
+
+    Args:
+        job: the :model:`submissions.ProcessingJob` to claim
+
+    Returns:
+        True if the job was claimed, False if another worker got to it first
+    """
+    # `update` skips `auto_now`, so mark when the job was claimed here.
+    claimed = ProcessingJob.objects.filter(
+        pk=job.pk,
+        status__in=[ProcessingJob.PENDING, ProcessingJob.FAILED]).update(
+            status=ProcessingJob.RUNNING, mtime=timezone.now())
+    if claimed:
+        job.status = ProcessingJob.RUNNING
+    return claimed == 1
+
+
+def run_job(job):
+    """Runs a processing job, recording the outcome on the job and submission.
+
+    Args:
+        job: the :model:`submissions.ProcessingJob` to run
+
+    Returns:
+        True if the job ran successfully, False otherwise
+    """
+    if not claim_job(job):
+        return False
+    job.attempts += 1
+    try:
+        # Work from a fresh copy so that the job always processes the most
+        # recently saved content.
+        submission = Submission.objects.get(pk=job.submission_id)
+        submission.process_content()
+    except Exception:
+        job.status = ProcessingJob.FAILED
+        job.error = traceback.format_exc()
+        job.save()
+        Submission.objects.filter(pk=job.submission_id).update(
+            processing_status=Submission.FAILED)
+        return False
+    job.status = ProcessingJob.DONE
+    job.error = ''
+    job.save()
+    return True
+
+
+def reclaim_stale_jobs(stale_after):
+    """Requeues jobs left running by workers which died part way through.
+
+    Each reclaimed job counts as an attempt, so that a job which keeps
+    killing its worker is eventually given up on like one which fails.
+
+    Args:
+        stale_after: a `timedelta` after which running jobs are assumed to
+            have been abandoned
+
+    Returns:
+        The number of jobs requeued
+    """
+    return ProcessingJob.objects.filter(
+        status=ProcessingJob.RUNNING,
+        mtime__lt=timezone.now() - stale_after).update(
+            status=ProcessingJob.PENDING, attempts=F('attempts') + 1,
+            mtime=timezone.now())
+
+
+def run_pending_jobs(limit=None, retry_failed=False, max_attempts=3):
+    """Runs queued processing jobs, oldest first.
+
+    Args:
+        limit: the maximum number of jobs to run, or None for all of them
+        retry_failed: whether to also retry failed jobs
+        max_attempts: failed jobs which have been attempted this many times
+            are not retried
+
+    Returns:
+        A tuple of the number of successful and failed jobs
+    """
+    statuses = [ProcessingJob.PENDING]
+    if retry_failed:
+        statuses.append(ProcessingJob.FAILED)
+    jobs = ProcessingJob.objects.filter(
+        status__in=statuses,
+        attempts__lt=max_attempts)
+    if limit is not None:
+        jobs = jobs[:limit]
+    succeeded = failed = 0
+    for job in jobs:
+        if run_job(job):
+            succeeded += 1
+        elif job.status == ProcessingJob.FAILED:
+            failed += 1
+    return succeeded, failed
@@ -0,0 +1,127 @@
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from .models import Submission
+from .utils import VisibilityContext
+from activitystream.models import SiteStatistic
+from usermgmt.group_models import FriendGroup
+from usermgmt.models import Profile
+
+
+def _changed_ids(action, pk_set, current):
+    """Gets the ids on the other side of a changed relation.
+
+    Clears don't provide a `pk_set`, so they are handled before they happen
+    using the current members of the relation.
+    """
+    if action in ('post_add', 'post_remove'):
+        return pk_set
+    if action == 'pre_clear':
+        return current()
+    return ()
+
+
+@receiver(m2m_changed, sender=Profile.blocked_users.through)
+def invalidate_on_block(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidates the visibility of users who have been (un)blocked."""
+    if reverse:
+        # A user's blocked_by changed, and pk_set holds profile ids.
+        if _changed_ids(action, pk_set, lambda: [None]):
+            VisibilityContext.invalidate([instance.id])
+    else:
+        VisibilityContext.invalidate(_changed_ids(
+            action, pk_set,
+            lambda: instance.blocked_users.values_list('id', flat=True)))
+
+
+@receiver(m2m_changed, sender=FriendGroup.users.through)
+def invalidate_on_group_change(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    """Invalidates the visibility of users added to or removed from
+    groups."""
+    if reverse:
+        if _changed_ids(action, pk_set, lambda: [None]):
+            VisibilityContext.invalidate([instance.id])
+    else:
+        VisibilityContext.invalidate(_changed_ids(
+            action, pk_set,
+            lambda: instance.users.values_list('id', flat=True)))
+
+
+@receiver(m2m_changed, sender=Profile.blocked_tags.through)
+def invalidate_on_tag_block(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    """Invalidates the visibility of users who have (un)blocked tags."""
+    if reverse:
+        # A tag's blocked_by changed, and pk_set holds profile ids.
+        profile_ids = _changed_ids(
+            action, pk_set,
+            lambda: instance.blocked_by.values_list('id', flat=True))
+        if profile_ids:
+            VisibilityContext.invalidate(Profile.objects.filter(
+                id__in=list(profile_ids)).values_list('user_id', flat=True))
+    elif _changed_ids(action, pk_set, lambda: [None]):
+        VisibilityContext.invalidate([instance.user_id])
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_on_profile_save(sender, instance, **kwargs):
+    """Invalidates a user's visibility when their settings change."""
+    VisibilityContext.invalidate([instance.user_id])
+
+
+@receiver(m2m_changed, sender=Profile.favorited_submissions.through)
+def update_favorite_count(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Keeps `Submission.favorite_count` in step with favorites.
+
+    Adds only report new favorites, but removes report every id asked for and
+    clears report none, so the favorites which actually exist are looked up
+    before they go.  Counters are updated in the same transaction as the
+    relation.
+    """
+    if reverse:
+        own_field, other_field = 'submission_id', 'profile_id'
+    else:
+        own_field, other_field = 'profile_id', 'submission_id'
+    if action in ('pre_remove', 'pre_clear'):
+        favorites = sender.objects.filter(**{own_field: instance.id})
+        if action == 'pre_remove':
+            favorites = favorites.filter(
+                **{'{}__in'.format(other_field): pk_set})
+        instance._removed_favorites = set(
+            favorites.values_list(other_field, flat=True))
+        return
+    if action == 'post_add':
+        delta = 1
+    elif action in ('post_remove', 'post_clear'):
+        pk_set = instance.__dict__.pop('_removed_favorites', set())
+        delta = -1
+    else:
+        return
+    if not pk_set:
+        return
+    if reverse:
+        # A submission gained or lost favorites from several profiles.
+        Submission.objects.filter(id=instance.id).update(
+            favorite_count=F('favorite_count') + delta * len(pk_set))
+    else:
+        Submission.objects.filter(id__in=pk_set).update(
+            favorite_count=F('favorite_count') + delta)
+    SiteStatistic.adjust({'favorites': delta * len(pk_set)})
+
+
+@receiver(pre_delete, sender=Profile)
+def release_favorites(sender, instance, **kwargs):
+    """Takes a deleted profile's favorites off submissions' counts.
+
+    Deletion cascades to the relation without sending `m2m_changed`.
+    """
+    released = Submission.objects.filter(favorited_by=instance).update(
+        favorite_count=F('favorite_count') - 1)
+    SiteStatistic.adjust({'favorites': -released})
@@ -6,7 +6,10 @@ from .models import (
     FolderItem,
     Submission,
 )
-from .tests import SubmissionsViewsBaseTestCase
+from .tests import (
+    ListingQueryCountTestCase,
+    SubmissionsViewsBaseTestCase,
+)
 
 
 class SubmissionsFolderViewsBaseTestCase(SubmissionsViewsBaseTestCase):
@@ -74,11 +77,9 @@ class TestViewRootLevelFoldersView(SubmissionsFolderViewsBaseTestCase):
             'submissions:view_root_level_folders', kwargs={
                 'username': 'foo',
             }))
-        self.assertContains(response, '<a href="{}">2</a>'.format(
-            reverse('submissions:view_root_level_folders', kwargs={
-                'username': 'foo',
-                'page': 2,
-            })))
+        self.assertContains(response, 'Showing 25 of 29 results')
+        self.assertContains(response, '?after={}"'.format(
+            response.context['submissions'].next_token))
 
     def test_paginates_submissions_respecting_user_settings(self):
         for i in range(1, 30):
@@ -94,26 +95,23 @@ class TestViewRootLevelFoldersView(SubmissionsFolderViewsBaseTestCase):
             'submissions:view_root_level_folders', kwargs={
                 'username': 'foo',
             }))
-        self.assertContains(response, '<a href="{}">3</a>'.format(
-            reverse('submissions:view_root_level_folders', kwargs={
-                'username': 'foo',
-                'page': 3,
-            })))
+        self.assertContains(response, 'Showing 10 of 29 results')
 
-    def test_paginates_submissions_resets_to_last_page(self):
+    def test_paginates_submissions_follows_cursors(self):
         for i in range(1, 30):
             Submission(
                 ctime=timezone.now(),
                 owner=self.foo,
                 title='Submission {}'.format(i)).save(update_content=True)
-        response = self.client.get(reverse(
-            'submissions:view_root_level_folders', kwargs={
-                'username': 'foo',
-                'page': 42,
-            }))
-        self.assertContains(
-            response,
-            '2 <span class="sr-only">(current)</span>')
+        url = reverse('submissions:view_root_level_folders', kwargs={
+            'username': 'foo',
+        })
+        response = self.client.get(url)
+        response = self.client.get('{}?after={}'.format(
+            url, response.context['submissions'].next_token))
+        self.assertContains(response, 'Showing 4 of 29 results')
+        self.assertContains(response, '?before={}"'.format(
+            response.context['submissions'].previous_token))
 
 
 class TestViewFolderView(SubmissionsFolderViewsBaseTestCase):
@@ -295,6 +293,36 @@ class TestViewFolderView(SubmissionsFolderViewsBaseTestCase):
         self.assertContains(response, 'New folder')
 
 
+class TestFolderViewsQueryCount(ListingQueryCountTestCase):
+    def test_view_root_level_folders(self):
+        self.assertConstantQueries(reverse(
+            'submissions:view_root_level_folders', kwargs={
+                'username': 'foo',
+            }))
+
+    def test_view_folder(self):
+        folder = Folder(owner=self.foo, name='Listed')
+        folder.save()
+        self.assertConstantQueries(reverse(
+            'submissions:view_folder', kwargs={
+                'username': 'foo',
+                'folder_id': folder.id,
+                'folder_slug': folder.slug,
+            }), folder=folder)
+
+    def test_delete_folder(self):
+        folder = Folder(owner=self.foo, name='Listed')
+        folder.save()
+        self.client.login(username='foo',
+                          password='a good password')
+        self.assertConstantQueries(reverse(
+            'submissions:delete_folder', kwargs={
+                'username': 'foo',
+                'folder_id': folder.id,
+                'folder_slug': folder.slug,
+            }), folder=folder)
+
+
 class TestCreateFolderView(SubmissionsFolderViewsBaseTestCase):
     def test_populates_folders_queryset(self):
         self.client.login(username='foo',
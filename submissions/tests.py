@@ -6,26 +6,48 @@ try:
 except ImportError:
     from io import StringIO
 import tempfile
+import time
 
-from django.contrib.auth.models import User
+from django.contrib.auth.models import (
+    AnonymousUser,
+    User,
+)
 from django.core.files import File
 from django.core.files.storage import Storage
 from django.core.urlresolvers import reverse
+from django.core.cache import cache
+from django.db import (
+    DatabaseError,
+    connection,
+)
 from django.test import (
     TestCase,
     override_settings,
 )
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from .models import (
     Folder,
     FolderItem,
+    ProcessingJob,
     Submission,
     content_path,
     cover_path,
     icon_path,
 )
+from .processing import (
+    queue_processing,
+    run_pending_jobs,
+)
+from .utils import VisibilityContext
+from .view_counter import (
+    ViewCounter,
+    view_counter,
+)
+from activitystream.models import Activity
 from social.models import Rating
+from taggit.models import Tag
 from usermgmt.group_models import FriendGroup
 from usermgmt.models import Profile
 
@@ -88,6 +110,45 @@ class TestSubmissionModel(ModelTest):
             u'stars': u'&#x2605;&#x2605;&#x2605;&#x2606;&#x2606;'
         })
 
+    def test_rating_totals_adjusted_incrementally(self):
+        rating = Rating(
+            owner=self.foo,
+            submission=self.submission1,
+            rating=2)
+        rating.save()
+        submission = Submission.objects.get(pk=self.submission1.pk)
+        self.assertEqual(submission.rating_sum, 2)
+        self.assertEqual(submission.rating_count, 1)
+        rating.rating = 4
+        rating.save()
+        submission = Submission.objects.get(pk=self.submission1.pk)
+        self.assertEqual(submission.rating_sum, 4)
+        self.assertEqual(submission.rating_count, 1)
+        self.assertEqual(
+            submission.rating_stars,
+            '&#x2605;&#x2605;&#x2605;&#x2605;&#x2606;')
+        rating.delete()
+        submission = Submission.objects.get(pk=self.submission1.pk)
+        self.assertEqual(submission.rating_sum, 0)
+        self.assertEqual(submission.rating_count, 0)
+        self.assertEqual(submission.get_average_rating()['average'], 0)
+
+    def test_rating_does_not_recount_ratings(self):
+        Rating(
+            owner=self.foo,
+            submission=self.submission1,
+            rating=3).save()
+        rating = Rating(
+            owner=self.foo,
+            submission=Submission.objects.get(pk=self.submission1.pk),
+            rating=5)
+        with CaptureQueriesContext(connection) as queries:
+            rating.save()
+        self.assertFalse([query for query in queries
+                          if 'FROM "social_rating"' in query['sql']])
+        self.assertEqual(rating.submission.rating_sum, 8)
+        self.assertEqual(rating.submission.rating_count, 2)
+
     def test_str(self):
         self.assertEqual(self.submission1.__str__(),
                          'Submission 1 by ~foo (id:1)')
@@ -165,6 +226,205 @@ class TestSubmissionModel_Isolated(ModelTest):
         self.assertTrue(convert_mock.called)
 
 
+class TestSubmissionProcessing(ModelTest):
+    def setUp(self):
+        self.submission1.content_raw = 'Content *processed*'
+
+    def test_queue_eager(self):
+        self.submission1.save()
+        job = queue_processing(self.submission1)
+        submission = Submission.objects.get(pk=self.submission1.pk)
+        self.assertEqual(job.status, ProcessingJob.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(submission.processing_status, Submission.READY)
+        self.assertEqual(submission.content_rendered,
+                         '<p>Content <em>processed</em></p>')
+
+    @override_settings(SUBMISSION_PROCESSING_EAGER=False)
+    def test_queue_deferred(self):
+        self.submission1.save()
+        job = queue_processing(self.submission1)
+        submission = Submission.objects.get(pk=self.submission1.pk)
+        self.assertEqual(job.status, ProcessingJob.PENDING)
+        self.assertEqual(submission.processing_status, Submission.PROCESSING)
+        self.assertNotIn('processed', submission.content_rendered)
+
+    @override_settings(SUBMISSION_PROCESSING_EAGER=False)
+    def test_queue_reuses_pending_job(self):
+        self.submission1.save()
+        job1 = queue_processing(self.submission1)
+        job2 = queue_processing(self.submission1)
+        self.assertEqual(job1.pk, job2.pk)
+        self.assertEqual(ProcessingJob.objects.count(), 1)
+
+    @override_settings(SUBMISSION_PROCESSING_EAGER=False)
+    def test_run_pending_jobs(self):
+        self.submission1.save()
+        queue_processing(self.submission1)
+        self.assertEqual(run_pending_jobs(), (1, 0))
+        submission = Submission.objects.get(pk=self.submission1.pk)
+        self.assertEqual(submission.processing_status, Submission.READY)
+        self.assertEqual(submission.content_rendered,
+                         '<p>Content <em>processed</em></p>')
+        self.assertEqual(run_pending_jobs(), (0, 0))
+
+    @override_settings(SUBMISSION_PROCESSING_EAGER=False)
+    def test_failed_job_retried(self):
+        self.submission1.save()
+        job = queue_processing(self.submission1)
+        with mock.patch.object(Submission, 'process_content') as mock_process:
+            mock_process.side_effect = ValueError('oh no')
+            self.assertEqual(run_pending_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProcessingJob.FAILED)
+        self.assertIn('oh no', job.error)
+        self.assertEqual(
+            Submission.objects.get(pk=self.submission1.pk).processing_status,
+            Submission.FAILED)
+
+        # Failed jobs are only retried when asked
+        self.assertEqual(run_pending_jobs(), (0, 0))
+        self.assertEqual(run_pending_jobs(retry_failed=True), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ProcessingJob.DONE)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.error, '')
+
+    @override_settings(SUBMISSION_PROCESSING_EAGER=False)
+    def test_failed_job_max_attempts(self):
+        self.submission1.save()
+        job = queue_processing(self.submission1)
+        with mock.patch.object(Submission, 'process_content') as mock_process:
+            mock_process.side_effect = ValueError('oh no')
+            run_pending_jobs()
+            run_pending_jobs(retry_failed=True, max_attempts=2)
+            self.assertEqual(
+                run_pending_jobs(retry_failed=True, max_attempts=2), (0, 0))
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+
+    def test_get_counts_before_processing(self):
+        self.submission1.counts = ''
+        self.assertEqual(self.submission1.get_counts()['counts']['words'], 0)
+
+
+class TestSubmissionViewCounter(ModelTest):
+    def setUp(self):
+        self.counter = ViewCounter(stripes=2)
+
+    def test_views_buffered_until_flush(self):
+        self.counter.record(self.submission1.id, 'ip:127.0.0.1')
+        self.counter.record(self.submission1.id, 'user:2')
+        self.assertEqual(self.counter.pending(self.submission1.id), 2)
+        self.submission1.refresh_from_db()
+        self.assertEqual(self.submission1.views, 0)
+        self.assertEqual(self.counter.flush(), 2)
+        self.submission1.refresh_from_db()
+        self.assertEqual(self.submission1.views, 2)
+        self.assertEqual(self.counter.pending(self.submission1.id), 0)
+        self.assertEqual(Activity.objects.filter(
+            activity_type='submission:view',
+            object_id=self.submission1.id).count(), 2)
+
+    def test_repeat_views_deduplicated(self):
+        self.assertTrue(
+            self.counter.record(self.submission1.id, 'ip:127.0.0.1'))
+        self.assertFalse(
+            self.counter.record(self.submission1.id, 'ip:127.0.0.1'))
+        self.assertEqual(self.counter.pending(self.submission1.id), 1)
+
+    @override_settings(SUBMISSION_VIEW_DEDUPLICATION_WINDOW=0)
+    def test_repeat_views_counted_after_window(self):
+        self.counter.record(self.submission1.id, 'ip:127.0.0.1')
+        self.counter.record(self.submission1.id, 'ip:127.0.0.1')
+        self.assertEqual(self.counter.pending(self.submission1.id), 2)
+
+    @override_settings(SUBMISSION_VIEW_FLUSH_THRESHOLD=2)
+    def test_flush_due_at_threshold(self):
+        self.counter.record(self.submission1.id, 'user:2')
+        self.assertFalse(self.counter._due.is_set())
+        self.assertEqual(self.counter.flush_if_due(), 0)
+        with self.assertNumQueries(0):
+            self.counter.record(self.submission1.id, 'user:3')
+        self.assertTrue(self.counter._due.is_set())
+        self.submission1.refresh_from_db()
+        self.assertEqual(self.submission1.views, 0)
+        self.assertEqual(self.counter.flush_if_due(), 2)
+        self.submission1.refresh_from_db()
+        self.assertEqual(self.submission1.views, 2)
+
+    def test_flushes_on_exit_once_started(self):
+        with mock.patch('submissions.view_counter.atexit.register') as reg, \
+                mock.patch.object(self.counter, '_run_timer'):
+            self.counter.start_timer()
+            self.counter.start_timer()
+        reg.assert_called_once_with(self.counter._flush_on_exit)
+
+    def test_flush_nothing_pending(self):
+        self.assertEqual(self.counter.flush(), 0)
+
+    def test_views_put_back_if_flush_fails(self):
+        self.counter.record(self.submission1.id, 'user:2')
+        with mock.patch('submissions.view_counter.Activity.objects.'
+                        'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.counter.flush()
+        self.assertEqual(self.counter.pending(self.submission1.id), 1)
+        self.submission1.refresh_from_db()
+        self.assertEqual(self.submission1.views, 0)
+        self.assertEqual(self.counter.flush(), 1)
+        self.submission1.refresh_from_db()
+        self.assertEqual(self.submission1.views, 1)
+
+    @override_settings(SUBMISSION_VIEW_FLUSH_INTERVAL=60)
+    def test_flush_if_due(self):
+        self.counter.record(self.submission1.id, 'user:2')
+        self.assertEqual(self.counter.flush_if_due(), 0)
+        with mock.patch('submissions.view_counter.time.time',
+                        return_value=time.time() + 61):
+            self.assertEqual(self.counter.flush_if_due(), 1)
+
+
+class TestSubmissionFavoriteCount(ModelTest):
+    def setUp(self):
+        self.bar = User.objects.create_user('bar', 'bar@example.com',
+                                            'another good password')
+        Profile(user=self.bar).save()
+        self.bar = User.objects.get(pk=self.bar.pk)
+
+    def get_count(self):
+        return Submission.objects.get(pk=self.submission1.pk).favorite_count
+
+    def test_add_and_remove(self):
+        self.bar.profile.favorited_submissions.add(self.submission1)
+        self.assertEqual(self.get_count(), 1)
+        self.bar.profile.favorited_submissions.add(self.submission1)
+        self.assertEqual(self.get_count(), 1)
+        self.bar.profile.favorited_submissions.remove(self.submission1)
+        self.assertEqual(self.get_count(), 0)
+        self.bar.profile.favorited_submissions.remove(self.submission1)
+        self.assertEqual(self.get_count(), 0)
+
+    def test_add_and_remove_reverse(self):
+        self.submission1.favorited_by.add(self.foo.profile, self.bar.profile)
+        self.assertEqual(self.get_count(), 2)
+        self.submission1.favorited_by.remove(self.bar.profile)
+        self.assertEqual(self.get_count(), 1)
+
+    def test_clear(self):
+        self.bar.profile.favorited_submissions.add(self.submission1)
+        self.foo.profile.favorited_submissions.add(self.submission1)
+        self.bar.profile.favorited_submissions.clear()
+        self.assertEqual(self.get_count(), 1)
+        self.submission1.favorited_by.clear()
+        self.assertEqual(self.get_count(), 0)
+
+    def test_deleting_profile_releases_favorites(self):
+        self.bar.profile.favorited_submissions.add(self.submission1)
+        self.bar.profile.delete()
+        self.assertEqual(self.get_count(), 0)
+
+
 class TestFolderModel(ModelTest):
     def test_str(self):
         self.assertEqual(self.folder.__str__(), 'Folder 1')
@@ -212,6 +472,93 @@ class SubmissionsViewsBaseTestCase(TestCase):
         cls.bar.profile.favorited_submissions.add(cls.submission2)
         cls.bar.profile.save()
 
+    def tearDown(self):
+        # Views are buffered in process; don't let them outlive the test.
+        view_counter.reset()
+        super(SubmissionsViewsBaseTestCase, self).tearDown()
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'visibility-tests',
+    }
+})
+class TestVisibilityContext(SubmissionsViewsBaseTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def visible_to(self, user):
+        return list(Submission.objects.filter(
+            VisibilityContext.for_reader(user).get_filters()).order_by('id'))
+
+    def test_anonymous(self):
+        Submission.objects.filter(pk=self.submission2.pk).update(hidden=True)
+        self.assertEqual(self.visible_to(AnonymousUser()), [self.submission1])
+
+    def test_blocked_by_uses_user_ids(self):
+        # Make sure user and profile ids differ.
+        User.objects.create_user('qux', 'qux@example.com', 'a password')
+        blocker = User.objects.create_user('quux', 'quux@example.com',
+                                           'a password')
+        blocker.profile = Profile()
+        blocker.profile.save()
+        self.assertNotEqual(blocker.id, blocker.profile.id)
+        submission = Submission(owner=blocker, title='Blocker submission',
+                                ctime=timezone.now())
+        submission.save(update_content=True)
+        blocker.profile.blocked_users.add(self.bar)
+        self.assertNotIn(submission, self.visible_to(self.bar))
+        self.assertIn(submission, self.visible_to(self.baz))
+
+    def test_context_cached(self):
+        VisibilityContext.for_reader(self.bar)
+        with self.assertNumQueries(0):
+            VisibilityContext.for_reader(self.bar)
+
+    def test_invalidated_on_block(self):
+        self.assertEqual(len(self.visible_to(self.bar)), 2)
+        self.foo.profile.blocked_users.add(self.bar)
+        self.assertEqual(self.visible_to(self.bar), [])
+        self.foo.profile.blocked_users.clear()
+        self.assertEqual(len(self.visible_to(self.bar)), 2)
+
+    def test_invalidated_on_group_change(self):
+        Submission.objects.filter(pk=self.submission1.pk).update(
+            restricted_to_groups=True)
+        self.submission1.allowed_groups.add(self.group)
+        self.assertEqual(self.visible_to(self.bar), [self.submission2])
+        self.group.users.add(self.bar)
+        self.assertEqual(len(self.visible_to(self.bar)), 2)
+        self.bar.friendgroup_set.remove(self.group)
+        self.assertEqual(self.visible_to(self.bar), [self.submission2])
+
+    def test_invalidated_on_tag_block(self):
+        self.submission1.tags.add('foo')
+        self.assertEqual(len(self.visible_to(self.bar)), 2)
+        self.bar.profile.blocked_tags.add(Tag.objects.get(name='foo'))
+        self.assertEqual(self.visible_to(self.bar), [self.submission2])
+
+    def test_invalidated_on_profile_change(self):
+        Submission.objects.filter(pk=self.submission1.pk).update(
+            adult_rating=True)
+        self.assertEqual(len(self.visible_to(self.bar)), 2)
+        profile = Profile.objects.get(user=self.bar)
+        profile.can_see_adult_submissions = False
+        profile.save()
+        self.assertEqual(self.visible_to(User.objects.get(pk=self.bar.pk)),
+                         [self.submission2])
+
+    def test_multiple_groups_do_not_duplicate(self):
+        group2 = FriendGroup(name='Group 2')
+        group2.save()
+        self.group.users.add(self.bar)
+        group2.users.add(self.bar)
+        Submission.objects.filter(pk=self.submission1.pk).update(
+            restricted_to_groups=True)
+        self.submission1.allowed_groups.add(self.group, group2)
+        self.assertEqual(len(self.visible_to(self.bar)), 2)
+
 
 class TestLoggedOutListUserSubmissionsView(SubmissionsViewsBaseTestCase):
     def test_all_visible(self):
@@ -255,13 +602,10 @@ class TestLoggedOutListUserSubmissionsView(SubmissionsViewsBaseTestCase):
             submission.save(update_content=True)
         response = self.client.get(reverse(
             'submissions:list_user_submissions', kwargs={'username': 'foo'}))
-        self.assertContains(response, '<a href="{}">2</a>'.format(
-            reverse('submissions:list_user_submissions', kwargs={
-                'username': 'foo',
-                'page': 2
-            })))
+        self.assertContains(response, '?after={}"'.format(
+            response.context['submissions'].next_token))
 
-    def test_reset_paginate_if_out_of_range(self):
+    def test_paginate_with_cursors(self):
         for i in range(3, 30):
             submission = Submission(
                 owner=self.foo,
@@ -270,13 +614,16 @@ class TestLoggedOutListUserSubmissionsView(SubmissionsViewsBaseTestCase):
                 content_raw='Content',
                 ctime=timezone.now())
             submission.save(update_content=True)
-        response = self.client.get(reverse(
-            'submissions:list_user_submissions', kwargs={
-                'username': 'foo',
-                'page': 20,
-            }))
-        self.assertContains(response,
-                            '2 <span class="sr-only">(current)</span>')
+        url = reverse('submissions:list_user_submissions', kwargs={
+            'username': 'foo',
+        })
+        response = self.client.get(url)
+        response = self.client.get('{}?after={}'.format(
+            url, response.context['submissions'].next_token))
+        self.assertContains(response, 'Showing 4 of 29 results')
+        self.assertContains(response, 'Submission 29')
+        response = self.client.get('{}?after=garbage'.format(url))
+        self.assertContains(response, 'Showing 25 of 29 results')
 
 
 class TestLoggedInListUserSubmissionsView(SubmissionsViewsBaseTestCase):
@@ -319,11 +666,8 @@ class TestLoggedInListUserSubmissionsView(SubmissionsViewsBaseTestCase):
             'submissions:list_user_submissions', kwargs={'username': 'foo'}))
         self.assertContains(response, 'Submission 1')
         self.assertNotContains(response, 'Submission 2')
-        self.assertContains(response, '<a href="{}">2</a>'.format(
-            reverse('submissions:list_user_submissions', kwargs={
-                'username': 'foo',
-                'page': 2
-            })))
+        self.assertContains(response, '?after={}"'.format(
+            response.context['submissions'].next_token))
 
     def test_group_locked_submission_without_matching_group_not_shown(self):
         self.submission2.restricted_to_groups = True
@@ -408,13 +752,10 @@ class TestLoggedOutListUserFavoritesView(SubmissionsViewsBaseTestCase):
         self.bar.save()
         response = self.client.get(reverse(
             'submissions:list_user_favorites', kwargs={'username': 'bar'}))
-        self.assertContains(response, '<a href="{}">2</a>'.format(
-            reverse('submissions:list_user_favorites', kwargs={
-                'username': 'bar',
-                'page': 2
-            })))
+        self.assertContains(response, '?after={}"'.format(
+            response.context['submissions'].next_token))
 
-    def test_reset_paginate_if_out_of_range(self):
+    def test_paginate_with_cursors(self):
         for i in range(3, 30):
             submission = Submission(
                 owner=self.foo,
@@ -425,13 +766,16 @@ class TestLoggedOutListUserFavoritesView(SubmissionsViewsBaseTestCase):
             submission.save(update_content=True)
             self.bar.profile.favorited_submissions.add(submission)
         self.bar.profile.save()
-        response = self.client.get(reverse(
-            'submissions:list_user_favorites', kwargs={
-                'username': 'bar',
-                'page': 50,
-            }))
-        self.assertContains(response,
-                            '2 <span class="sr-only">(current)</span>')
+        url = reverse('submissions:list_user_favorites', kwargs={
+            'username': 'bar',
+        })
+        response = self.client.get(url)
+        response = self.client.get('{}?after={}'.format(
+            url, response.context['submissions'].next_token))
+        self.assertContains(response, 'Showing 4 of 29 results')
+        self.assertContains(response, 'Submission 29')
+        response = self.client.get('{}?after=garbage'.format(url))
+        self.assertContains(response, 'Showing 25 of 29 results')
 
 
 class TestLoggedInListUserFavoritesView(SubmissionsViewsBaseTestCase):
@@ -474,11 +818,8 @@ class TestLoggedInListUserFavoritesView(SubmissionsViewsBaseTestCase):
             'submissions:list_user_favorites', kwargs={'username': 'bar'}))
         self.assertContains(response, 'Submission 1')
         self.assertNotContains(response, 'Submission 2')
-        self.assertContains(response, '<a href="{}">2</a>'.format(
-            reverse('submissions:list_user_favorites', kwargs={
-                'username': 'bar',
-                'page': 2
-            })))
+        self.assertContains(response, '?after={}"'.format(
+            response.context['submissions'].next_token))
 
     def test_group_locked_submission_without_matching_group_not_shown(self):
         self.submission2.restricted_to_groups = True
@@ -517,6 +858,101 @@ class TestLoggedInListUserFavoritesView(SubmissionsViewsBaseTestCase):
         self.assertContains(response, 'Submission 2')
 
 
+class TestSortListingsByFavorites(SubmissionsViewsBaseTestCase):
+    def test_sort_by_favorites(self):
+        self.baz.profile.favorited_submissions.add(self.submission2)
+        url = reverse('submissions:list_user_submissions',
+                      kwargs={'username': 'foo'})
+        response = self.client.get(url)
+        self.assertEqual(
+            [submission.title for submission in
+             response.context['submissions']],
+            ['Submission 1', 'Submission 2'])
+        response = self.client.get('{}?sort=favorites'.format(url))
+        self.assertEqual(
+            [submission.title for submission in
+             response.context['submissions']],
+            ['Submission 2', 'Submission 1'])
+        self.assertContains(response, '<strong>favorites</strong>')
+
+    def test_sort_by_favorites_keeps_sort_across_pages(self):
+        self.baz.profile.favorited_submissions.add(self.submission2)
+        self.client.login(username='bar',
+                          password='another good password')
+        url = reverse('submissions:list_user_favorites',
+                      kwargs={'username': 'bar'})
+        response = self.client.get('{}?sort=favorites'.format(url))
+        self.assertContains(response, 'Submission 2')
+        self.assertNotContains(response, 'Submission 1')
+        next_token = response.context['submissions'].next_token
+        self.assertContains(response, '?sort=favorites&amp;after={}"'.format(
+            next_token))
+        response = self.client.get('{}?sort=favorites&after={}'.format(
+            url, next_token))
+        self.assertContains(response, 'Submission 1')
+        self.assertNotContains(response, 'Submission 2')
+
+    def test_unknown_sort_falls_back_to_date(self):
+        response = self.client.get('{}?sort=bogus'.format(reverse(
+            'submissions:list_user_submissions', kwargs={'username': 'foo'})))
+        self.assertEqual(response.context['sort'], 'date')
+
+
+class ListingQueryCountTestCase(SubmissionsViewsBaseTestCase):
+    """Listings should take the same number of queries however many
+    submissions they show."""
+
+    def add_submissions(self, count, folder=None):
+        for i in range(count):
+            submission = Submission(
+                owner=self.foo,
+                title='Listed submission {}'.format(i),
+                description_raw='Listed',
+                content_raw='Listed',
+                ctime=timezone.now())
+            submission.save(update_content=True)
+            submission.tags.add('listed', 'listed-{}'.format(i))
+            self.bar.profile.favorited_submissions.add(submission)
+            if folder is not None:
+                FolderItem(folder=folder, submission=submission,
+                           position=i + 1).save()
+
+    def assertConstantQueries(self, url, folder=None):
+        self.add_submissions(2, folder=folder)
+        # Warm up anything cached per process, such as content types.
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.add_submissions(20, folder=folder)
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+        self.assertContains(response, 'Listed submission 19')
+
+
+class TestListUserSubmissionsQueryCount(ListingQueryCountTestCase):
+    def test_logged_out(self):
+        self.assertConstantQueries(reverse(
+            'submissions:list_user_submissions', kwargs={'username': 'foo'}))
+
+    def test_logged_in(self):
+        self.client.login(username='baz',
+                          password='wow a good password')
+        self.assertConstantQueries(reverse(
+            'submissions:list_user_submissions', kwargs={'username': 'foo'}))
+
+
+class TestListUserFavoritesQueryCount(ListingQueryCountTestCase):
+    def test_logged_out(self):
+        self.assertConstantQueries(reverse(
+            'submissions:list_user_favorites', kwargs={'username': 'bar'}))
+
+    def test_logged_in(self):
+        self.client.login(username='baz',
+                          password='wow a good password')
+        self.assertConstantQueries(reverse(
+            'submissions:list_user_favorites', kwargs={'username': 'bar'}))
+
+
 class TestLoggedOutViewSubmissionView(SubmissionsViewsBaseTestCase):
     def test_view_submission(self):
         response = self.client.get(reverse('submissions:view_submission',
@@ -529,6 +965,18 @@ class TestLoggedOutViewSubmissionView(SubmissionsViewsBaseTestCase):
         self.assertContains(response, '<dt>Views</dt>')
         self.assertContains(response, '<dd>1</dd>')
 
+    def test_view_submission_counts_repeat_views_once(self):
+        url = reverse('submissions:view_submission', kwargs={
+            'username': 'foo',
+            'submission_id': 1,
+            'submission_slug': 'submission-1',
+        })
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertContains(response, '<dd>1</dd>')
+        view_counter.flush()
+        self.assertEqual(Submission.objects.get(pk=1).views, 1)
+
     def test_view_submission_redirects_to_complete_url(self):
         response = self.client.get(reverse('submissions:view_submission',
                                    kwargs={'submission_id': 1}))
@@ -942,6 +1390,26 @@ class TestSubmitView(SubmissionsViewsBaseTestCase):
         self.assertEqual(self.folder.submissions.count(), 1)
         self.assertEqual(self.group.submission_set.count(), 1)
 
+    @override_settings(SUBMISSION_PROCESSING_EAGER=False)
+    def test_submission_queued_for_processing(self):
+        self.client.login(username='foo',
+                          password='a good password')
+        response = self.client.post(reverse('submissions:submit'),
+                                    {
+                                        'title': 'Reasons foxes are great',
+                                        'content_raw': 'There are too many.',
+                                        'tags': 'foo, bar',
+                                    }, follow=True)
+        self.assertContains(response, 'Reasons foxes are great')
+        self.assertContains(response, 'still being processed')
+        self.assertNotContains(response, 'There are too many.')
+        self.assertEqual(ProcessingJob.objects.filter(
+            status=ProcessingJob.PENDING).count(), 1)
+        run_pending_jobs()
+        response = self.client.get(response.redirect_chain[-1][0])
+        self.assertNotContains(response, 'still being processed')
+        self.assertContains(response, 'There are too many.')
+
     @override_settings(MAX_UPLOAD_SIZE=1)
     def test_filesize_check(self):
         with open('README.md') as f:
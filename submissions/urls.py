@@ -21,8 +21,6 @@ full_folder_patterns = [
 folder_patterns = [
     url('^$', folder_views.view_root_level_folders,
         name='view_root_level_folders'),
-    url('^page/(?P<page>\d+)/$', folder_views.view_root_level_folders,
-        name='view_root_level_folders'),
     url('^create/$', folder_views.create_folder, name='create_folder'),
     url('^(?P<folder_id>\d+)/$', folder_views.view_folder, name='view_folder'),
     url('^(?P<folder_id>\d+)-(?P<folder_slug>[-\w]+)/',
@@ -40,11 +38,7 @@ urlpatterns = [
     url(settings.SUBMISSION_BASE, include(submission_patterns)),
     url('^~(?P<username>[^/]+)/submissions/$',
         views.list_user_submissions, name='list_user_submissions'),
-    url('^~(?P<username>[^/]+)/submissions/page/(?P<page>\d+)/$',
-        views.list_user_submissions, name='list_user_submissions'),
     url('^~(?P<username>[^/]+)/favorites/$',
         views.list_user_favorites, name='list_user_favorites'),
-    url('^~(?P<username>[^/]+)/favorites/page/(?P<page>\d+)/$',
-        views.list_user_favorites, name='list_user_favorites'),
     url('^~(?P<username>[^/]+)/folders/', include(folder_patterns)),
 ]
@@ -1,5 +1,144 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.db.models import Q
 
+from .models import Submission
+
+
+class VisibilityContext(object):
+    """The set of facts about a reader which decide which submissions they
+    can see.
+
+    Contexts for authenticated readers are built with three small queries and
+    cached until the reader's blocks, groups, tags or adult content setting
+    change (see `submissions.signals`), and compile to a filter which uses
+    subqueries rather than joins, so that listings neither duplicate rows nor
+    need `distinct()`.
+    """
+
+    def __init__(self, reader_id=None, can_see_adult_submissions=False,
+                 blocked_by_ids=(), group_ids=(), blocked_tag_ids=()):
+        self.reader_id = reader_id
+        self.can_see_adult_submissions = can_see_adult_submissions
+        self.blocked_by_ids = frozenset(blocked_by_ids)
+        self.group_ids = frozenset(group_ids)
+        self.blocked_tag_ids = frozenset(blocked_tag_ids)
+
+    @staticmethod
+    def get_cache_key(reader_id):
+        return 'visibility:{}'.format(reader_id)
+
+    @classmethod
+    def for_reader(cls, reader):
+        """Gets the visibility context for a reader.
+
+        Args:
+            reader: the user viewing submissions, who may be anonymous
+
+        Returns:
+            The reader's `VisibilityContext`
+        """
+        if not reader.is_authenticated:
+            return ANONYMOUS
+        key = cls.get_cache_key(reader.id)
+        data = cache.get(key)
+        if data is None:
+            data = {
+                'reader_id': reader.id,
+                'can_see_adult_submissions':
+                    reader.profile.can_see_adult_submissions,
+                # Blocks are stored on the blocking user's profile, so map
+                # those back to user ids.
+                'blocked_by_ids': list(reader.blocked_by.values_list(
+                    'user_id', flat=True)),
+                'group_ids': list(reader.friendgroup_set.values_list(
+                    'id', flat=True)),
+                'blocked_tag_ids': list(
+                    reader.profile.blocked_tags.values_list('id', flat=True)),
+            }
+            cache.set(key, data, getattr(
+                settings, 'VISIBILITY_CACHE_TIMEOUT', 60 * 60))
+        return cls(**data)
+
+    @classmethod
+    def invalidate(cls, reader_ids):
+        """Discards the cached contexts of readers.
+
+        Args:
+            reader_ids: the ids of the users whose contexts have changed
+        """
+        cache.delete_many([cls.get_cache_key(reader_id)
+                           for reader_id in reader_ids])
+
+    def get_hash(self):
+        """Gets a hash of the context, for keying what is cached for readers
+        who see the same submissions.
+
+        The reader is left out, so that readers with the same settings, blocks
+        and groups share a hash; what is cached with it should be filtered
+        with `own=False`.
+        """
+        return hashlib.sha1(repr((
+            self.can_see_adult_submissions,
+            sorted(self.blocked_by_ids),
+            sorted(self.group_ids),
+            sorted(self.blocked_tag_ids),
+        )).encode('utf-8')).hexdigest()
+
+    def is_blocked_by(self, user):
+        """Checks whether the reader has been blocked by a user."""
+        return user.id in self.blocked_by_ids
+
+    def get_filters(self, blocked_tags=True, own=True):
+        """Compiles the context to submission filters.
+
+        Args:
+            blocked_tags: whether to filter out submissions with tags the
+                reader has blocked
+            own: whether the reader sees all of their own submissions,
+                whatever else the filters say
+
+        Returns:
+            A query object to be used in `Submission.objects.filter`
+        """
+        # Start with hidden status
+        query = Q(hidden=False)
+
+        # Add adult rating status
+        if not self.can_see_adult_submissions:
+            query &= Q(adult_rating=False)
+
+        # Add blocked user status
+        if self.blocked_by_ids:
+            query &= ~Q(owner_id__in=self.blocked_by_ids)
+
+        # Add group restrictions
+        if self.group_ids:
+            query &= (Q(restricted_to_groups=False) | Q(
+                pk__in=Submission.allowed_groups.through.objects.filter(
+                    friendgroup_id__in=self.group_ids).values(
+                        'submission_id')))
+        else:
+            query &= Q(restricted_to_groups=False)
+
+        # Filter out blocked tags if we've been asked
+        if blocked_tags and self.blocked_tag_ids:
+            query &= ~Q(pk__in=Submission.tags.through.objects.filter(
+                content_type=ContentType.objects.get_for_model(Submission),
+                tag_id__in=self.blocked_tag_ids).values('object_id'))
+
+        # Shortcut to allow authors all access
+        if own and self.reader_id is not None:
+            query = Q(owner_id=self.reader_id) | query
+        return query
+
+
+# Anonymous readers all see the same things.
+ANONYMOUS = VisibilityContext()
+
 
 def filters_for_authenticated_user(reader, blocked_tags=True):
     """Gets submission filters for an authenticated user.
@@ -10,43 +149,56 @@ def filters_for_authenticated_user(reader, blocked_tags=True):
     Returns:
         A query object to be used in `Submission.objects.filter`
     """
-    # Start with hidden status
-    query = Q(hidden=False)
+    return VisibilityContext.for_reader(reader).get_filters(
+        blocked_tags=blocked_tags)
 
-    # Add adult rating status
-    if not reader.profile.can_see_adult_submissions:
-        query &= Q(adult_rating=False)
 
-    # Add blocked user status
-    query &= (~Q(owner__id__in=[x.id for x in reader.blocked_by.all()]))
+def filters_for_anonymous_user():
+    """Gets submission filters for an anonymous user.
 
-    # Add group restrictions
-    query &= (Q(restricted_to_groups=False) |
-              (Q(restricted_to_groups=True) &
-               Q(allowed_groups__in=reader.friendgroup_set.all())))
+    Returns:
+        A query object to be used in `Submission.objects.filter`
+    """
+    return ANONYMOUS.get_filters()
 
-    # Filter out blocked tags if we've been asked
-    if blocked_tags:
-        query &= ~Q(tags__in=reader.profile.blocked_tags.all())
 
-    # Shortcut to allow authors all access
-    query = Q(owner=reader) | query
-    return query
+def prefetch_for_listing(queryset):
+    """Loads everything needed to list submissions with
+    `submission-list-snippet.html`.
 
+    Owners and their profiles are joined and tags are fetched in one query for
+    the whole page, so a page of submissions takes the same number of queries
+    however long it is.
 
-def filters_for_anonymous_user():
-    """Gets submission filters for an anonymous user.
+    Args:
+        queryset: the submissions to list
 
     Returns:
-        A query object to be used in `Submission.objects.filter`
+        The queryset, ready for listing
     """
-    # Start with hidden status
-    query = Q(hidden=False)
+    return queryset.select_related('owner__profile').prefetch_related('tags')
+
 
-    # Add adult rating status
-    query &= Q(adult_rating=False)
+# Orderings listings may be sorted by with `?sort=`, for `CursorPaginator`.
+# The favorites ordering moves as submissions are favorited, so paging through
+# it may occasionally skip or repeat a submission.
+LISTING_ORDERINGS = {
+    'date': ('ctime', 'id'),
+    'favorites': ('-favorite_count', '-ctime', '-id'),
+}
 
-    # Add group restrictions
-    query &= Q(restricted_to_groups=False)
 
-    return query
+def get_listing_ordering(request):
+    """Gets the ordering a listing has been asked to sort by.
+
+    Args:
+        request: the Django request object; `sort` may be in request.GET
+
+    Returns:
+        A tuple of the sort name and the ordering, falling back to sorting by
+        date for unknown sorts
+    """
+    sort = request.GET.get('sort')
+    if sort not in LISTING_ORDERINGS:
+        sort = 'date'
+    return sort, LISTING_ORDERINGS[sort]
@@ -0,0 +1,221 @@
+import atexit
+from collections import Counter
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import (
+    connection,
+    transaction,
+)
+from django.db.models import F
+
+from .models import Submission
+from activitystream.models import Activity
+
+
+class ViewCounter(object):
+    """Counts submission views in memory and writes them out in batches.
+
+    Counts are split across a number of stripes, each with its own lock, so
+    that concurrent requests for different submissions rarely contend.
+    Repeat views of a submission by the same reader within the de-duplication
+    window are only counted once.
+
+    Recording a view only counts it in memory.  Once started, a background
+    thread writes pending views to the database once the flush interval has
+    passed or enough views have accumulated, and again when the process
+    exits, so that requests never wait on the write and at most an
+    interval's worth of views is lost if the process is killed.  Views which
+    fail to be written are put back to be written by the next flush.  Until
+    the counter is started, views are only written by calling `flush`.
+    """
+
+    def __init__(self, stripes=16):
+        self._stripes = [{
+            'lock': threading.Lock(),
+            'counts': Counter(),
+            'seen': {},
+        } for _ in range(stripes)]
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.time()
+        self._timer_lock = threading.Lock()
+        self._timer = None
+        self._due = threading.Event()
+
+    def reset(self):
+        """Discards all pending views without writing them out."""
+        for stripe in self._stripes:
+            with stripe['lock']:
+                stripe['counts'].clear()
+                stripe['seen'] = {}
+        self._last_flush = time.time()
+
+    def _get_stripe(self, submission_id):
+        return self._stripes[submission_id % len(self._stripes)]
+
+    def record(self, submission_id, viewer_key):
+        """Records a view of a submission.
+
+        Args:
+            submission_id: the id of the submission viewed
+            viewer_key: a string identifying the reader, such as their user id
+                or IP address
+
+        Returns:
+            True if the view was counted, False if it was a repeat view
+        """
+        now = time.time()
+        window = getattr(settings, 'SUBMISSION_VIEW_DEDUPLICATION_WINDOW',
+                         60 * 30)
+        stripe = self._get_stripe(submission_id)
+        with stripe['lock']:
+            seen_key = (submission_id, viewer_key)
+            if stripe['seen'].get(seen_key, 0) > now:
+                return False
+            stripe['seen'][seen_key] = now + window
+            stripe['counts'][submission_id] += 1
+        if self.should_flush():
+            # Wake the timer rather than write views out in this request.
+            self._due.set()
+        return True
+
+    def pending(self, submission_id):
+        """Gets the number of views of a submission not yet written out."""
+        stripe = self._get_stripe(submission_id)
+        with stripe['lock']:
+            return stripe['counts'][submission_id]
+
+    def pending_total(self):
+        """Gets the number of views of all submissions not yet written out."""
+        total = 0
+        for stripe in self._stripes:
+            with stripe['lock']:
+                total += sum(stripe['counts'].values())
+        return total
+
+    def should_flush(self):
+        """Checks whether pending views are due to be written out."""
+        interval = getattr(settings, 'SUBMISSION_VIEW_FLUSH_INTERVAL', 60)
+        threshold = getattr(settings, 'SUBMISSION_VIEW_FLUSH_THRESHOLD', 100)
+        return (time.time() - self._last_flush >= interval or
+                self.pending_total() >= threshold)
+
+    def start_timer(self):
+        """Starts a thread which flushes views when they are due, and flushes
+        them when the process exits.
+
+        This is started by the WSGI application, so that processes serving
+        requests write views out even when no more come in.
+        """
+        with self._timer_lock:
+            if self._timer is None:
+                self._timer = threading.Thread(
+                    target=self._run_timer, name='view-counter-flush')
+                self._timer.daemon = True
+                self._timer.start()
+                atexit.register(self._flush_on_exit)
+
+    def _run_timer(self):
+        while True:
+            self._due.wait(
+                getattr(settings, 'SUBMISSION_VIEW_FLUSH_INTERVAL', 60))
+            self._due.clear()
+            self.flush_if_due()
+            # Don't hold a connection open between flushes.
+            connection.close()
+
+    def _flush_on_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            # The database may no longer be available while shutting down.
+            pass
+
+    def flush_if_due(self):
+        """Writes pending views out if the flush interval has passed or
+        enough views have accumulated.
+
+        Returns:
+            The number of views written
+        """
+        if not self.should_flush():
+            return 0
+        try:
+            return self.flush()
+        except Exception:
+            # The views have been put back for the next flush to retry.
+            return 0
+
+    def _put_back(self, counts):
+        for submission_id, count in counts.items():
+            stripe = self._get_stripe(submission_id)
+            with stripe['lock']:
+                stripe['counts'][submission_id] += count
+
+    def flush(self):
+        """Writes pending views to the database.
+
+        Each submission's view count is incremented with a single `F()`
+        update, and the corresponding activities are created in bulk.  If
+        writing fails, the views are put back before the error is raised.
+
+        Returns:
+            The number of views written
+        """
+        if not self._flush_lock.acquire(False):
+            # Another thread is already flushing.
+            return 0
+        try:
+            self._last_flush = now = time.time()
+            counts = Counter()
+            for stripe in self._stripes:
+                with stripe['lock']:
+                    counts.update(stripe['counts'])
+                    stripe['counts'].clear()
+                    stripe['seen'] = dict(
+                        (key, expires) for key, expires in
+                        stripe['seen'].items() if expires > now)
+            if not counts:
+                return 0
+            try:
+                ctype = ContentType.objects.get_for_model(Submission)
+                activities = []
+                with transaction.atomic():
+                    for submission_id, count in sorted(counts.items()):
+                        Submission.objects.filter(pk=submission_id).update(
+                            views=F('views') + count)
+                        activities += [Activity(
+                            activity_type='submission:view',
+                            content_type=ctype,
+                            object_id=submission_id) for _ in range(count)]
+                    Activity.objects.bulk_create(activities)
+            except Exception:
+                self._put_back(counts)
+                raise
+            return sum(counts.values())
+        finally:
+            self._flush_lock.release()
+
+
+view_counter = ViewCounter()
+
+
+def get_viewer_key(request):
+    """Gets a string identifying the reader making a request."""
+    if request.user.is_authenticated:
+        return 'user:{}'.format(request.user.id)
+    return 'ip:{}'.format(request.META.get('REMOTE_ADDR', ''))
+
+
+def record_view(request, submission):
+    """Records a view of a submission, updating its view count in place to
+    include views not yet written to the database.
+
+    Args:
+        request: the request viewing the submission
+        submission: the :model:`submissions.Submission` being viewed
+    """
+    view_counter.record(submission.id, get_viewer_key(request))
+    submission.views += view_counter.pending(submission.id)
@@ -3,10 +3,6 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
-from django.core.paginator import (
-    EmptyPage,
-    Paginator,
-)
 from django.core.urlresolvers import reverse
 from django.db.models import Q
 from django.shortcuts import (
@@ -14,6 +10,7 @@ from django.shortcuts import (
     redirect,
     render,
 )
+from django.template.defaultfilters import slugify
 from django.utils import timezone
 
 from .forms import SubmissionForm
@@ -21,44 +18,52 @@ from .models import (
     FolderItem,
     Submission,
 )
+from .processing import queue_processing
 from .utils import (
-    filters_for_anonymous_user,
-    filters_for_authenticated_user,
+    VisibilityContext,
+    get_listing_ordering,
+    prefetch_for_listing,
 )
-from activitystream.models import Activity
+from .view_counter import record_view
 from administration.models import Flag
+from core.paginator import CursorPaginator
 from core.templatetags.gravatar import gravatar
+from social.comment_tree import (
+    REPLY_ORDERING,
+    get_thread,
+    load_replies,
+    prepare_comments,
+)
 from social.forms import CommentForm
 from social.models import Comment
 
 
-def list_user_submissions(request, username=None, page=1):
+def list_user_submissions(request, username=None):
     """View for listing all of a user's submissions.
 
     Args:
         username: the user whose submissions to list
-        page: the current page for pagination
     """
     reader = request.user
     author = get_object_or_404(User, username=username)
 
     # Make sure the user can view submissions
-    if reader.is_authenticated and reader in \
-            author.profile.blocked_users.all():
+    visibility = VisibilityContext.for_reader(reader)
+    if visibility.is_blocked_by(author):
         return render(request, 'permission_denied.html', {
             'title': 'Permission denied',
         }, status=403)
 
     # Get a list of submissions based on what the reader can view
-    result = author.submission_set.filter(
-        filters_for_authenticated_user(reader) if
-        reader.is_authenticated else filters_for_anonymous_user())
-    paginator = Paginator(result, reader.profile.results_per_page if
-                          reader.is_authenticated else 25)
-    try:
-        submissions = paginator.page(page)
-    except EmptyPage:
-        submissions = paginator.page(paginator.num_pages)
+    result = prefetch_for_listing(author.submission_set.filter(
+        visibility.get_filters()))
+    sort, ordering = get_listing_ordering(request)
+    paginator = CursorPaginator(
+        result, reader.profile.results_per_page if
+        reader.is_authenticated else 25, ordering=ordering,
+        count_limit=settings.PAGINATION_COUNT_LIMIT)
+    submissions = paginator.page(after=request.GET.get('after'),
+                                 before=request.GET.get('before'))
     display_name = '{} {}'.format(
         gravatar(author.email, size=80),
         author.profile.get_display_name())
@@ -67,39 +72,37 @@ def list_user_submissions(request, username=None, page=1):
         'author': author,
         'tab': 'submissions',
         'submissions': submissions,
-        'url_prefix': reverse('submissions:list_user_submissions', kwargs={
-            'username': author.username,
-        })
+        'sort': sort,
     })
 
 
-def list_user_favorites(request, username=None, page=1):
+def list_user_favorites(request, username=None):
     """View for listing all of a user's favorited submissions.
 
     Args:
         username: the user whose favorited submissions to list
-        page: the current page for pagination
     """
     reader = request.user
     author = get_object_or_404(User, username=username)
 
     # Make sure the reader can view favorites
-    if reader.is_authenticated and reader in \
-            author.profile.blocked_users.all():
+    visibility = VisibilityContext.for_reader(reader)
+    if visibility.is_blocked_by(author):
         return render(request, 'permission_denied.html', {
             'title': 'Permission denied',
         }, status=403)
 
     # Get a list of submissions based on what the reader can view
-    result = author.profile.favorited_submissions.filter(
-        filters_for_authenticated_user(reader) if
-        reader.is_authenticated else filters_for_anonymous_user())
-    paginator = Paginator(result, reader.profile.results_per_page if
-                          reader.is_authenticated else 25)
-    try:
-        submissions = paginator.page(page)
-    except EmptyPage:
-        submissions = paginator.page(paginator.num_pages)
+    result = prefetch_for_listing(
+        author.profile.favorited_submissions.filter(
+            visibility.get_filters()))
+    sort, ordering = get_listing_ordering(request)
+    paginator = CursorPaginator(
+        result, reader.profile.results_per_page if
+        reader.is_authenticated else 25, ordering=ordering,
+        count_limit=settings.PAGINATION_COUNT_LIMIT)
+    submissions = paginator.page(after=request.GET.get('after'),
+                                 before=request.GET.get('before'))
     display_name = '{} {}'.format(
         gravatar(author.email, size=80),
         author.profile.get_display_name())
@@ -108,9 +111,7 @@ def list_user_favorites(request, username=None, page=1):
         'author': author,
         'tab': 'favorites',
         'submissions': submissions,
-        'url_prefix': reverse('submissions:list_user_favorites', kwargs={
-            'username': author.username,
-        })
+        'sort': sort,
     })
 
 
@@ -139,9 +140,10 @@ def view_submission(request, username=None, submission_id=None,
     reader = request.user
     author = submission.owner
     try:
-        submission = Submission.objects.get(Q(id=submission_id) & (
-            filters_for_authenticated_user(reader, blocked_tags=False) if
-            reader.is_authenticated else filters_for_anonymous_user()))
+        submission = Submission.objects.get(
+            Q(id=submission_id) &
+            VisibilityContext.for_reader(reader).get_filters(
+                blocked_tags=False))
     except Submission.DoesNotExist:
         # XXX Perhaps we should distinguish between 403 and 404 at some point
         return render(request, 'permission_denied.html', {
@@ -149,11 +151,9 @@ def view_submission(request, username=None, submission_id=None,
         }, status=403)
     active_flag = submission.get_active_flag()
 
-    # Increment the submission views
+    # Count the view; the counter writes views out in batches
     if request.user != submission.owner:
-        submission.views += 1
-        submission.save()
-        Activity.create('submission', 'view', submission)
+        record_view(request, submission)
         if active_flag is not None:
             can_view = False
             if request.user in active_flag.participants.all():
@@ -173,6 +173,15 @@ def view_submission(request, username=None, submission_id=None,
                                         'administrative review.'
                 }, status=403)
 
+    # Show a page of top-level comments, along with their first replies
+    paginator = CursorPaginator(
+        prepare_comments(get_thread(submission).filter(parent=None)),
+        settings.COMMENTS_PER_PAGE, ordering=REPLY_ORDERING)
+    comments = paginator.page(after=request.GET.get('after'),
+                              before=request.GET.get('before'))
+    load_replies(comments.object_list, max_depth=settings.COMMENT_REPLY_DEPTH,
+                 limit=settings.COMMENT_REPLY_LIMIT)
+
     display_name = '{} {}'.format(
         gravatar(author.email, size=40),
         author.profile.get_display_name())
@@ -185,10 +194,7 @@ def view_submission(request, username=None, submission_id=None,
         'comment_form': CommentForm(instance=Comment(
             content_type=ctype,
             object_id=submission.id)),
-        'root_level_comments': Comment.objects.filter(
-            content_type=ctype,
-            object_id=submission.id,
-            parent=None)
+        'root_level_comments': comments,
     })
 
 
@@ -227,7 +233,8 @@ def edit_submission(request, username=None, submission_id=None,
         if form.is_valid():
             submission = form.save(commit=False)
             submission.mtime = timezone.now()
-            submission.save(update_content=True)
+            submission.slug = slugify(submission.title)
+            submission.save()
 
             # Update folder membership: add to folderes
             for folder in form.cleaned_data['folders']:
@@ -256,6 +263,9 @@ def edit_submission(request, username=None, submission_id=None,
             # table for managing membership
             form.cleaned_data.pop('folders')
             form.save_m2m()
+
+            # Render content and munge files outside of the request
+            queue_processing(submission)
             messages.success(request, 'Submission updated.')
             return redirect(reverse(
                 'submissions:view_submission',
@@ -326,7 +336,8 @@ def submit(request):
             submission = form.save(commit=False)
             submission.ctime = timezone.now()
             submission.owner = request.user
-            submission.save(update_content=True)
+            submission.slug = slugify(submission.title)
+            submission.save()
 
             # Set folder memberships
             for folder in form.cleaned_data['folders']:
@@ -341,6 +352,9 @@ def submit(request):
             # Save ManyToMany data, minus folders which use a through table
             form.cleaned_data.pop('folders')
             form.save_m2m()
+
+            # Render content and munge files outside of the request
+            queue_processing(submission)
             messages.success(request, 'Submission created.')
             return redirect(reverse(
                 'submissions:view_submission',
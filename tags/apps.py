@@ -5,3 +5,6 @@ from django.apps import AppConfig
 
 class TagsConfig(AppConfig):
     name = 'tags'
+
+    def ready(self):
+        import tags.signals  # noqa: F401
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.4 on 2026-10-18 22:53
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def add_tag_statistics(apps, schema_editor):
+    """Counts the uses of existing tags."""
+    Tag = apps.get_model('taggit', 'Tag')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    TagStatistic = apps.get_model('tags', 'TagStatistic')
+    counts = dict(TaggedItem.objects.order_by().values('tag_id').annotate(
+        count=Count('id')).values_list('tag_id', 'count'))
+    TagStatistic.objects.bulk_create([
+        TagStatistic(tag_id=tag_id, use_count=counts.get(tag_id, 0))
+        for tag_id in Tag.objects.values_list('id', flat=True).iterator()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('taggit', '0002_auto_20150616_2121'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagStatistic',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistic', serialize=False, to='taggit.Tag')),
+                ('use_count', models.PositiveIntegerField(db_index=True, default=0)),
+            ],
+        ),
+        migrations.RunPython(add_tag_statistics, migrations.RunPython.noop),
+    ]
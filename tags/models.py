@@ -0,0 +1,70 @@
+from __future__ import unicode_literals
+from collections import defaultdict
+
+from django.db import models
+from django.db.models import (
+    F,
+    Max,
+    Min,
+)
+from django.db.models.functions import Greatest
+from taggit.models import Tag
+
+
+def get_bounds(statistics):
+    """Gets the least and most number of times a tag is used.
+
+    Both are read from the index on use counts.
+
+    Args:
+        statistics: a manager of tag statistics
+
+    Returns:
+        A tuple of the least and most use counts
+    """
+    bounds = statistics.aggregate(
+        count_min=Min('use_count'), count_max=Max('use_count'))
+    return (bounds['count_min'] or 0, bounds['count_max'] or 0)
+
+
+class TagStatisticManager(models.Manager):
+    def adjust(self, changes):
+        """Adjusts the use counts of tags.
+
+        Counts are updated with one query per distinct amount.
+
+        Args:
+            changes: a dict of tag ids to the amounts to adjust their use
+                counts by
+        """
+        by_delta = defaultdict(list)
+        for tag_id, delta in changes.items():
+            if delta:
+                by_delta[delta].append(tag_id)
+        for delta, tag_ids in by_delta.items():
+            if delta > 0:
+                value = F('use_count') + delta
+            else:
+                # Don't fail on counts which have drifted.
+                value = Greatest(F('use_count') + delta, 0)
+            self.filter(tag_id__in=tag_ids).update(use_count=value)
+
+
+class TagStatistic(models.Model):
+    """How often a tag is used.
+
+    Statistics are counted up and down as items are tagged and untagged, so
+    that the tag cloud does not have to count every tagged item.  Weights in
+    the tag cloud are worked out from the counts as it is rendered.
+    """
+    tag = models.OneToOneField(Tag, primary_key=True,
+                               related_name='statistic',
+                               on_delete=models.CASCADE)
+
+    # The number of items tagged with the tag
+    use_count = models.PositiveIntegerField(default=0, db_index=True)
+
+    objects = TagStatisticManager()
+
+    def __str__(self):
+        return '{} ({})'.format(self.tag_id, self.use_count)
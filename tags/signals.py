@@ -0,0 +1,41 @@
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+from taggit.models import (
+    Tag,
+    TaggedItem,
+)
+
+from .models import TagStatistic
+from core.fragments import invalidate_fragments
+
+
+@receiver(post_save, sender=Tag)
+def add_tag_statistic(sender, instance, created, **kwargs):
+    """Starts counting the uses of a new tag."""
+    if created:
+        TagStatistic.objects.get_or_create(tag=instance)
+        invalidate_fragments('tag-cloud')
+
+
+@receiver(post_save, sender=TaggedItem)
+def count_tagged_item(sender, instance, created, **kwargs):
+    """Counts a use of a tag."""
+    if created:
+        TagStatistic.objects.adjust({instance.tag_id: 1})
+        invalidate_fragments('tag-cloud')
+
+
+@receiver(post_delete, sender=TaggedItem)
+def uncount_tagged_item(sender, instance, **kwargs):
+    """Counts out a use of a tag."""
+    TagStatistic.objects.adjust({instance.tag_id: -1})
+    invalidate_fragments('tag-cloud')
+
+
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_cloud_on_delete(sender, instance, **kwargs):
+    """Removes deleted tags from the tag cloud."""
+    invalidate_fragments('tag-cloud')
@@ -1,10 +1,6 @@
 from django import template
 from django.conf import settings
-from django.db.models import (
-    Count,
-    Max,
-    Min,
-)
+from django.core.exceptions import ObjectDoesNotExist
 
 register = template.Library()
 TAG_MAX = getattr(settings, 'TAGCLOUD_MAX', 5.0)
@@ -36,28 +32,38 @@ def get_weight_closure(tag_min, tag_max, count_min, count_max):
     return linear
 
 
+def get_use_count(tag):
+    """Gets the number of times a tag is used, from its statistics."""
+    try:
+        return tag.statistic.use_count
+    except ObjectDoesNotExist:
+        return 0
+
+
 @register.assignment_tag
 def get_weighted_tags(tags):
     """Annotates a list of tags with the weight of the tag based on use.
 
+    Use counts are read from the tags' statistics in the same query as the
+    tags, and the weights are relative to the tags given rather than to every
+    tag.
+
     Args:
         tags: the list of tags to annotate
 
     Returns:
-        The tag list annotated with weights
+        The tag list annotated with weights, in alphabetical order
     """
-    # Annotate each tag with the number of times it's used
-    use_count = tags.annotate(use_count=Count('taggit_taggeditem_items'))
-    if len(use_count) == 0:
+    tags = list(tags.select_related('statistic').order_by('name'))
+    if len(tags) == 0:
         return tags
+    for tag in tags:
+        tag.use_count = get_use_count(tag)
 
     # Get the closure needed for adding weights to tags
-    get_weight = get_weight_closure(
-        TAG_MIN,
-        TAG_MAX,
-        use_count.aggregate(Min('use_count'))['use_count__min'],
-        use_count.aggregate(Max('use_count'))['use_count__max'])
-    tags = use_count.order_by('name')
+    counts = [tag.use_count for tag in tags]
+    get_weight = get_weight_closure(TAG_MIN, TAG_MAX, min(counts),
+                                    max(counts))
 
     # Add weight to each tag
     for tag in tags:
@@ -1,9 +1,16 @@
 from django.contrib.auth.models import User
+from django.utils.six.moves.urllib.parse import unquote
 from django.core.urlresolvers import reverse
-from django.test import TestCase
+from django.db import connection
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from taggit.models import Tag
 
+from .models import TagStatistic
 from submissions.models import Submission
 from usermgmt.models import Profile
 
@@ -54,6 +61,82 @@ class TestListTagsView(BaseTagViewsTestCase):
                 reverse('tags:view_tag', kwargs={'tag_slug': 'red'}),
                 'font-size:calc(14px * 5.0);'))
 
+    def test_lists_top_tags(self):
+        self.submission1.tags.add('red', 'green', 'blue')
+        self.submission2.tags.add('red', 'blue')
+        response = self.client.get(reverse('tags:list_tags'), {'top': 2})
+        self.assertContains(response, '>red</a>')
+        self.assertContains(response, '>blue</a>')
+        self.assertNotContains(response, '>green</a>')
+        self.assertNotContains(response, '>test</a>')
+
+    @override_settings(TAGCLOUD_PAGE_SIZE=2)
+    def test_paginates_alphabetically(self):
+        self.submission1.tags.add('red', 'green', 'blue')
+        response = self.client.get(reverse('tags:list_tags'))
+        self.assertContains(response, '>blue</a>')
+        self.assertContains(response, '>green</a>')
+        self.assertNotContains(response, '>red</a>')
+        response = self.client.get(reverse('tags:list_tags'), {
+            'after': self.get_next_token(response)})
+        self.assertContains(response, '>red</a>')
+        self.assertContains(response, '>test</a>')
+        self.assertNotContains(response, '>blue</a>')
+
+    def get_next_token(self, response):
+        content = response.content.decode('utf-8')
+        start = content.index('?after=') + len('?after=')
+        return unquote(content[start:content.index('"', start)])
+
+    def test_renders_in_constant_queries(self):
+        self.submission1.tags.add('red')
+        self.client.get(reverse('tags:list_tags'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('tags:list_tags'))
+        self.submission1.tags.add(*['tag-{}'.format(i) for i in range(20)])
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(reverse('tags:list_tags'))
+        self.assertContains(response, '>tag-19</a>')
+
+
+class TestTagStatistics(BaseTagViewsTestCase):
+    def get_statistics(self):
+        return dict(TagStatistic.objects.values_list('tag__name',
+                                                     'use_count'))
+
+    def test_counts_uses(self):
+        self.submission1.tags.add('red', 'green')
+        self.submission2.tags.add('red')
+        self.assertEqual(self.get_statistics(), {
+            'test': 0,
+            'green': 1,
+            'red': 2,
+        })
+        self.submission2.tags.remove('red')
+        self.submission1.tags.clear()
+        self.assertEqual(self.get_statistics(), {
+            'test': 0,
+            'green': 0,
+            'red': 0,
+        })
+
+    def test_tag_deleted(self):
+        self.submission1.tags.add('red', 'green')
+        self.submission2.tags.add('red')
+        self.test_tag.delete()
+        Tag.objects.get(name='red').delete()
+        self.assertEqual(self.get_statistics(), {'green': 1})
+
+    def test_tagging_updates_only_its_tags(self):
+        self.submission1.tags.add('red', 'green')
+        with CaptureQueriesContext(connection) as queries:
+            self.submission2.tags.add('red')
+        updates = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('UPDATE') and
+                   'tags_tagstatistic' in query['sql']]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('tag_id', updates[0].split('WHERE')[1])
+
 
 class TestViewTagView(BaseTagViewsTestCase):
     def test_lists_tagged_submissions(self):
@@ -85,11 +168,12 @@ class TestViewTagView(BaseTagViewsTestCase):
             'tag_slug': 'red'
         }))
         self.assertContains(response, 'Submissions tagged "red"')
-        self.assertContains(response, 'Showing results 1 through 25 of 29')
-        self.assertContains(response, '1 <span class="sr-only">(current)')
-        self.assertContains(response, '2/">2</a>')
+        self.assertContains(response, 'Showing 25 of 29 results')
+        self.assertContains(response, '?after={}"'.format(
+            response.context['submissions'].next_token))
+        self.assertNotContains(response, '?before=')
 
-    def test_defaults_to_last_page(self):
+    def test_follows_cursors(self):
         for i in range(1, 30):
             submission = Submission(
                 ctime=timezone.now(),
@@ -98,14 +182,18 @@ class TestViewTagView(BaseTagViewsTestCase):
                 content_raw='Submission #{}'.format(i))
             submission.save(update_content=True)
             submission.tags.add('red')
-        response = self.client.get(reverse('tags:view_tag', kwargs={
-            'tag_slug': 'red',
-            'page': 50,
-        }))
+        url = reverse('tags:view_tag', kwargs={'tag_slug': 'red'})
+        response = self.client.get(url)
+        response = self.client.get('{}?after={}'.format(
+            url, response.context['submissions'].next_token))
         self.assertContains(response, 'Submissions tagged "red"')
-        self.assertContains(response, 'Showing results 26 through 29 of 29')
-        self.assertContains(response, '2 <span class="sr-only">(current)')
-        self.assertContains(response, '1/">1</a>')
+        self.assertContains(response, 'Showing 4 of 29 results')
+        self.assertContains(response, 'Submission #29')
+        self.assertNotContains(response, '?after=')
+        response = self.client.get('{}?before={}'.format(
+            url, response.context['submissions'].previous_token))
+        self.assertContains(response, 'Showing 25 of 29 results')
+        self.assertNotContains(response, '?before=')
 
     def test_respects_users_requests_per_page(self):
         for i in range(1, 30):
@@ -124,10 +212,42 @@ class TestViewTagView(BaseTagViewsTestCase):
             'tag_slug': 'red'
         }))
         self.assertContains(response, 'Submissions tagged "red"')
-        self.assertContains(response, 'Showing results 1 through 10 of 29')
-        self.assertContains(response, '1 <span class="sr-only">(current)')
-        self.assertContains(response, '2/">2</a>')
-        self.assertContains(response, '3/">3</a>')
+        self.assertContains(response, 'Showing 10 of 29 results')
+
+
+class TestTagListingQueryCount(BaseTagViewsTestCase):
+    def add_submissions(self, count):
+        for i in range(count):
+            submission = Submission(
+                ctime=timezone.now(),
+                owner=self.foo,
+                title='Listed submission {}'.format(i),
+                content_raw='Listed')
+            submission.save(update_content=True)
+            submission.tags.add('test', 'listed-{}'.format(i))
+            self.foo.profile.favorited_submissions.add(submission)
+
+    def assertConstantQueries(self, url):
+        self.add_submissions(2)
+        # Warm up anything cached per process, such as content types.
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.add_submissions(20)
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+        self.assertContains(response, 'Listed submission 19')
+
+    def test_view_tag(self):
+        self.assertConstantQueries(reverse(
+            'tags:view_tag', kwargs={'tag_slug': 'test'}))
+
+    def test_list_submissions_with_favorite_tags(self):
+        self.foo.profile.favorite_tags.add(self.test_tag)
+        self.client.login(username='foo',
+                          password='a good password')
+        self.assertConstantQueries(reverse(
+            'tags:list_submissions_with_favorite_tags'))
 
 
 class TestFavoriteTagView(BaseTagViewsTestCase):
@@ -212,11 +332,11 @@ class TestListSubmissionsWithFavoriteTagsView(BaseTagViewsTestCase):
                           password='a good password')
         response = self.client.get(reverse(
             'tags:list_submissions_with_favorite_tags'))
-        self.assertContains(response, 'Showing results 1 through 25 of 29')
-        self.assertContains(response, '1 <span class="sr-only">(current)')
-        self.assertContains(response, '2/">2</a>')
+        self.assertContains(response, 'Showing 25 of 29 results')
+        self.assertContains(response, '?after={}"'.format(
+            response.context['submissions'].next_token))
 
-    def test_defaults_to_last_page(self):
+    def test_invalid_cursor_shows_first_page(self):
         for i in range(1, 30):
             submission = Submission(
                 ctime=timezone.now(),
@@ -228,13 +348,10 @@ class TestListSubmissionsWithFavoriteTagsView(BaseTagViewsTestCase):
         self.foo.profile.favorite_tags.add(self.test_tag)
         self.client.login(username='foo',
                           password='a good password')
-        response = self.client.get(reverse(
-            'tags:list_submissions_with_favorite_tags', kwargs={
-                'page': 50,
-            }))
-        self.assertContains(response, 'Showing results 26 through 29 of 29')
-        self.assertContains(response, '2 <span class="sr-only">(current)')
-        self.assertContains(response, '1/">1</a>')
+        response = self.client.get('{}?after=garbage'.format(reverse(
+            'tags:list_submissions_with_favorite_tags')))
+        self.assertContains(response, 'Showing 25 of 29 results')
+        self.assertNotContains(response, '?before=')
 
     def test_respects_users_requests_per_page(self):
         for i in range(1, 30):
@@ -252,10 +369,7 @@ class TestListSubmissionsWithFavoriteTagsView(BaseTagViewsTestCase):
                           password='a good password')
         response = self.client.get(reverse(
             'tags:list_submissions_with_favorite_tags'))
-        self.assertContains(response, 'Showing results 1 through 10 of 29')
-        self.assertContains(response, '1 <span class="sr-only">(current)')
-        self.assertContains(response, '2/">2</a>')
-        self.assertContains(response, '3/">3</a>')
+        self.assertContains(response, 'Showing 10 of 29 results')
 
 
 class TestBlockTagView(BaseTagViewsTestCase):
@@ -1,10 +1,7 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.contenttypes.models import ContentType
-from django.core.paginator import (
-    EmptyPage,
-    Paginator,
-)
 from django.core.urlresolvers import reverse
 from django.db.models import Q
 from django.shortcuts import (
@@ -12,31 +9,92 @@ from django.shortcuts import (
     redirect,
     render,
 )
+from django.template.loader import render_to_string
 from django.views.decorators.http import require_POST
-from taggit.models import Tag
+from taggit.models import (
+    Tag,
+    TaggedItem,
+)
 
+from .models import (
+    TagStatistic,
+    get_bounds,
+)
+from .templatetags.tag_extras import (
+    TAG_MAX,
+    TAG_MIN,
+    get_use_count,
+    get_weight_closure,
+)
 from administration.models import Flag
+from core.fragments import get_fragment
+from core.paginator import CursorPaginator
 from submissions.models import Submission
 from submissions.utils import (
-    filters_for_anonymous_user,
-    filters_for_authenticated_user,
+    VisibilityContext,
+    prefetch_for_listing,
 )
 
 
+def render_tag_cloud(top=None, after=None, before=None):
+    """Renders a tag cloud from the tag statistics.
+
+    Tags are weighed relative to the least and most used of every tag.
+
+    Args:
+        top: if set, show only this many of the most used tags; otherwise
+            show a page of tags in alphabetical order
+        after: a cursor token for the page after a position
+        before: a cursor token for the page before a position
+    """
+    tags = Tag.objects.select_related('statistic')
+    page = None
+    if top:
+        tags = sorted(tags.order_by('-statistic__use_count', 'name')[:top],
+                      key=lambda tag: tag.name)
+    else:
+        paginator = CursorPaginator(tags, settings.TAGCLOUD_PAGE_SIZE,
+                                    ordering=('name',))
+        page = paginator.page(after=after, before=before)
+        tags = page.object_list
+    get_weight = get_weight_closure(TAG_MIN, TAG_MAX,
+                                    *get_bounds(TagStatistic.objects))
+    for tag in tags:
+        tag.weight = get_weight(get_use_count(tag))
+    return render_to_string('tag-cloud-snippet.html', {
+        'tags': tags,
+        'page': page,
+    })
+
+
 def list_tags(request):
-    """View for listing all tags as a tag cloud."""
+    """View for listing tags as a tag cloud.
+
+    Tags are listed a page at a time in alphabetical order, or, if `top` is
+    in request.GET, only that many of the most used tags are shown.  Each
+    tag's weight is worked out from its statistics, and the rendered cloud
+    is cached until tags are next used.
+    """
+    try:
+        top = min(max(int(request.GET.get('top', 0)), 0),
+                  settings.TAGCLOUD_PAGE_SIZE)
+    except ValueError:
+        top = 0
+    after = request.GET.get('after')
+    before = request.GET.get('before')
     return render(request, 'list_tags.html', {
         'title': 'Submission tags',
-        'tags': Tag.objects.all(),
+        'tag_cloud': get_fragment(
+            'tag-cloud', lambda: render_tag_cloud(top, after, before),
+            vary_on=[top, after, before]),
     })
 
 
-def view_tag(request, tag_slug=None, page=1):
+def view_tag(request, tag_slug=None):
     """View for listing all submissions tagged with a tag.
 
     Args:
         tag_slug: the slug of the tag to list
-        page: the current page for pagination
     """
     tag = get_object_or_404(Tag, slug=tag_slug)
 
@@ -60,16 +118,15 @@ def view_tag(request, tag_slug=None, page=1):
         }, status=403)
 
     # Filter submissions visible to the reader
-    filters = filters_for_authenticated_user(request.user) if \
-        request.user.is_authenticated else filters_for_anonymous_user()
-    results = Submission.objects.filter(
-        Q(tags__in=[tag]) & filters)
-    paginator = Paginator(results, request.user.profile.results_per_page if
-                          request.user.is_authenticated else 25)
-    try:
-        submissions = paginator.page(page)
-    except EmptyPage:
-        submissions = paginator.page(paginator.num_pages)
+    filters = VisibilityContext.for_reader(request.user).get_filters()
+    results = prefetch_for_listing(Submission.objects.filter(
+        Q(tags__in=[tag]) & filters))
+    paginator = CursorPaginator(
+        results, request.user.profile.results_per_page if
+        request.user.is_authenticated else 25,
+        count_limit=settings.PAGINATION_COUNT_LIMIT)
+    submissions = paginator.page(after=request.GET.get('after'),
+                                 before=request.GET.get('before'))
     return render(request, 'view_tag.html', {
         'title': 'Submissions tagged "{}"'.format(tag.name),
         'tag': tag,
@@ -108,23 +165,27 @@ def unfavorite_tag(request, tag_slug=None):
 
 
 @login_required
-def list_submissions_with_favorite_tags(request, page=1):
+def list_submissions_with_favorite_tags(request):
     if request.user.profile.favorite_tags.count() == 0:
         messages.warning(request, "You must favorite some tags before you "
                          "can view this page!")
         return redirect(reverse('tags:list_tags'))
 
     # Filter submissions visible to the reader
-    filters = filters_for_authenticated_user(request.user) if \
-        request.user.is_authenticated else filters_for_anonymous_user()
-    results = Submission.objects.filter(
-        Q(tags__in=request.user.profile.favorite_tags.all()) & filters)
-    paginator = Paginator(results, request.user.profile.results_per_page if
-                          request.user.is_authenticated else 25)
-    try:
-        submissions = paginator.page(page)
-    except EmptyPage:
-        submissions = paginator.page(paginator.num_pages)
+    filters = VisibilityContext.for_reader(request.user).get_filters()
+    # Match tags with a subquery, as joining on them would list submissions
+    # once for each favorite tag they have
+    results = prefetch_for_listing(Submission.objects.filter(
+        Q(pk__in=TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Submission),
+            tag__in=request.user.profile.favorite_tags.all()).values(
+                'object_id')) & filters))
+    paginator = CursorPaginator(
+        results, request.user.profile.results_per_page if
+        request.user.is_authenticated else 25,
+        count_limit=settings.PAGINATION_COUNT_LIMIT)
+    submissions = paginator.page(after=request.GET.get('after'),
+                                 before=request.GET.get('before'))
     return render(request, 'list_submissions_with_favorite_tags.html', {
         'title': 'Submissions with your favorite tags',
         'submissions': submissions,
@@ -5,3 +5,6 @@ from django.apps import AppConfig
 
 class UsermgmtConfig(AppConfig):
     name = 'usermgmt'
+
+    def ready(self):
+        import usermgmt.signals  # noqa: F401
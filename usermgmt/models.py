@@ -1,5 +1,8 @@
 from __future__ import unicode_literals
-import markdown
+from collections import (
+    Counter,
+    defaultdict,
+)
 
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.fields import (
@@ -7,17 +10,31 @@ from django.contrib.contenttypes.fields import (
     GenericRelation,
 )
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
-from django.utils.html import strip_tags
+from django.core.exceptions import PermissionDenied
+from django.db import (
+    models,
+    transaction,
+)
+from django.db.models import (
+    Case,
+    F,
+    Value,
+    When,
+)
+from django.db.models.functions import Greatest
 from taggit.models import Tag
 
 from .group_models import FriendGroup
 from administration.models import Flag
-from honeycomb_markdown import HoneycombMarkdown
+from core.models import DirtyFieldsMixin
+from honeycomb_markdown import (
+    FULL,
+    render,
+)
 from submissions.models import Submission
 
 
-class Profile(models.Model):
+class Profile(DirtyFieldsMixin, models.Model):
     """A user profile."""
     # The user object this profile is tied to
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -49,45 +66,28 @@ class Profile(models.Model):
     results_per_page = models.PositiveIntegerField(default=25)
     expired_notifications = models.PositiveIntegerField(default=0)
 
+    # Notification counts by category, maintained as notifications are
+    # created and removed; see `update_notification_counts`.
+    user_notification_count = models.PositiveIntegerField(default=0)
+    submission_notification_count = models.PositiveIntegerField(default=0)
+    message_count = models.PositiveIntegerField(default=0)
+    admin_notification_count = models.PositiveIntegerField(default=0)
+
     def get_display_name(self):
         return self.display_name if self.display_name else \
             '~{}'.format(self.user.username)
 
     def save(self, *args, **kwargs):
-        self.profile_rendered = markdown.markdown(
-            strip_tags(self.profile_raw),
-            extensions=[
-                'pymdownx.extra',
-                'markdown.extensions.codehilite',
-                'markdown.extensions.smarty',
-                'pymdownx.headeranchor',
-                'pymdownx.magiclink',
-                'pymdownx.smartsymbols',
-                'pymdownx.tilde',
-                'pymdownx.mark',
-                HoneycombMarkdown(),
-            ])
+        self.profile_rendered = render(self.profile_raw, FULL)
         super(Profile, self).save(*args, **kwargs)
 
     def get_notifications_counts(self):
-        notifications = self.user.notification_set.all()
-        counts = {
-            'user_notifications': 0,
-            'submission_notifications': 0,
-            'messages': 0,
-            'admin_notifications': 0,
+        return {
+            'user_notifications': self.user_notification_count,
+            'submission_notifications': self.submission_notification_count,
+            'messages': self.message_count,
+            'admin_notifications': self.admin_notification_count,
         }
-        for notification in notifications:
-            if notification.notification_type == Notification.WATCH:
-                counts['user_notifications'] += 1
-            elif notification.notification_type == Notification.MESSAGE:
-                counts['messages'] += 1
-            elif notification.notification_type in \
-                    Notification.ADMIN_NOTIFICATIONS:
-                counts['admin_notifications'] += 1
-            else:
-                counts['submission_notifications'] += 1
-        return counts
 
     def get_active_flag(self):
         """Retrieve flag if there is an active flag against this submission"""
@@ -95,8 +95,14 @@ class Profile(models.Model):
         if len(active_flags) > 0:
             return active_flags[0]
 
-    def get_notifications_sorted(self):
-        notifications = self.user.notification_set.all()
+    def get_notifications_sorted(self, notifications=None):
+        """Sorts the user's notifications into lists by type.
+
+        Args:
+            notifications: the user's notifications, if already loaded
+        """
+        if notifications is None:
+            notifications = self.user.notification_set.all()
         sorted_notifications = {
             'Watch': [],
             'Favorite': [],
@@ -129,6 +135,114 @@ class Profile(models.Model):
         return sorted_notifications
 
 
+class NotificationManager(models.Manager):
+    """Removes notifications in bulk.
+
+    Notifications are deleted with one query per batch rather than one per
+    notification, and their targets' counters are adjusted along with them.
+    """
+
+    def _delete_rows(self, rows):
+        """Deletes notifications given as (id, target id, notification type)
+        rows, and counts them out of their targets' counters."""
+        if rows:
+            with transaction.atomic():
+                # Nothing depends on notifications, so there is nothing for
+                # Django to collect or signal per row before deleting them.
+                self.filter(id__in=[row[0] for row in rows])._raw_delete(
+                    self.db)
+                update_notification_counts([row[1:] for row in rows], -1)
+        return len(rows)
+
+    def bulk_delete(self, notifications):
+        """Deletes notifications and counts them out of their targets'
+        counters.
+
+        Args:
+            notifications: a queryset of notifications
+
+        Returns:
+            The number of notifications deleted
+        """
+        return self._delete_rows(list(notifications.order_by().values_list(
+            'id', 'target_id', 'notification_type')))
+
+    def delete_for_target(self, target, notification_ids):
+        """Deletes a user's notifications by id.
+
+        Ids of notifications which no longer exist are ignored.
+
+        Args:
+            target: the user deleting their notifications
+            notification_ids: the ids of the notifications to delete
+
+        Returns:
+            The number of notifications deleted
+
+        Raises:
+            PermissionDenied: if any of the notifications belong to another
+                user, in which case none are deleted
+        """
+        notifications = self.filter(id__in=notification_ids)
+        if notifications.exclude(target=target).exists():
+            raise PermissionDenied
+        return self.bulk_delete(notifications)
+
+    def delete_by_type(self, target, notification_types):
+        """Deletes a user's notifications of some types, such as a category.
+
+        Args:
+            target: the user deleting their notifications
+            notification_types: the types of notification to delete, such as
+                `Notification.SUBMISSION_NOTIFICATIONS`
+
+        Returns:
+            The number of notifications deleted
+        """
+        return self.bulk_delete(self.filter(
+            target=target, notification_type__in=notification_types))
+
+    def expire_older_than(self, cutoff, batch_size=1000, after_id=0,
+                          dry_run=False):
+        """Expires notifications created before a time, in batches.
+
+        Notifications are worked through in order of id, so that an
+        interrupted run can be resumed from the last id it reported.  Each
+        batch is deleted in its own short transaction, so that the table is
+        never locked for long, and the number of notifications each user had
+        expire is added to their profile with one update per batch.
+
+        Args:
+            cutoff: the time before which notifications expire
+            batch_size: how many notifications to expire at a time
+            after_id: only expire notifications with ids greater than this
+            dry_run: if True, find the batches without deleting anything
+
+        Yields:
+            A tuple of the number of notifications in each batch and the last
+            id in it
+        """
+        while True:
+            rows = list(self.filter(
+                ctime__lt=cutoff, id__gt=after_id).order_by('id').values_list(
+                    'id', 'target_id', 'notification_type')[:batch_size])
+            if not rows:
+                return
+            if not dry_run:
+                expired = Counter(row[1] for row in rows)
+                with transaction.atomic():
+                    self._delete_rows(rows)
+                    Profile.objects.filter(user_id__in=expired).update(
+                        expired_notifications=F('expired_notifications') +
+                        Case(*[When(user_id=target_id, then=Value(count))
+                               for target_id, count in expired.items()],
+                             output_field=models.PositiveIntegerField()))
+            after_id = rows[-1][0]
+            yield len(rows), after_id
+            if len(rows) < batch_size:
+                return
+
+
 class Notification(models.Model):
     """A notification for a user of a pertinent event that has happened."""
     # TODO Move notification to social applcation
@@ -206,5 +320,63 @@ class Notification(models.Model):
     subject_id = models.PositiveIntegerField(blank=True, null=True)
     subject = GenericForeignKey('subject_content_type', 'subject_id')
 
+    objects = NotificationManager()
+
     class Meta:
         ordering = ['-ctime']
+
+    def delete(self, *args, **kwargs):
+        """Overridden delete method.
+
+        Stops counting the notification on its target's profile.  New
+        notifications are counted by `usermgmt.signals`.  Notifications
+        deleted along with a user are not counted out; the repair_counters
+        command recomputes counts in bulk.
+        """
+        result = super(Notification, self).delete(*args, **kwargs)
+        update_notification_counts(
+            [(self.target_id, self.notification_type)], -1)
+        return result
+
+
+# The profile fields counting each type of notification; any other type is
+# a submission notification.
+NOTIFICATION_COUNTER_FIELDS = dict(
+    [(Notification.WATCH, 'user_notification_count'),
+     (Notification.MESSAGE, 'message_count')] +
+    [(notification_type, 'admin_notification_count')
+     for notification_type in Notification.ADMIN_NOTIFICATIONS])
+
+
+def get_notification_counter_field(notification_type):
+    """Gets the profile field counting notifications of a type."""
+    return NOTIFICATION_COUNTER_FIELDS.get(
+        notification_type, 'submission_notification_count')
+
+
+def update_notification_counts(notifications, delta):
+    """Adjusts users' notification counters for created or removed
+    notifications.
+
+    Changes are grouped so that one query is made per counter and amount,
+    however many notifications there are.
+
+    Args:
+        notifications: an iterable of (target user id, notification type)
+            pairs
+        delta: 1 if the notifications were created, -1 if they were removed
+    """
+    changes = Counter(
+        (target_id, get_notification_counter_field(notification_type))
+        for target_id, notification_type in notifications)
+    by_change = defaultdict(list)
+    for (target_id, field), count in changes.items():
+        by_change[(field, count)].append(target_id)
+    for (field, count), target_ids in by_change.items():
+        if delta > 0:
+            value = F(field) + count
+        else:
+            # Don't fail on counters which have drifted.
+            value = Greatest(F(field) - count, 0)
+        Profile.objects.filter(user_id__in=target_ids).update(
+            **{field: value})
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import (
+    Notification,
+    update_notification_counts,
+)
+
+
+@receiver(post_save, sender=Notification)
+def count_notification(sender, instance, created, **kwargs):
+    """Counts a new notification on its target's profile.
+
+    Removed notifications are counted out by `Notification.delete`, so that
+    bulk deletes can skip the per-row delete signals.
+    """
+    if created:
+        update_notification_counts(
+            [(instance.target_id, instance.notification_type)], 1)
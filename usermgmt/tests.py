@@ -1,8 +1,13 @@
 from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 
-from .models import Profile
+from .models import (
+    Notification,
+    Profile,
+    update_notification_counts,
+)
 
 
 class RegisterViewTests(TestCase):
@@ -152,3 +157,129 @@ class ViewProfileTests(TestCase):
                                            args=('foo',)))
         self.assertContains(response, 'You are blocked from viewing this '
                             'profile by the owner')
+
+
+class BaseNotificationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.foo = User.objects.create_user('foo', 'foo@example.com',
+                                           'a good password')
+        cls.foo.profile = Profile()
+        cls.foo.profile.save()
+        cls.bar = User.objects.create_user('bar', 'bar@example.com',
+                                           'another good password')
+        cls.bar.profile = Profile()
+        cls.bar.profile.save()
+
+    def notify(self, notification_type):
+        notification = Notification(
+            target=self.foo,
+            source=self.bar,
+            notification_type=notification_type,
+            subject=self.bar)
+        notification.save()
+        return notification
+
+    def get_counts(self):
+        return Profile.objects.get(user=self.foo).get_notifications_counts()
+
+
+class NotificationCountsTests(BaseNotificationTestCase):
+    def test_counts_new_notifications(self):
+        self.notify(Notification.WATCH)
+        self.notify(Notification.FAVORITE)
+        self.notify(Notification.FAVORITE)
+        self.notify(Notification.MESSAGE)
+        self.notify(Notification.APPLICATION_CLAIMED)
+        self.assertEqual(self.get_counts(), {
+            'user_notifications': 1,
+            'submission_notifications': 2,
+            'messages': 1,
+            'admin_notifications': 1,
+        })
+
+    def test_uncounts_removed_notifications(self):
+        self.notify(Notification.FAVORITE)
+        self.notify(Notification.FAVORITE).delete()
+        self.assertEqual(self.get_counts()['submission_notifications'], 1)
+        for notification in Notification.objects.filter(target=self.foo):
+            notification.delete()
+        self.assertEqual(self.get_counts()['submission_notifications'], 0)
+
+    def test_counts_do_not_go_negative(self):
+        update_notification_counts([(self.foo.id, Notification.WATCH)], -1)
+        self.assertEqual(self.get_counts()['user_notifications'], 0)
+
+    def test_counts_in_constant_queries(self):
+        notifications = [(self.foo.id, Notification.FAVORITE),
+                         (self.bar.id, Notification.FAVORITE),
+                         (self.foo.id, Notification.ENJOY),
+                         (self.bar.id, Notification.WATCH)]
+        # One query for foo's two submission notifications, one for bar's
+        # one, and one for bar's watch.
+        with self.assertNumQueries(3):
+            update_notification_counts(notifications, 1)
+        self.assertEqual(self.get_counts()['submission_notifications'], 2)
+        bar_counts = Profile.objects.get(
+            user=self.bar).get_notifications_counts()
+        self.assertEqual(bar_counts['submission_notifications'], 1)
+        self.assertEqual(bar_counts['user_notifications'], 1)
+
+    def test_counts_read_without_queries(self):
+        self.notify(Notification.WATCH)
+        profile = Profile.objects.get(user=self.foo)
+        with self.assertNumQueries(0):
+            profile.get_notifications_counts()
+
+
+class NotificationManagerTests(BaseNotificationTestCase):
+    def test_bulk_delete_in_constant_queries(self):
+        for i in range(5):
+            self.notify(Notification.FAVORITE)
+        self.notify(Notification.WATCH)
+        # One query to fetch the notifications, one to delete them, one for
+        # each counter changed, and the savepoint around the changes.
+        with self.assertNumQueries(6):
+            self.assertEqual(Notification.objects.bulk_delete(
+                Notification.objects.filter(target=self.foo)), 6)
+        self.assertEqual(self.get_counts(), {
+            'user_notifications': 0,
+            'submission_notifications': 0,
+            'messages': 0,
+            'admin_notifications': 0,
+        })
+
+    def test_delete_for_target(self):
+        first = self.notify(Notification.FAVORITE)
+        second = self.notify(Notification.WATCH)
+        kept = self.notify(Notification.WATCH)
+        self.assertEqual(Notification.objects.delete_for_target(
+            self.foo, [first.id, second.id, 42]), 2)
+        self.assertEqual(list(Notification.objects.all()), [kept])
+        self.assertEqual(self.get_counts()['user_notifications'], 1)
+
+    def test_delete_for_target_checks_ownership(self):
+        mine = self.notify(Notification.WATCH)
+        theirs = Notification(
+            target=self.bar,
+            source=self.foo,
+            notification_type=Notification.WATCH,
+            subject=self.foo)
+        theirs.save()
+        with self.assertRaises(PermissionDenied):
+            Notification.objects.delete_for_target(
+                self.foo, [mine.id, theirs.id])
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_delete_by_type(self):
+        self.notify(Notification.FAVORITE)
+        self.notify(Notification.RATING)
+        self.notify(Notification.WATCH)
+        self.assertEqual(Notification.objects.delete_by_type(
+            self.foo, Notification.SUBMISSION_NOTIFICATIONS), 2)
+        self.assertEqual(self.get_counts(), {
+            'user_notifications': 1,
+            'submission_notifications': 0,
+            'messages': 0,
+            'admin_notifications': 0,
+        })